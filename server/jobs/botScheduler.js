@@ -5,16 +5,24 @@ const path = require('path');
 // Schedule: Daily at 8:00 AM UTC
 // Schedule: Daily at 8:00 AM UTC (Sigma Alpha)
 const SCHEDULE_EXPRESSION = '0 8 * * *';
+// Nightly warm-start refresh of the Sigma Alpha models (full retrain when due or on drift)
+const CRON_QUANT_REFRESH = '0 6 * * *';
 
 // --- Smart Bot Fleet Schedules ---
 const CRON_DAILY = '0 9 * * *';      // 9:00 AM UTC
 const CRON_WEEKLY = '0 10 * * 0';    // Sundays 10:00 AM UTC
 const CRON_MONTHLY = '0 11 1 * *';   // 1st of Month 11:00 AM UTC
 const CRON_QUARTERLY = '0 12 1 */3 *'; // 1st of Quarter 12:00 AM UTC
+const CRON_RETRAIN_QUEUE = '30 */6 * * *'; // Every 6h: models flagged as outdated at load time
 
 // --- Job Tracking ---
 const activeJobs = {}; // { 'Daily': process, 'SigmaAlpha': process }
 
+// The nightly refresh has its own job id: a refresh that turns into a full retrain can
+// outlast 06:00 -> 08:00, and the inference run must then wait for it, not be skipped.
+const QUANT_JOB = 'SigmaAlpha';
+const QUANT_REFRESH_JOB = 'SigmaAlphaRefresh';
+
 const getActiveJobs = () => Object.keys(activeJobs);
 
 const stopJob = (jobId) => {
@@ -66,11 +74,18 @@ const runSmartBotBatch = (interval = 'Daily', mode = 'inference', ticker = null,
 };
 
 const runEarningsModel = (mode = 'inference', ticker = null) => {
-    const jobId = 'SigmaAlpha';
+    const jobId = mode === 'refresh' ? QUANT_REFRESH_JOB : QUANT_JOB;
     if (activeJobs[jobId]) {
         console.log(`[Scheduler] Job ${jobId} is already running. Skipping.`);
         return;
     }
+    // Refresh and the other Sigma Alpha runs both touch the models: one waits for the other
+    const otherId = jobId === QUANT_JOB ? QUANT_REFRESH_JOB : QUANT_JOB;
+    if (activeJobs[otherId]) {
+        console.log(`[Scheduler] Job ${otherId} is still running. ${jobId} (${mode}) will start when it finishes.`);
+        activeJobs[otherId].once('close', () => runEarningsModel(mode, ticker));
+        return;
+    }
 
     console.log(`--- [Cron] Starting Sigma Alpha Bot Run (Mode: ${mode}) ---`);
 
@@ -101,16 +116,56 @@ const runEarningsModel = (mode = 'inference', ticker = null) => {
     });
 };
 
+// Retrains only the models the engines queued as incompatible (feature schema changed)
+const runRetrainQueue = () => {
+    const jobId = 'RetrainQueue';
+    if (activeJobs[jobId]) {
+        console.log(`[Scheduler] Job ${jobId} is already running. Skipping.`);
+        return;
+    }
+
+    const pythonCommand = process.platform === 'win32' ? 'python' : 'python3';
+    const scripts = ['smart_bot_engine.py', 'earnings_model.py'];
+
+    // One engine after the other, so the retrains don't compete for the cores
+    const runNext = (i) => {
+        if (i >= scripts.length) {
+            delete activeJobs[jobId];
+            console.log('--- [Cron] Retrain Queue Completed ---');
+            return;
+        }
+        const scriptPath = path.join(__dirname, '../ml_service', scripts[i]);
+        const pythonProcess = spawn(pythonCommand, ['-u', scriptPath, '--retrain-queued']);
+        activeJobs[jobId] = pythonProcess;
+
+        pythonProcess.stdout.on('data', (data) => {
+            console.log(`[RetrainQueue]: ${data}`);
+        });
+
+        pythonProcess.stderr.on('data', (data) => {
+            console.error(`[RetrainQueue Err]: ${data}`);
+        });
+
+        pythonProcess.on('close', (code) => {
+            if (code !== 0) console.error(`--- [Cron] Retrain Queue (${scripts[i]}) Failed (Code ${code}) ---`);
+            runNext(i + 1);
+        });
+    };
+    runNext(0);
+};
+
 const initBotScheduler = () => {
     if (process.env.NODE_ENV === 'test') return;
 
+    cron.schedule(CRON_QUANT_REFRESH, () => runEarningsModel('refresh'), { scheduled: true, timezone: "UTC" });
     cron.schedule(SCHEDULE_EXPRESSION, () => runEarningsModel(), { scheduled: true, timezone: "UTC" });
     cron.schedule(CRON_DAILY, () => runSmartBotBatch('Daily', 'inference'), { scheduled: true, timezone: "UTC" });
     cron.schedule(CRON_WEEKLY, () => runSmartBotBatch('Weekly', 'inference'), { scheduled: true, timezone: "UTC" });
     cron.schedule(CRON_MONTHLY, () => runSmartBotBatch('Monthly', 'inference'), { scheduled: true, timezone: "UTC" });
     cron.schedule(CRON_QUARTERLY, () => runSmartBotBatch('Quarterly', 'inference'), { scheduled: true, timezone: "UTC" });
+    cron.schedule(CRON_RETRAIN_QUEUE, () => runRetrainQueue(), { scheduled: true, timezone: "UTC" });
 
     console.log(`[Scheduler] Bot Fleet Automation Active (Daily/Weekly/Monthly/Quarterly)`);
 };
 
-module.exports = { initBotScheduler, runEarningsModel, runSmartBotBatch, getActiveJobs, stopJob };
+module.exports = { initBotScheduler, runEarningsModel, runSmartBotBatch, runRetrainQueue, getActiveJobs, stopJob };
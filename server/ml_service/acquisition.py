@@ -0,0 +1,141 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Async data acquisition shared by the engines.
+# Upstream calls (Node adapter bar fetches, yfinance calendar / earnings_dates /
+# download, the Nasdaq calendar pages) are tagged with the host they hit and run
+# concurrently on an asyncio loop. Each host has a concurrency cap (semaphore) and a
+# token-bucket rate limit on request starts, held by the acquirer so they also bound
+# batches started from different threads; results come back in submission order.
+# The client libraries are blocking, so every call runs on a worker thread (which also
+# waits for the host's slot and token) and the loop only schedules them. A failed call
+# yields None (and is logged).
+#
+# Per-host limits: ACQUIRE_<HOST>_CONCURRENCY, ACQUIRE_<HOST>_RATE (requests/s, 0 =
+# unlimited) and ACQUIRE_<HOST>_BURST.
+
+def _limits(host, concurrency, rate, burst):
+    prefix = f"ACQUIRE_{host.upper()}_"
+    return {
+        'concurrency': max(1, int(os.getenv(prefix + 'CONCURRENCY', concurrency))),
+        'rate': float(os.getenv(prefix + 'RATE', rate)),
+        'burst': max(1, int(os.getenv(prefix + 'BURST', burst)))
+    }
+
+HOST_LIMITS = {
+    'adapter': _limits('adapter', 8, 20, 8), # Node adapter worker (Yahoo chart API behind it)
+    'yahoo': _limits('yahoo', 4, 2, 4),      # yfinance in this process
+    'nasdaq': _limits('nasdaq', 4, 4, 4)     # api.nasdaq.com calendar
+}
+DEFAULT_LIMITS = {'concurrency': 4, 'rate': 0.0, 'burst': 1}
+
+def _log(msg):
+    # stderr, like the adapter: instant_bot_engine's stdout is a protocol channel
+    print(msg, file=sys.stderr)
+
+class TokenBucket:
+    """Allows `rate` request starts per second on average, `burst` at once (thread-safe)."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Takes a token, booking a future one if none is left; returns the seconds to wait."""
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+class Acquirer:
+    """
+    Runs batches of blocking calls concurrently under per-host limits.
+    calls: list of (host, fn, *args); run() returns [fn(*args) or None] in that order.
+    The limits are per acquirer, not per batch: batches run from several threads at
+    once share each host's slots and token bucket.
+    """
+
+    def __init__(self, limits=None):
+        self.limits = dict(HOST_LIMITS, **(limits or {}))
+        self.stats = {}
+        self.gates = {} # host -> (concurrency slots, token bucket)
+        self.lock = threading.Lock()
+
+    def _host_stats(self, host):
+        return self.stats.setdefault(host, {'requests': 0, 'failed': 0, 'rate_wait_s': 0.0})
+
+    def _gate(self, host):
+        with self.lock:
+            if host not in self.gates:
+                limits = self.limits.get(host, DEFAULT_LIMITS)
+                self.gates[host] = (threading.BoundedSemaphore(limits['concurrency']),
+                                    TokenBucket(limits['rate'], limits['burst']))
+            return self.gates[host]
+
+    def _call(self, host, fn, args):
+        # On a worker thread: hold a slot of the host, wait for its token, then call
+        slots, bucket = self._gate(host)
+        with slots:
+            waited = bucket.reserve()
+            if waited > 0:
+                time.sleep(waited)
+            try:
+                return fn(*args), waited, None
+            except Exception as e:
+                return None, waited, e
+
+    async def _run(self, calls):
+        hosts = {call[0] for call in calls}
+        workers = sum(self.limits.get(h, DEFAULT_LIMITS)['concurrency'] for h in hosts)
+        loop = asyncio.get_running_loop()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            async def one(host, fn, *args):
+                result, waited, error = await loop.run_in_executor(pool, self._call, host, fn, args)
+                if error is not None:
+                    _log(f"  [Acquire] {host} call {getattr(fn, '__name__', fn)}{args[:1]} failed: {error}")
+                with self.lock:
+                    s = self._host_stats(host)
+                    s['requests'] += 1
+                    s['failed'] += error is not None
+                    s['rate_wait_s'] += waited
+                return result
+
+            return await asyncio.gather(*(one(*call) for call in calls))
+
+    def run(self, calls):
+        calls = list(calls)
+        if not calls:
+            return []
+        return list(asyncio.run(self._run(calls)))
+
+    def summary(self):
+        with self.lock:
+            return ' | '.join(f"{h}: {s['requests']} requests, {s['failed']} failed, {s['rate_wait_s']:.1f}s rate-limited"
+                              for h, s in sorted(self.stats.items())) or 'no requests'
+
+_acquirer = None
+_acquirer_guard = threading.Lock()
+
+def get_acquirer():
+    """Process-wide acquirer (its stats cover the whole run)."""
+    global _acquirer
+    with _acquirer_guard:
+        if _acquirer is None:
+            _acquirer = Acquirer()
+        return _acquirer
+
+def acquire(calls):
+    """get_acquirer().run(calls): [(host, fn, *args), ...] -> results in submission order."""
+    return get_acquirer().run(calls)
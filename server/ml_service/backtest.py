@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from bar_cache import get_bar_cache
+from train_profile import fit_profiled
+from memory_profile import is_lean
+from macro_context import compute_macro_frame, MACRO_SYMBOL, MACRO_COLUMNS
+from feature_store import get_feature_store
+from earnings_model import (PEER_GROUPS, FEATURE_COLS, build_scientific_features, mark_event_windows,
+                            model_params, apply_safety_clamps, load_cached_earnings_dates,
+                            update_scientific_store, SCIENTIFIC_SET, SCIENTIFIC_COLUMNS)
+
+# Walk-forward backtest of the Sigma Alpha event-driven model, fully offline.
+# Bars come from the bar cache, the macro frame from the cached QQQ bars and report
+# dates from the earnings history cache. Each ticker's feature frame is read from the
+# feature store (extended with the bars it hasn't seen) or, with the store off, built once;
+# the model is refit every RETRAIN_EVERY bars on the rows whose 5-day outcome was
+# already known at that point, and then scores every T-7 (Weekly) and T-1..T-5 (Daily)
+# window row up to the next refit in one predict call. Tickers run in parallel.
+# Like the live engine, Sympathy is 0 and Days_Until keeps the feature frame's value
+# on the scored rows, and the same safety clamps apply.
+
+HORIZON = 5                  # Y_Target: 5-bar forward return
+DAILY_WINDOW = (1, 2, 3, 4, 5)
+WEEKLY_WINDOW = 7
+RETRAIN_EVERY = 63           # Bars between refits (about a quarter)
+MIN_TRAIN_BARS = 250
+MIN_EVENT_ROWS = 20          # Below this, train_event_driven_model falls back to the last 250 rows
+
+def _naive(ts):
+    ts = pd.Timestamp(ts)
+    return ts.tz_localize(None) if ts.tzinfo is not None else ts
+
+def window_types(index, earnings_dates):
+    """Per row: ('Daily' | 'Weekly' | '', calendar days to the next report date)."""
+    events = pd.DatetimeIndex(sorted(_naive(e) for e in earnings_dates))
+    if len(events) == 0:
+        return np.full(len(index), ''), np.full(len(index), -1)
+    pos = events.searchsorted(index, side='right')
+    has_next = pos < len(events)
+    days = np.where(has_next, (events[np.minimum(pos, len(events) - 1)] - index).days, -1)
+    kind = np.where(days == WEEKLY_WINDOW, 'Weekly', np.where(np.isin(days, DAILY_WINDOW), 'Daily', ''))
+    return kind, days
+
+def fit_at(df, point, earnings_dates, n_jobs=None):
+    """Model as the train run would have fit it at row `point` (no outcome from the future)."""
+    history = df.iloc[:max(0, point - HORIZON)].dropna().copy()
+    cutoff = df.index[point]
+    mask, _ = mark_event_windows(history, [e for e in earnings_dates if e < cutoff])
+    training = history[mask] if mask.sum() >= MIN_EVENT_ROWS else history.iloc[-250:]
+    model, _ = fit_profiled(model_params(n_jobs), training[FEATURE_COLS], training['Y_Target'])
+    return model
+
+def backtest_ticker(ticker, bars, macro_data, earnings_dates, retrain_every=RETRAIN_EVERY,
+                    min_train=MIN_TRAIN_BARS, n_jobs=None):
+    """One row per scored window prediction: date, type, days_until, prediction, realized."""
+    columns = ['ticker', 'date', 'type', 'days_until', 'prediction', 'realized']
+    if bars is None or len(bars) < min_train + HORIZON:
+        return pd.DataFrame(columns=columns)
+    store = get_feature_store()
+    if store.enabled:
+        # Rows with a known outcome only: the others are never trained on or scored
+        update_scientific_store(ticker, bars, macro_data)
+        df = store.frame(SCIENTIFIC_SET, SCIENTIFIC_COLUMNS, ticker, start=_naive(bars.index[0]), end=_naive(bars.index[-1]))
+    else:
+        # Lean mode builds from a Close-only frame and leaves the bars alone
+        df = build_scientific_features(bars if is_lean() else bars.copy(), macro_data)
+    earnings_dates = [_naive(e) for e in earnings_dates]
+    kind, days = window_types(df.index, earnings_dates)
+    scorable = (kind != '') & df['Y_Target'].notna().to_numpy()
+
+    parts = []
+    for point in range(min_train, len(df), retrain_every):
+        rows = np.zeros(len(df), dtype=bool)
+        rows[point:point + retrain_every] = True
+        rows &= scorable
+        if not rows.any():
+            continue
+        model = fit_at(df, point, earnings_dates, n_jobs)
+        scored = df[rows]
+        raw = model.predict(scored[FEATURE_COLS])
+        parts.append(pd.DataFrame({
+            'ticker': ticker,
+            'date': scored.index,
+            'type': kind[rows],
+            'days_until': days[rows],
+            'prediction': apply_safety_clamps(raw, scored['Days_Until_Fed'].to_numpy(), kind[rows] == 'Daily'),
+            'realized': scored['Y_Target'].to_numpy()
+        }))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=columns)
+
+def _backtest_task(args):
+    return backtest_ticker(*args)
+
+def summarize(predictions):
+    """Hit rate and return statistics of trading each prediction's direction."""
+    if predictions.empty:
+        return {'predictions': 0}
+    pred = predictions['prediction'].to_numpy(dtype='float64')
+    realized = predictions['realized'].to_numpy(dtype='float64')
+    strategy = np.sign(pred) * realized
+    std = float(np.std(strategy, ddof=1)) if len(strategy) > 1 else 0.0
+    return {
+        'predictions': int(len(pred)),
+        'hit_rate': round(float(np.mean(np.sign(pred) == np.sign(realized)) * 100.0), 2),
+        'mean_return': round(float(np.mean(strategy)), 5),
+        'return_std': round(std, 5),
+        'return_ir': round(float(np.mean(strategy)) / std, 3) if std > 0 else None,
+        'total_return': round(float(np.sum(strategy)), 4),
+        'mae': round(float(np.mean(np.abs(pred - realized))), 5)
+    }
+
+def load_offline_inputs(tickers):
+    """(bars by ticker, macro frame, earnings dates by ticker) from the local caches only."""
+    cache = get_bar_cache()
+    bars = {t: cache.read(t, '1d') for t in tickers}
+    qqq = cache.read(MACRO_SYMBOL, '1d')
+    macro = compute_macro_frame(qqq['Close'])[MACRO_COLUMNS] if qqq is not None else None
+    return bars, macro, {t: load_cached_earnings_dates(t) for t in tickers}
+
+def run_backtest(tickers, bars=None, macro_data=None, earnings_dates=None, retrain_every=RETRAIN_EVERY,
+                 min_train=MIN_TRAIN_BARS, workers=None):
+    """
+    Backtests tickers (inputs default to the offline caches). Returns
+    (report dict, predictions DataFrame).
+    """
+    t0 = time.perf_counter()
+    if bars is None or macro_data is None or earnings_dates is None:
+        cached_bars, cached_macro, cached_dates = load_offline_inputs(tickers)
+        bars = bars if bars is not None else cached_bars
+        macro_data = macro_data if macro_data is not None else cached_macro
+        earnings_dates = earnings_dates if earnings_dates is not None else cached_dates
+    if macro_data is None or macro_data.empty:
+        print(f"  [Backtest] No cached {MACRO_SYMBOL} bars; run an engine once to fill the bar cache.")
+        return {'summary': summarize(pd.DataFrame())}, pd.DataFrame()
+
+    runnable = [t for t in tickers if bars.get(t) is not None and earnings_dates.get(t)]
+    skipped = sorted(set(tickers) - set(runnable))
+    if skipped:
+        print(f"  [Backtest] Skipping {len(skipped)} tickers without cached bars or report dates: {', '.join(skipped)}")
+
+    workers = workers or os.cpu_count() or 1
+    # Several processes: one XGBoost thread each instead of oversubscribing the cores
+    n_jobs = 1 if workers > 1 else None
+    tasks = [(t, bars[t], macro_data, earnings_dates[t], retrain_every, min_train, n_jobs) for t in runnable]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(_backtest_task, tasks))
+    else:
+        results = [_backtest_task(task) for task in tasks]
+
+    frames = [r for r in results if not r.empty]
+    predictions = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    report = {
+        'config': {'tickers': len(runnable), 'retrain_every': retrain_every, 'min_train': min_train, 'workers': workers},
+        'summary': summarize(predictions),
+        'by_type': {k: summarize(g) for k, g in predictions.groupby('type')} if frames else {},
+        'by_ticker': {k: summarize(g) for k, g in predictions.groupby('ticker')} if frames else {},
+        'seconds': round(time.perf_counter() - t0, 2)
+    }
+    return report, predictions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Sigma Alpha walk-forward backtest (offline, cached data)')
+    parser.add_argument('--tickers', type=str, help='Comma-separated tickers (default: the Sigma Alpha universe)')
+    parser.add_argument('--retrain-every', type=int, default=RETRAIN_EVERY, help='Bars between walk-forward refits')
+    parser.add_argument('--min-train', type=int, default=MIN_TRAIN_BARS, help='Bars of history before the first refit')
+    parser.add_argument('--workers', type=int, help='Parallel processes (default: all cores)')
+    parser.add_argument('--output', type=str, help='Optional JSON report file')
+    args = parser.parse_args()
+
+    tickers = args.tickers.split(',') if args.tickers else list(PEER_GROUPS.keys())
+    report, _ = run_backtest(tickers, retrain_every=args.retrain_every, min_train=args.min_train, workers=args.workers)
+
+    s = report['summary']
+    if s['predictions']:
+        print(f"\n=== Backtest: {s['predictions']} predictions over {report['config']['tickers']} tickers in {report['seconds']}s ===")
+        for name, stats in [('All', s)] + sorted(report['by_type'].items()):
+            print(f"  [Backtest] {name:<7} n={stats['predictions']:<5} hit {stats['hit_rate']:5.1f}% | "
+                  f"mean {stats['mean_return'] * 100:+.2f}% | IR {stats['return_ir']} | MAE {stats['mae'] * 100:.2f}%")
+    else:
+        print("\n=== Backtest: no scorable predictions ===")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"--> Report written to {args.output}")
@@ -0,0 +1,235 @@
+import os
+import sys
+import json
+import time
+import datetime
+import threading
+import numpy as np
+import pandas as pd
+from memory_profile import compact_bars
+
+# Persistent incremental OHLCV store sitting in front of the Node adapter.
+# One .npz file per (ticker, interval) holds the bars column by column plus the
+# date range that has already been requested, so later runs only ask the adapter
+# for the missing head/tail instead of re-downloading the full history.
+
+CACHE_DIR = os.getenv('BAR_CACHE_DIR', os.path.join(os.path.dirname(__file__), 'cache', 'bars'))
+CACHE_ENABLED = os.getenv('BAR_CACHE', 'on').lower() not in ('off', '0', 'false')
+
+# Bars on/after the day of the last fetch may still be forming (today's daily bar,
+# the current hour). They are refreshed once the stored copy is older than this.
+TAIL_TTL_SECONDS = int(os.getenv('BAR_CACHE_TAIL_TTL', '300'))
+
+ADAPTER_COLUMNS = {
+    'date': 'Date',
+    'open': 'Open',
+    'high': 'High',
+    'low': 'Low',
+    'close': 'Close',
+    'volume': 'Volume'
+}
+
+def payload_to_frame(data):
+    """
+    Converts the adapter's JSON rows into a chronological, tz-naive DataFrame
+    (yfinance style capitalized columns, DatetimeIndex).
+    """
+    df = pd.DataFrame(data)
+    if df.empty:
+        return df
+
+    df.rename(columns=ADAPTER_COLUMNS, inplace=True)
+    df['Date'] = pd.to_datetime(df['Date'])
+    df.set_index('Date', inplace=True)
+    df.sort_index(inplace=True)
+
+    if df.index.tz is not None:
+        df.index = df.index.tz_convert(None)
+
+    # Same dtypes whether the bars came from the adapter or from disk
+    numeric = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+    return df[numeric].astype('float64')
+
+def _log(msg):
+    # stderr: instant_bot_engine's stdout must stay a single JSON document.
+    print(msg, file=sys.stderr)
+
+def _to_day(value):
+    """Normalizes date/datetime/Timestamp/str to a midnight Timestamp."""
+    return pd.Timestamp(value).normalize()
+
+class BarCache:
+    """
+    Disk-backed bar store keyed by (ticker, interval).
+
+    fetch_payload(ticker, start_str, end_str, interval) must return the adapter's raw
+    JSON text (or None); it is only called for date ranges not already on disk.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, enabled=CACHE_ENABLED):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self.stats = {'hits': 0, 'misses': 0, 'partial': 0, 'restated': 0, 'bytes_fetched': 0, 'rows_fetched': 0}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._stats_guard = threading.Lock()
+
+    # --- Storage ---
+
+    def _path(self, ticker, interval):
+        safe = ticker.replace('/', '_').replace('^', '_')
+        return os.path.join(self.cache_dir, f"{safe}_{interval}.npz")
+
+    def _lock_for(self, key):
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def _load(self, ticker, interval):
+        path = self._path(ticker, interval)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as z:
+                meta = json.loads(str(z['meta']))
+                index = pd.DatetimeIndex(z['index'].astype('datetime64[ns]'), name='Date')
+                df = pd.DataFrame({c: z[f"col_{c}"] for c in meta['columns']}, index=index)
+            return df, meta
+        except Exception as e:
+            _log(f"  [Bar Cache] Corrupt entry {os.path.basename(path)} ({e}). Refetching.")
+            return None
+
+    def _save(self, ticker, interval, df, meta):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(ticker, interval)
+        tmp = path + '.tmp'
+        meta = dict(meta, columns=list(df.columns))
+        arrays = {f"col_{c}": df[c].to_numpy(dtype='float64') for c in df.columns}
+        with open(tmp, 'wb') as f:
+            np.savez(f, index=df.index.values.astype('datetime64[ns]').astype('int64'), meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp, path)
+
+    # --- Fetching ---
+
+    def _count(self, key, n=1):
+        with self._stats_guard:
+            self.stats[key] += n
+
+    def _fetch(self, ticker, start, end, interval, fetch_payload):
+        payload = fetch_payload(ticker, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'), interval)
+        if not payload:
+            return None
+        self._count('bytes_fetched', len(payload))
+
+        data = json.loads(payload)
+        if not data or 'error' in data:
+            if isinstance(data, dict):
+                _log(f"  [Node Adapter Error] {ticker}: {data.get('error')}")
+            return None
+
+        df = payload_to_frame(data)
+        self._count('rows_fetched', len(df))
+        return df
+
+    def get_bars(self, ticker, start_date, end_date, interval, fetch_payload):
+        """
+        Returns bars for [start_date, end_date) from disk, fetching only the missing
+        head/tail ranges through fetch_payload. Returns None if nothing is available.
+        In lean pipeline mode the bars come back as float32 OHLCV (see memory_profile).
+        """
+        return compact_bars(self._get_bars(ticker, start_date, end_date, interval, fetch_payload))
+
+    def _get_bars(self, ticker, start_date, end_date, interval, fetch_payload):
+        start, end = _to_day(start_date), _to_day(end_date)
+
+        if not self.enabled:
+            self._count('misses')
+            return self._fetch(ticker, start, end, interval, fetch_payload)
+
+        with self._lock_for((ticker, interval)):
+            stored = self._load(ticker, interval)
+            now = time.time()
+
+            if stored is None:
+                self._count('misses')
+                df = self._fetch(ticker, start, end, interval, fetch_payload)
+                if df is None:
+                    return None
+                self._save(ticker, interval, df, {'start': str(start.date()), 'end': str(end.date()), 'fetched_at': now})
+                return df.loc[(df.index >= start) & (df.index < end)]
+
+            df, meta = stored
+            cov_start, cov_end = _to_day(meta['start']), _to_day(meta['end'])
+            fetched_day = _to_day(datetime.datetime.fromtimestamp(meta['fetched_at']))
+            fetched_at = meta['fetched_at']
+
+            parts = []
+            if start < cov_start:
+                head = self._fetch(ticker, start, cov_start, interval, fetch_payload)
+                if head is not None:
+                    parts.append(head)
+                    cov_start = start
+
+            tail_stale = end > fetched_day and now - meta['fetched_at'] > TAIL_TTL_SECONDS
+            if end > cov_end or tail_stale:
+                # Re-request from the last stored bar so a partially formed bar gets replaced.
+                tail_start = df.index[-1].normalize() if not df.empty else cov_end
+                tail = self._fetch(ticker, tail_start, max(end, cov_end), interval, fetch_payload)
+                if tail is not None:
+                    if self._is_restated(df, tail, fetched_day):
+                        self._count('restated')
+                        _log(f"  [Bar Cache] History restated for {ticker} ({interval}). Full refresh.")
+                        full = self._fetch(ticker, min(start, cov_start), max(end, cov_end), interval, fetch_payload)
+                        if full is not None:
+                            self._save(ticker, interval, full, {'start': str(min(start, cov_start).date()), 'end': str(max(end, cov_end).date()), 'fetched_at': now})
+                            return full.loc[(full.index >= start) & (full.index < end)]
+                    parts.append(tail)
+                    cov_end = max(end, cov_end)
+                    fetched_at = now
+
+            if parts:
+                self._count('partial')
+                df = pd.concat([df] + parts)
+                df = df[~df.index.duplicated(keep='last')].sort_index()
+                self._save(ticker, interval, df, {'start': str(cov_start.date()), 'end': str(cov_end.date()), 'fetched_at': fetched_at})
+            else:
+                self._count('hits')
+
+            return df.loc[(df.index >= start) & (df.index < end)]
+
+    def read(self, ticker, interval):
+        """Everything stored for (ticker, interval), without fetching (offline use). None if absent."""
+        with self._lock_for((ticker, interval)):
+            stored = self._load(ticker, interval)
+        return None if stored is None else compact_bars(stored[0])
+
+    @staticmethod
+    def _is_restated(stored, fresh, fetched_day):
+        """
+        True when settled bars (before the day of the previous fetch) came back with a
+        different close, i.e. the provider back-adjusted the series (splits etc).
+        """
+        settled = stored.index[stored.index < fetched_day]
+        overlap = fresh.index.intersection(settled)
+        if len(overlap) == 0 or 'Close' not in fresh.columns:
+            return False
+        old = stored.loc[overlap, 'Close'].to_numpy(dtype='float64')
+        new = fresh.loc[overlap, 'Close'].to_numpy(dtype='float64')
+        return not np.allclose(old, new, rtol=1e-6, equal_nan=True)
+
+    def summary(self):
+        s = self.stats
+        return (f"hits={s['hits']} partial={s['partial']} misses={s['misses']} restated={s['restated']} "
+                f"fetched={s['bytes_fetched'] / 1024:.1f} KB ({s['rows_fetched']} rows)")
+
+_default_cache = None
+_default_guard = threading.Lock()
+
+def get_bar_cache():
+    """Process-wide BarCache shared by all engines."""
+    global _default_cache
+    with _default_guard:
+        if _default_cache is None:
+            _default_cache = BarCache()
+        return _default_cache
@@ -0,0 +1,4 @@
+# Offline benchmarks for the ml_service hot paths.
+# Synthetic OHLCV fixtures, a stand-in for the Node adapter and an in-memory Mongo
+# substitute, so feature builds, training and the engine loops can be timed without
+# Yahoo, Nasdaq or a database. Run with:  python -m benchmarks.run --help
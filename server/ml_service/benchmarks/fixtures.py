@@ -0,0 +1,156 @@
+import json
+import zlib
+import datetime
+import threading
+import numpy as np
+import pandas as pd
+from bson import ObjectId
+
+# Deterministic stand-ins for the external services the engines talk to.
+
+INTRADAY_HOURS = [14, 15, 16, 17, 18, 19, 20] # Regular session bars (UTC)
+
+def synthetic_tickers(n):
+    """n fake symbols: T0000, T0001, ..."""
+    return [f"T{i:04d}" for i in range(n)]
+
+def _seed(ticker, interval):
+    return zlib.crc32(f"{ticker}:{interval}".encode())
+
+def _timestamps(start, end, interval):
+    days = pd.bdate_range(start, end, inclusive='left')
+    if interval == '1d':
+        return days
+    hours = pd.to_timedelta(INTRADAY_HOURS, unit='h')
+    return pd.DatetimeIndex([d + h for d in days for h in hours])
+
+def synthetic_ohlcv(ticker, start, end, interval='1d'):
+    """
+    Geometric random walk bars for [start, end), identical for the same ticker/interval
+    on every call. Returns a DataFrame with yfinance style columns.
+    """
+    index = _timestamps(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), interval)
+    n = len(index)
+    rng = np.random.default_rng(_seed(ticker, interval))
+    sigma = 0.02 if interval == '1d' else 0.006
+    close = 20 + 180 * rng.random() * np.exp(np.cumsum(rng.normal(0.0003, sigma, n)))
+    spread = np.abs(rng.normal(0, sigma, n)) * close
+    open_ = close * (1 + rng.normal(0, sigma / 2, n))
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) + spread,
+        'Low': np.minimum(open_, close) - spread,
+        'Close': close,
+        'Volume': rng.integers(100_000, 50_000_000, n).astype('float64')
+    }, index=pd.DatetimeIndex(index, name='Date'))
+
+class MockAdapter:
+    """
+    Same interface as NodeAdapterClient.fetch: returns the raw JSON text the
+    yahoo-finance2 adapter would print, generated from synthetic_ohlcv.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def fetch(self, ticker, start_str, end_str, interval='1d'):
+        with self.lock:
+            self.calls += 1
+        df = synthetic_ohlcv(ticker, start_str, end_str, interval)
+        rows = [
+            {'date': ts.strftime('%Y-%m-%dT%H:%M:%S.000Z'), 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+            for ts, o, h, l, c, v in zip(df.index, df['Open'], df['High'], df['Low'], df['Close'], df['Volume'])
+        ]
+        return json.dumps(rows)
+
+    def fetch_many(self, requests):
+        return [self.fetch(*req) for req in requests]
+
+    def close(self):
+        pass
+
+def synthetic_earnings_dates(ticker, quarters=8, today=None):
+    """Past quarterly report dates, most recent first (like get_historical_earnings_dates)."""
+    today = pd.Timestamp(today or datetime.date.today())
+    offset = _seed(ticker, 'earnings') % 60
+    return [today - pd.Timedelta(days=30 + offset + 91 * q) for q in range(quarters)]
+
+# --- In-memory Mongo substitute ---
+
+def _matches(doc, query):
+    for key, cond in query.items():
+        value = doc.get(key)
+        if isinstance(cond, dict) and '$in' in cond:
+            if value not in cond['$in']:
+                return False
+        elif value != cond:
+            return False
+    return True
+
+class _InsertManyResult:
+    def __init__(self, ids):
+        self.inserted_ids = ids
+
+class InMemoryCollection:
+    """The subset of pymongo.Collection the engines use (equality and $in filters)."""
+
+    def __init__(self, docs=None):
+        self.docs = list(docs or [])
+        self.round_trips = 0
+        self.lock = threading.Lock()
+
+    def find(self, query=None):
+        with self.lock:
+            self.round_trips += 1
+            return [d for d in self.docs if _matches(d, query or {})]
+
+    def find_one(self, query=None):
+        with self.lock:
+            self.round_trips += 1
+            return next((d for d in self.docs if _matches(d, query or {})), None)
+
+    def distinct(self, key, query=None):
+        with self.lock:
+            self.round_trips += 1
+            return list(dict.fromkeys(d.get(key) for d in self.docs if _matches(d, query or {})))
+
+    def insert_one(self, doc):
+        with self.lock:
+            self.round_trips += 1
+            doc.setdefault('_id', ObjectId())
+            self.docs.append(doc)
+
+    def insert_many(self, docs, ordered=True):
+        with self.lock:
+            self.round_trips += 1
+            for doc in docs:
+                doc.setdefault('_id', ObjectId())
+            self.docs.extend(docs)
+            return _InsertManyResult([d['_id'] for d in docs])
+
+    def update_one(self, query, update):
+        with self.lock:
+            self.round_trips += 1
+            for doc in self.docs:
+                if _matches(doc, query):
+                    doc.update(update.get('$set', {}))
+                    return
+
+def synthetic_bots(tickers, per_bot=5):
+    """Bot users whose universes together cover every ticker."""
+    strategies = ['Momentum', 'MeanReversion', 'Contrarian', 'Conservative', 'Neutral']
+    bots = []
+    for i in range(0, len(tickers), per_bot):
+        chunk = tickers[i:i + per_bot]
+        while len(chunk) < 3:
+            chunk = chunk + tickers[:3 - len(chunk)]
+        bots.append({
+            '_id': ObjectId(),
+            'username': f"bench_bot_{i // per_bot}",
+            'isBot': True,
+            'universe': list(chunk),
+            'strategy': strategies[(i // per_bot) % len(strategies)],
+            'volatilityCap': 0.05
+        })
+    return bots
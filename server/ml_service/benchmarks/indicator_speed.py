@@ -0,0 +1,98 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ML_DIR not in sys.path:
+    sys.path.insert(0, ML_DIR)
+
+import numpy as np
+import pandas as pd
+from ta.momentum import RSIIndicator
+from ta.trend import SMAIndicator, MACD
+from ta.volatility import BollingerBands
+
+import indicators
+from benchmarks.fixtures import synthetic_tickers, synthetic_ohlcv
+
+# Speed of the indicators kernels on a (tickers x time) panel vs one set of ta objects
+# per ticker (RSI14, SMA20/50, MACD, Bollinger 20/2), with the max deviation from ta.
+
+DEFAULT_SIZES = [10, 100, 1000]
+
+def _closes(n, days):
+    end = pd.Timestamp('2025-01-01')
+    start = end - pd.Timedelta(days=days)
+    return [synthetic_ohlcv(t, start, end)['Close'] for t in synthetic_tickers(n)]
+
+def run_ta(closes):
+    out = []
+    for close in closes:
+        macd = MACD(close=close)
+        bb = BollingerBands(close=close, window=20, window_dev=2)
+        out.append({
+            'rsi': RSIIndicator(close=close, window=14).rsi().to_numpy(),
+            'sma_20': SMAIndicator(close=close, window=20).sma_indicator().to_numpy(),
+            'sma_50': SMAIndicator(close=close, window=50).sma_indicator().to_numpy(),
+            'macd_diff': macd.macd_diff().to_numpy(),
+            'bb_high': bb.bollinger_hband().to_numpy()
+        })
+    return out
+
+def run_kernels(panel):
+    return {
+        'rsi': indicators.rsi(panel, 14),
+        'sma_20': indicators.sma(panel, 20),
+        'sma_50': indicators.sma(panel, 50),
+        'macd_diff': indicators.macd(panel)[2],
+        'bb_high': indicators.bollinger(panel, 20, 2)[1]
+    }
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+def compare(n, days=730):
+    closes = _closes(n, days)
+    ta_out, ta_s = _timed(run_ta, closes)
+    panel = indicators.to_panel([c.to_numpy() for c in closes])
+    k64, k64_s = _timed(run_kernels, panel)
+    k32, k32_s = _timed(run_kernels, panel.astype(np.float32))
+
+    max_dev = 0.0
+    for row, (close, expected) in enumerate(zip(closes, ta_out)):
+        for name, values in expected.items():
+            got = indicators.from_panel(k64[name][row], len(close))
+            max_dev = max(max_dev, float(np.nanmax(np.abs(got - values))))
+
+    bars = sum(len(c) for c in closes)
+    return {
+        'tickers': n,
+        'bars': bars,
+        'ta_seconds': round(ta_s, 4),
+        'kernel_seconds': round(k64_s, 4),
+        'kernel_f32_seconds': round(k32_s, 4),
+        'speedup': round(ta_s / k64_s, 1) if k64_s > 0 else None,
+        'max_abs_deviation': max_dev
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='indicators kernels vs ta')
+    parser.add_argument('--sizes', type=str, default=','.join(map(str, DEFAULT_SIZES)), help='Comma-separated universe sizes')
+    parser.add_argument('--output', type=str, help='Optional JSON results file')
+    args = parser.parse_args()
+
+    results = []
+    for n in [int(s) for s in args.sizes.split(',')]:
+        r = compare(n)
+        results.append(r)
+        print(f"  [Indicators] n={n:<5} ta {r['ta_seconds']:8.3f}s | kernels {r['kernel_seconds']:7.3f}s "
+              f"(f32 {r['kernel_f32_seconds']:.3f}s) | x{r['speedup']} | max dev {r['max_abs_deviation']:.2e}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'results': results}, f, indent=2)
+        print(f"--> Results written to {args.output}")
@@ -0,0 +1,263 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import datetime
+import tempfile
+import tracemalloc
+import contextlib
+import subprocess
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ML_DIR not in sys.path:
+    sys.path.insert(0, ML_DIR)
+
+# The engines connect at import time; the client is lazy, so no server is needed
+os.environ.setdefault('MONGO_URI', 'mongodb://localhost:27017/benchmarks')
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+import bar_cache
+import node_adapter
+import macro_context
+import model_registry
+import run_trace
+import indicator_state
+import feature_store
+import smart_bot_engine
+import earnings_model
+import instant_bot_engine
+from benchmarks.fixtures import (
+    MockAdapter, InMemoryCollection, synthetic_tickers, synthetic_bots, synthetic_earnings_dates
+)
+
+# Runs each stage over synthetic universes and writes one JSON document:
+#   {"meta": {...}, "results": [{"stage", "tickers", "seconds", "rows", "rows_per_sec", "peak_mb"}, ...]}
+
+DEFAULT_SIZES = [10, 100, 1000, 5000]
+STAGES = ['smart_features', 'smart_training_rows', 'scientific_features', 'event_training', 'instant_analysis', 'instant_scan', 'smart_engine', 'quant_engine']
+# Stages that fit an XGBoost model per ticker are capped (see --train-cap)
+TRAINING_STAGES = {'event_training', 'quant_engine'}
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+class BenchEnv:
+    """
+    Points every engine at the fixtures: mock adapter, uncached bars, in-memory
+    collections, and throwaway model/macro/feature-store directories under workdir.
+    """
+
+    def __init__(self, workdir, use_bar_cache=False):
+        self.workdir = workdir
+        self.adapter = MockAdapter()
+        node_adapter._client = self.adapter
+        bar_cache._default_cache = bar_cache.BarCache(os.path.join(workdir, 'bars'), enabled=use_bar_cache)
+        model_registry._registry = model_registry.ModelRegistry(queue=model_registry.RetrainQueue(os.path.join(workdir, 'retrain_queue.json')))
+        indicator_state._store = indicator_state.IndicatorStore(os.path.join(workdir, 'indicators'))
+        feature_store._store = feature_store.FeatureStore(os.path.join(workdir, 'features'))
+
+        run_trace.TRACE_DIR = os.path.join(workdir, 'traces')
+        macro_context.MACRO_DIR = os.path.join(workdir, 'macro')
+        macro_context._memo.clear()
+
+        models_dir = os.path.join(workdir, 'models')
+        os.makedirs(models_dir, exist_ok=True)
+        smart_bot_engine.MODELS_DIR = models_dir
+        earnings_model.MODELS_DIR = models_dir
+
+        # Calendar: every ticker reports in 3 days, so the inference path always runs
+        report_date = datetime.date.today() + datetime.timedelta(days=3)
+        earnings_model.fetch_nasdaq_earnings_date = lambda ticker: report_date
+        earnings_model.get_historical_earnings_dates = synthetic_earnings_dates
+
+        self.quant_user = {'_id': 'sigma', 'username': 'Sigma Alpha', 'isBot': True}
+
+    def use_universe(self, tickers):
+        users = InMemoryCollection(synthetic_bots(tickers) + [self.quant_user])
+        predictions = InMemoryCollection()
+        smart_bot_engine.users_collection = users
+        smart_bot_engine.predictions_collection = predictions
+        earnings_model.users_collection = users
+        earnings_model.predictions_collection = predictions
+        earnings_model.PEER_GROUPS = {t: [p for p in tickers[i + 1:i + 4] if p != t] for i, t in enumerate(tickers)}
+        return predictions
+
+def measure(fn, track_memory=True):
+    """Runs fn() with engine logs silenced. Returns (result, seconds, peak_mb)."""
+    if track_memory:
+        tracemalloc.start()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        t0 = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - t0
+    peak_mb = None
+    if track_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_mb = peak / (1024 * 1024)
+    return result, seconds, peak_mb
+
+# --- Stages: setup(env, tickers) -> run() returning rows processed ---
+# (bars for the feature/training stages, analyses or predictions for the engine loops)
+
+def stage_smart_features(env, tickers):
+    frames = [smart_bot_engine.fetch_data(t) for t in tickers]
+    def run():
+        return sum(len(smart_bot_engine.prepare_features(df)[0]) for df in frames)
+    return run
+
+def stage_smart_training_rows(env, tickers):
+    frames = [smart_bot_engine.fetch_data(t) for t in tickers]
+    # The feature store is filled during setup: the stage times the steady-state read
+    for t, df in zip(tickers, frames):
+        smart_bot_engine.update_feature_store(t, df)
+    def run():
+        rows = 0
+        for t, df in zip(tickers, frames):
+            X, _ = smart_bot_engine.training_matrix(t, df)
+            rows += 0 if X is None else len(X)
+        return rows
+    return run
+
+def stage_scientific_features(env, tickers):
+    macro = earnings_model.fetch_macro_context()
+    def run():
+        rows = 0
+        for t in tickers:
+            df = earnings_model.prepare_scientific_features(t, macro, 14)[0]
+            rows += 0 if df is None else len(df)
+        return rows
+    return run
+
+def stage_event_training(env, tickers):
+    macro = earnings_model.fetch_macro_context()
+    prepared = []
+    for t in tickers:
+        df, _, dates, _ = earnings_model.prepare_scientific_features(t, macro, 14)
+        prepared.append((df, dates))
+    def run():
+        rows = 0
+        for df, dates in prepared:
+            if df is None: continue
+            rows += len(df)
+            earnings_model.train_event_driven_model('BENCH', df.copy(), dates)
+        return rows
+    return run
+
+def stage_instant_analysis(env, tickers):
+    def run():
+        rows = 0
+        for t in tickers:
+            result = instant_bot_engine.analyze_instant_setup(t, '1h')
+            rows += 0 if 'error' in result else 1
+        return rows
+    return run
+
+def stage_instant_scan(env, tickers):
+    def run():
+        return sum(1 for r in instant_bot_engine.scan(tickers, '1h') if 'error' not in r)
+    return run
+
+def stage_smart_engine(env, tickers):
+    predictions = env.use_universe(tickers)
+    # The pooled model is trained during setup so the stage times the inference loop
+    smart_bot_engine.train_pooled_model(tickers, 'Daily')
+    def run():
+        smart_bot_engine.run_smart_engine('Daily', 'inference', pooled_mode=True)
+        return len(predictions.docs)
+    return run
+
+def stage_quant_engine(env, tickers):
+    predictions = env.use_universe(tickers)
+    def run():
+        earnings_model.run_quant_model(mode='train')
+        earnings_model.run_quant_model(mode='inference')
+        return len(predictions.docs)
+    return run
+
+STAGE_FUNCS = {
+    'smart_features': stage_smart_features,
+    'smart_training_rows': stage_smart_training_rows,
+    'scientific_features': stage_scientific_features,
+    'event_training': stage_event_training,
+    'instant_analysis': stage_instant_analysis,
+    'instant_scan': stage_instant_scan,
+    'smart_engine': stage_smart_engine,
+    'quant_engine': stage_quant_engine
+}
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ML_DIR, stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+def run_benchmarks(sizes=DEFAULT_SIZES, stages=STAGES, train_cap=50, track_memory=True, use_bar_cache=False, log=print):
+    """Returns the results document (see module comment)."""
+    results = []
+    with tempfile.TemporaryDirectory(prefix='ml_bench_') as workdir:
+        env = BenchEnv(workdir, use_bar_cache=use_bar_cache)
+        for size in sizes:
+            for stage in stages:
+                n = min(size, train_cap) if stage in TRAINING_STAGES else size
+                tickers = synthetic_tickers(n)
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                    run = STAGE_FUNCS[stage](env, tickers)
+                rows, seconds, peak_mb = measure(run, track_memory)
+                entry = {
+                    'stage': stage,
+                    'universe': size,
+                    'tickers': n,
+                    'seconds': round(seconds, 4),
+                    'rows': rows,
+                    'rows_per_sec': round(rows / seconds, 1) if seconds > 0 else None,
+                    'peak_mb': None if peak_mb is None else round(peak_mb, 2)
+                }
+                results.append(entry)
+                log(f"  [Bench] {stage:<20} n={n:<5} {seconds:8.3f}s  {entry['rows_per_sec'] or 0:>12,.0f} rows/s  peak={entry['peak_mb']} MB")
+
+    meta = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'versions': {'numpy': np.__version__, 'pandas': pd.__version__, 'xgboost': xgb.__version__},
+        'sizes': list(sizes),
+        'train_cap': train_cap,
+        'bar_cache': use_bar_cache,
+        'memory_tracked': track_memory
+    }
+    return {'meta': meta, 'results': results}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='ml_service benchmarks (synthetic data, no network or database)')
+    parser.add_argument('--sizes', type=str, default=','.join(map(str, DEFAULT_SIZES)), help='Comma-separated universe sizes')
+    parser.add_argument('--stages', type=str, default=','.join(STAGES), help=f"Comma-separated subset of: {', '.join(STAGES)}")
+    parser.add_argument('--train-cap', type=int, default=50, help='Max tickers for stages that train a model per ticker')
+    parser.add_argument('--no-memory', action='store_true', help='Skip tracemalloc (lower overhead, no peak_mb)')
+    parser.add_argument('--bar-cache', action='store_true', help='Serve bars through an on-disk bar cache (warm after the first stage)')
+    parser.add_argument('--output', type=str, help='Results file (default: benchmarks/results/bench_<timestamp>.json)')
+    args = parser.parse_args()
+
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+    unknown = [s for s in stages if s not in STAGE_FUNCS]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+
+    doc = run_benchmarks(
+        sizes=[int(s) for s in args.sizes.split(',')],
+        stages=stages,
+        train_cap=args.train_cap,
+        track_memory=not args.no_memory,
+        use_bar_cache=args.bar_cache
+    )
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(doc, f, indent=2)
+    print(f"--> Results written to {output}")
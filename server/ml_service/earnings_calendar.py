@@ -0,0 +1,184 @@
+import os
+import json
+import datetime
+import threading
+import requests
+import yfinance as yf
+from acquisition import acquire
+
+# Daily snapshot of the Nasdaq earnings calendar.
+# The T+0..T+7 pages are fetched once per day over a pooled session (instead of
+# 8 requests per ticker), stored on disk, and turned into a symbol -> next earnings
+# date index so each ticker lookup is a dict access. yfinance fallback answers are
+# stored in the same daily snapshot (failed lookups are not: they are retried).
+# The pages, and the fallbacks of a prefetched universe, are requested concurrently
+# through the acquisition layer.
+
+NASDAQ_URL = os.getenv('NASDAQ_CALENDAR_URL', 'https://api.nasdaq.com/api/calendar/earnings')
+CALENDAR_DIR = os.getenv('CALENDAR_CACHE_DIR', os.path.join(os.path.dirname(__file__), 'cache', 'calendar'))
+HORIZON_DAYS = 8 # Check T+0 to T+7
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'application/json, text/plain, */*',
+    'Referer': 'https://www.nasdaq.com/'
+}
+
+FAILED = object() # _fallback result when the yfinance lookup raised (not an answer)
+
+def _yfinance_next_date(ticker):
+    t = yf.Ticker(ticker)
+    cal = t.calendar
+    if isinstance(cal, dict) and 'Earnings Date' in cal:
+        dates = cal['Earnings Date']
+        if dates:
+            return dates[0]
+    return None
+
+class EarningsCalendar:
+    def __init__(self, base_url=NASDAQ_URL, cache_dir=CALENDAR_DIR, today=None, fallback=_yfinance_next_date):
+        self.base_url = base_url
+        self.cache_dir = cache_dir
+        self.today = today or datetime.date.today()
+        self.fallback = fallback
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        self.lock = threading.Lock()
+        self.pages = None     # {date_str: [symbols]}
+        self.complete = True
+        self.index = {}       # symbol -> datetime.date (earliest in horizon)
+        self.fallbacks = {}   # symbol -> 'YYYY-MM-DD' | None
+        self.stats = {'http_requests': 0, 'lookups': 0, 'fallback_calls': 0}
+
+    # --- Snapshot ---
+
+    def _path(self):
+        return os.path.join(self.cache_dir, f"earnings_{self.today.isoformat()}.json")
+
+    def _load(self):
+        path = self._path()
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path) as f:
+                snap = json.load(f)
+            self.pages = snap['pages']
+            self.fallbacks = snap.get('fallbacks', {})
+            return True
+        except Exception as e:
+            print(f"  [Calendar] Ignoring unreadable snapshot ({e}).")
+            return False
+
+    def _save(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path()
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'pages': self.pages, 'fallbacks': self.fallbacks}, f)
+        os.replace(tmp, path)
+
+    def _fetch_page(self, date_str):
+        try:
+            resp = self.session.get(self.base_url, params={'date': date_str}, timeout=5)
+            data = resp.json() or {}
+            rows = (data.get('data') or {}).get('rows') or []
+            return [row.get('symbol') for row in rows if row.get('symbol')]
+        except Exception as e:
+            print(f"  [Nasdaq Error] {date_str}: {e}")
+            return None
+
+    def _fetch_pages(self):
+        dates = [(self.today + datetime.timedelta(days=i)).strftime('%Y-%m-%d') for i in range(HORIZON_DAYS)]
+        self.stats['http_requests'] += len(dates)
+        symbols = acquire([('nasdaq', self._fetch_page, d) for d in dates])
+        return {d: page for d, page in zip(dates, symbols) if page is not None}
+
+    def _build_index(self):
+        self.index = {}
+        for date_str in sorted(self.pages):
+            d = datetime.date.fromisoformat(date_str)
+            for symbol in self.pages[date_str]:
+                self.index.setdefault(symbol, d)
+
+    def _ensure_loaded(self):
+        if self.pages is not None:
+            return
+        if not self._load():
+            self.pages = self._fetch_pages()
+            # Only a complete snapshot is persisted, so a flaky page is retried next run
+            self.complete = len(self.pages) == HORIZON_DAYS
+            if self.complete:
+                self._save()
+        self._build_index()
+
+    # --- Lookups ---
+
+    def next_earnings_date(self, ticker):
+        """
+        Next confirmed earnings date within T+0..T+7 from Nasdaq, else the (cached)
+        yfinance calendar date. Returns datetime.date or None.
+        """
+        with self.lock:
+            self._ensure_loaded()
+            self.stats['lookups'] += 1
+
+            if ticker in self.index:
+                return self.index[ticker]
+
+            if ticker in self.fallbacks:
+                cached = self.fallbacks[ticker]
+                return datetime.date.fromisoformat(cached) if cached else None
+
+        # Fallback outside the lock (slow network call)
+        print(f"  [Fallback] Using yfinance calendar for {ticker}...")
+        value = self._fallback(ticker)
+        if value is FAILED:
+            return None # Not remembered: a transient error must not hide the date all day
+        with self.lock:
+            self._remember(ticker, value)
+            if self.complete:
+                self._save()
+        return value
+
+    def _fallback(self, ticker):
+        """yfinance next earnings date (a date or None), or FAILED if the lookup raised."""
+        self.stats['fallback_calls'] += 1
+        try:
+            value = self.fallback(ticker)
+        except Exception as e:
+            print(f"  [Fallback Error] {ticker}: {e}")
+            return FAILED
+        return value.date() if isinstance(value, datetime.datetime) else value
+
+    def _remember(self, ticker, value):
+        self.fallbacks[ticker] = value.isoformat() if value else None
+
+    def prefetch(self, tickers):
+        """
+        Loads the snapshot and resolves the yfinance fallback of every ticker not on the
+        Nasdaq pages concurrently, so later next_earnings_date calls are dict lookups.
+        """
+        with self.lock:
+            self._ensure_loaded()
+            missing = [t for t in dict.fromkeys(tickers) if t not in self.index and t not in self.fallbacks]
+        if not missing:
+            return
+        print(f"  [Fallback] Prefetching the yfinance calendar for {len(missing)} tickers...")
+        values = acquire([('yahoo', self._fallback, t) for t in missing])
+        with self.lock:
+            for ticker, value in zip(missing, values):
+                if value is not FAILED:
+                    self._remember(ticker, value)
+            if self.complete:
+                self._save()
+
+_calendar = None
+_calendar_guard = threading.Lock()
+
+def get_earnings_calendar():
+    """Process-wide calendar for today (rebuilt if the process outlives the day)."""
+    global _calendar
+    with _calendar_guard:
+        if _calendar is None or _calendar.today != datetime.date.today():
+            _calendar = EarningsCalendar()
+        return _calendar
@@ -2,19 +2,25 @@ import os
 import sys
 import datetime
 import json
-import requests
 import yfinance as yf
 import pandas as pd
 import numpy as np
 import xgboost as xgb
 from pymongo import MongoClient
 from dotenv import load_dotenv
-from ta.momentum import RSIIndicator
-from ta.trend import SMAIndicator
 import argparse
-import subprocess
-import json
-from fed_data import get_next_fed_date, is_fed_week
+from fed_data import days_until_fed, fed_week_flags
+from bar_cache import get_bar_cache
+from node_adapter import get_adapter_client
+from ticker_pool import run_per_ticker
+from model_registry import get_model_registry, read_model_meta, write_model_meta, IncompatibleModelError
+from macro_context import get_macro_context
+from earnings_calendar import get_earnings_calendar
+from run_trace import start_trace, end_trace, span
+from train_profile import fit_profiled
+from memory_profile import is_lean, LEAN_DTYPE
+from feature_store import get_feature_store
+from acquisition import acquire, get_acquirer
 
 # Load env variables
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
@@ -23,48 +29,13 @@ def fetch_nasdaq_earnings_date(ticker):
     """
     Fetches the NEXT confirmed earnings date from Nasdaq.com (Method 3).
     Falls back to yfinance if Nasdaq fails.
+    Both are answered from the shared daily calendar snapshot (earnings_calendar).
     """
-
-    # 1. Try Nasdaq API
-    try:
-        # Check next 7 days
-        today = datetime.date.today()
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'application/json, text/plain, */*',
-            'Referer': 'https://www.nasdaq.com/'
-        }
-        
-        for i in range(8): # Check T+0 to T+7
-            check_date = today + datetime.timedelta(days=i)
-            date_str = check_date.strftime('%Y-%m-%d')
-            url = f"https://api.nasdaq.com/api/calendar/earnings?date={date_str}"
-            
-            resp = requests.get(url, headers=headers, timeout=5)
-            data = resp.json()
-            
-            if data and data.get('data') and data['data'].get('rows'):
-                for row in data['data']['rows']:
-                    if row.get('symbol') == ticker:
-                        print(f"  [Nasdaq] Confirmed earnings for {ticker} on {date_str}")
-                        return check_date
-                        
-    except Exception as e:
-        print(f"  [Nasdaq Error] {ticker}: {e}")
-
-    # 2. Fallback to YFinance
-    print(f"  [Fallback] Using yfinance calendar for {ticker}...")
-    try:
-        t = yf.Ticker(ticker)
-        cal = t.calendar
-        if isinstance(cal, dict) and 'Earnings Date' in cal:
-            dates = cal['Earnings Date']
-            if dates:
-                return dates[0]
-    except:
-        pass
-        
-    return None
+    calendar = get_earnings_calendar()
+    next_date = calendar.next_earnings_date(ticker)
+    if next_date and ticker in calendar.index:
+        print(f"  [Nasdaq] Confirmed earnings for {ticker} on {next_date}")
+    return next_date
 
 def generate_natural_language_rationale(ticker, direction, top_feature, feature_imp, confidence, macro_trend, sympathy, recent_return, current_macro_rsi, days_until_fed=None):
     """
@@ -180,35 +151,36 @@ def fetch_macro_context():
     """
     Fetches Nasdaq-100 (QQQ) data to determine the global 'Macro Constraint'.
     Returns: DataFrame with 'Macro_Trend_Score' (Slope of SMA20).
+    Served by the shared macro_context provider (computed once per day, cached on disk).
     """
     print("  [Macro] Fetching Nasdaq-100 (QQQ) context...")
-    print("  [Macro] Fetching Nasdaq-100 (QQQ) context...")
-    
-    # Calculate dates for 2y
-    end_date = datetime.datetime.now() + datetime.timedelta(days=1)
-    start_date = end_date - datetime.timedelta(days=730)
-    
-    # Use Node Adapter
-    qqq = fetch_data_from_node_adapter("QQQ", start_date, end_date)
-    
-    if qqq is None:
-        return pd.DataFrame({'Pct_Change': [], 'Macro_Trend': [], 'Macro_RSI': []})
-        
-    # Standardize Column Names if coming from Node adapter (already done inside adapter but let's be safe)
-    # The adapter returns 'Close', 'Open' etc capitalized.
-    
-    # Flatten columns logic is NOT needed for Node adapter dataframe.
-        
-    qqq['Pct_Change'] = qqq['Close'].pct_change()
-    
-    # Macro Trend: Slope of 20-day SMA
-    qqq['SMA_20'] = SMAIndicator(close=qqq['Close'], window=20).sma_indicator()
-    qqq['Macro_Trend'] = qqq['SMA_20'].diff() # Positive = Uptrend, Negative = Downtrend
-    
-    # Macro RSI
-    qqq['Macro_RSI'] = RSIIndicator(close=qqq['Close'], window=14).rsi()
-    
-    return qqq[['Pct_Change', 'Macro_Trend', 'Macro_RSI']]
+    return get_macro_context()
+
+# Past report dates as last fetched, so the backtest can run offline
+EARNINGS_HISTORY_DIR = os.getenv('EARNINGS_HISTORY_DIR', os.path.join(os.path.dirname(__file__), 'cache', 'earnings_history'))
+
+def _earnings_history_path(ticker):
+    return os.path.join(EARNINGS_HISTORY_DIR, f"{ticker.replace('/', '_').replace('^', '_')}.json")
+
+def load_cached_earnings_dates(ticker):
+    """Historical report dates saved by get_historical_earnings_dates ([] if never fetched)."""
+    try:
+        with open(_earnings_history_path(ticker)) as f:
+            return [pd.Timestamp(d) for d in json.load(f)]
+    except (OSError, ValueError):
+        return []
+
+def _save_earnings_dates(ticker, dates):
+    try:
+        os.makedirs(EARNINGS_HISTORY_DIR, exist_ok=True)
+        # Merge with what's stored: yfinance only returns the recent quarters
+        merged = sorted({d.normalize() for d in dates} | {d.normalize() for d in load_cached_earnings_dates(ticker)}, reverse=True)
+        tmp = _earnings_history_path(ticker) + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump([str(d.date()) for d in merged], f)
+        os.replace(tmp, _earnings_history_path(ticker))
+    except OSError as e:
+        print(f"  [Warning] Could not cache earnings dates for {ticker}: {e}")
 
 def get_historical_earnings_dates(ticker):
     """
@@ -229,6 +201,7 @@ def get_historical_earnings_dates(ticker):
             dates_df.index = dates_df.index.tz_localize(None)
             
         past_dates = dates_df[dates_df.index < now].index.sort_values(ascending=False).tolist()
+        _save_earnings_dates(ticker, past_dates)
         # Keep recent 8 quarters for relevance
         return past_dates[:8]
     except Exception as e:
@@ -251,104 +224,159 @@ def fetch_next_earnings_date(ticker):
         print(f"  [Calendar Error] {ticker}: {e}")
     return None
 
-def get_peer_sympathy_score(ticker):
-    peers = PEER_GROUPS.get(ticker, [])
-    score = 0.0
-    if not peers: return 0.0
-    
-    for peer in peers:
-        try:
-            # 5 days check
-            end_date = datetime.datetime.now() + datetime.timedelta(days=1)
-            start_date = end_date - datetime.timedelta(days=10) # Ask for 10 to be safe for 5 trading days
-            
-            data = fetch_data_from_node_adapter(peer, start_date, end_date)
-            
-            if data is None or data.empty: continue
-            
-            # Flatten columns NOT needed.
-            
-            cum_ret = (data['Close'].iloc[-1] / data['Close'].iloc[0]) - 1
-            if cum_ret > 0.04: score += 1.0
-            elif cum_ret < -0.04: score -= 1.0
-        except: continue
-    return score
+SYMPATHY_LOOKBACK_DAYS = 10 # Ask for 10 to be safe for 5 trading days
+SYMPATHY_THRESHOLD = 0.04
+
+def build_peer_return_matrix(tickers, lookback_days=SYMPATHY_LOOKBACK_DAYS):
+    """
+    Fetches the union of all peers of `tickers` once (concurrently through the
+    acquisition layer, via the bar cache) and returns a dense peer x day matrix of daily log returns.
+    """
+    peers = sorted({p for t in tickers for p in PEER_GROUPS.get(t, [])})
+    if not peers:
+        return pd.DataFrame()
+
+    end_date = datetime.datetime.now() + datetime.timedelta(days=1)
+    start_date = end_date - datetime.timedelta(days=lookback_days)
+
+    frames = acquire([('adapter', fetch_data_from_node_adapter, p, start_date, end_date) for p in peers])
+
+    closes = pd.DataFrame({
+        peer: df['Close'] for peer, df in zip(peers, frames) if df is not None and not df.empty
+    })
+    print(f"  [Sympathy] Return matrix: {closes.shape[1]}/{len(peers)} peers x {len(closes)} days.")
+    # Forward-fill interior gaps so each row's returns telescope to log(last / first)
+    log_returns = np.log(closes.ffill()).diff().iloc[1:]
+    return log_returns.T
+
+def compute_sympathy_scores(tickers, return_matrix, threshold=SYMPATHY_THRESHOLD):
+    """
+    Vectorized sympathy: +1 per peer up more than `threshold` over the window,
+    -1 per peer down more than it. Returns {ticker: score}.
+    """
+    tickers = list(tickers)
+    if return_matrix.empty:
+        return {t: 0.0 for t in tickers}
+
+    peers = list(return_matrix.index)
+    cum_ret = np.expm1(np.nansum(return_matrix.to_numpy(), axis=1))
+    signal = (cum_ret > threshold).astype(float) - (cum_ret < -threshold).astype(float)
+
+    # Membership matrix: ticker x peer
+    col = {p: j for j, p in enumerate(peers)}
+    membership = np.zeros((len(tickers), len(peers)))
+    for i, t in enumerate(tickers):
+        for p in PEER_GROUPS.get(t, []):
+            if p in col:
+                membership[i, col[p]] = 1.0
+
+    return dict(zip(tickers, (membership @ signal).tolist()))
+
+def get_peer_sympathy_score(ticker, return_matrix=None):
+    if not PEER_GROUPS.get(ticker): return 0.0
+    if return_matrix is None:
+        return_matrix = build_peer_return_matrix([ticker])
+    return compute_sympathy_scores([ticker], return_matrix)[ticker]
 
 def fetch_data_from_node_adapter(ticker, start_date, end_date):
     """
-    Calls the Node.js script to fetch data via yahoo-finance2.
+    Fetches daily bars through the persistent bar cache; only the date range not
+    already on disk is requested from the shared Node adapter worker.
     Returns: DataFrame
     """
-    script_path = os.path.join(os.path.dirname(__file__), 'fetch_stock_history.js')
-    
-    # Format dates for CLI (ISO strings preferred by wrapper)
-    # The wrapper likely expects "YYYY-MM-DD" or similar.
-    # Our wrapper accepts raw strings.
-    s_str = start_date.strftime('%Y-%m-%d')
-    e_str = end_date.strftime('%Y-%m-%d')
-    
     try:
-        # Call Node script
-        cmd = ['node', script_path, ticker, s_str, e_str]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        
-        # Parse output
-        data = json.loads(result.stdout)
-        
-        if not data or 'error' in data:
-            print(f"  [Node Adapter Error] {data}")
-            return None
-            
-        # Convert to DataFrame
-        df = pd.DataFrame(data)
-        
-        # Ensure column names map to capitalized (yfinance style)
-        # Node returns: date, open, high, low, close, volume, adjClose...
-        df.rename(columns={
-            'date': 'Date',
-            'open': 'Open',
-            'high': 'High',
-            'low': 'Low',
-            'close': 'Close',
-            'volume': 'Volume'
-        }, inplace=True)
-        
-        # Set Index
-        df['Date'] = pd.to_datetime(df['Date'])
-        df.set_index('Date', inplace=True)
-        # Sort to ensure chronological order (Crucial step missed previously)
-        df.sort_index(inplace=True)
-        
-        # Remove timezone if present/ambiguous, assuming Node returns UTC ISO
-        if df.index.tz is not None:
-             df.index = df.index.tz_convert(None)
-        else:
-             # If naive, leave it.
-             pass
-
-        return df
-        
+        return get_bar_cache().get_bars(ticker, start_date, end_date, '1d', get_adapter_client().fetch)
     except Exception as e:
         print(f"  [Node Adapter Exception] {e}")
-        # Only print stderr if available
-        # print(e.stderr if hasattr(e, 'stderr') else "")
         return None
 
-def prepare_scientific_features(ticker, macro_data, days_until_earnings, period="2y"):
+def build_scientific_features(df, macro_data):
+    """
+    Feature frame X_t (plus the Y_Target label) from daily bars and the macro frame.
+    Rows at the end keep a NaN Y_Target (their 5-day outcome isn't known yet).
+    In lean pipeline mode df is left untouched and only Close, FEATURE_COLS and
+    Y_Target are returned, as float32.
+    """
+    lean = is_lean()
+    if lean:
+        df = pd.DataFrame({'Close': df['Close']})
+
+    # 1. Base Technicals
+    df['Returns'] = df['Close'].pct_change()
+    df['Ret_Lag1'] = df['Returns'].shift(1)
+    # ... (rest of features)
+
+    # NEW: Days Until Earnings Feature
+    # We fill this as a constant for the training set (approximated as 'near earnings')
+    # Or better: construct it dynamically? For simplicity in this event-driven model,
+    # we treat the training window as "Pre-Earnings" (Small Days Until).
+    # But for the CURRENT inference row, we set it explicitly.
+    df['Days_Until'] = 14 # Default for history (avg of 0-14)
+
+    # ... feature engineering ...
+    df['Ret_Lag2'] = df['Returns'].shift(2)
+    df['Ret_Lag3'] = df['Returns'].shift(3)
+
+    # 2. Volatility Mean Reversion (V_rev)
+    df['Vol_5d'] = df['Returns'].rolling(5).std()
+    df['V_rev'] = df['Ret_Lag1'] * df['Vol_5d']
+
+    # 3. Hype Factor (Cumulative Abnormal Return)
+    # Merge Macro Data (Date Match)
+    if df.index.tz is not None: df.index = df.index.tz_localize(None)
+    # macro_data is shared across workers: never mutate it in place
+    if macro_data.index.tz is not None: macro_data = macro_data.tz_localize(None)
+
+    df = df.join(macro_data, how='left') # Joins Pct_Change as Market_Ret (needs rename if colliding)
+    # Rename macro cols for clarity if needed, but here assuming unique names from fetch_macro_context
+
+    # Abnormal Return = Stock Ret - Macro Ret (QQQ)
+    df['Abnormal_Ret'] = df['Returns'] - df['Pct_Change']
+    df['Hype_Factor'] = df['Abnormal_Ret'].rolling(window=30).sum()
+    if lean:
+        df.drop(columns=['Returns', 'Abnormal_Ret', 'Pct_Change'], inplace=True)
+
+    # 4. Target: 5-Day Forward Return
+    df['Y_Target'] = df['Close'].shift(-5) / df['Close'] - 1
+
+    # 5. Sympathy (Placeholder for history, filled for inference)
+    df['Sympathy'] = 0.0
+
+    # 6. Fed Data Feature (New)
+    df['Days_Until_Fed'] = days_until_fed(df.index)
+    df['Is_Fed_Week'] = fed_week_flags(df.index, window=7)
+
+    # Drop NaNs generated by shifting features (Beginning of history), 
+    # BUT keep the end rows where Y_Target is NaN (Critical for Inference!)
+    df.dropna(subset=['Ret_Lag3', 'Vol_5d', 'Hype_Factor', 'Macro_RSI', 'Days_Until_Fed'], inplace=True)
+    if lean:
+        return df[['Close'] + FEATURE_COLS + ['Y_Target']].astype(LEAN_DTYPE)
+    return df
+
+def history_range(period="2y"):
+    # Force explicit date range to ensure freshness
+    end_date = datetime.datetime.now() + datetime.timedelta(days=1)
+    start_date = end_date - datetime.timedelta(days=730 if period=="2y" else 365)
+    return start_date, end_date
+
+def prepare_scientific_features(ticker, macro_data, days_until_earnings, period="2y", prefetched=None):
     """
     Constructs the rigorous feature vector X_t.
     Includes Days_Until_Earnings as a feature.
+    prefetched: {'bars', 'earnings_dates'} from prefetch_universe (skips both fetches).
     """
     try:
         stock = yf.Ticker(ticker)
-        # Force explicit date range to ensure freshness
-        end_date = datetime.datetime.now() + datetime.timedelta(days=1)
-        start_date = end_date - datetime.timedelta(days=730 if period=="2y" else 365)
+        start_date, end_date = history_range(period)
         
-        print(f"  [Data Fetch] {ticker} | Start: {start_date.date()} | End: {end_date.date()}")
-        
-        # call Node Adapter
-        df = fetch_data_from_node_adapter(ticker, start_date, end_date)
+        if prefetched is not None:
+            df = prefetched['bars']
+        else:
+            print(f"  [Data Fetch] {ticker} | Start: {start_date.date()} | End: {end_date.date()}")
+            
+            # call Node Adapter
+            with span('fetch', ticker):
+                df = fetch_data_from_node_adapter(ticker, start_date, end_date)
         
         # Flatten MultiIndex NOT needed for Node adapter (it returns flat)
         # but keep logic if we revert? No, simple is better.
@@ -357,54 +385,14 @@ def prepare_scientific_features(ticker, macro_data, days_until_earnings, period=
 
         if df.empty or len(df) < 50: return None, None, [], None
 
-        # 1. Base Technicals
-        df['Returns'] = df['Close'].pct_change()
-        df['Ret_Lag1'] = df['Returns'].shift(1)
-        # ... (rest of features)
-
-        # NEW: Days Until Earnings Feature
-        # We fill this as a constant for the training set (approximated as 'near earnings')
-        # Or better: construct it dynamically? For simplicity in this event-driven model,
-        # we treat the training window as "Pre-Earnings" (Small Days Until).
-        # But for the CURRENT inference row, we set it explicitly.
-        df['Days_Until'] = 14 # Default for history (avg of 0-14)
-        
-        # ... feature engineering ...
-        df['Ret_Lag2'] = df['Returns'].shift(2)
-        df['Ret_Lag3'] = df['Returns'].shift(3)
-        
-        # 2. Volatility Mean Reversion (V_rev)
-        df['Vol_5d'] = df['Returns'].rolling(5).std()
-        df['V_rev'] = df['Ret_Lag1'] * df['Vol_5d']
-        
-        # 3. Hype Factor (Cumulative Abnormal Return)
-        # Merge Macro Data (Date Match)
-        if df.index.tz is not None: df.index = df.index.tz_localize(None)
-        if macro_data.index.tz is not None: macro_data.index = macro_data.index.tz_localize(None)
-        
-        df = df.join(macro_data, how='left') # Joins Pct_Change as Market_Ret (needs rename if colliding)
-        # Rename macro cols for clarity if needed, but here assuming unique names from fetch_macro_context
-        
-        # Abnormal Return = Stock Ret - Macro Ret (QQQ)
-        df['Abnormal_Ret'] = df['Returns'] - df['Pct_Change']
-        df['Hype_Factor'] = df['Abnormal_Ret'].rolling(window=30).sum()
-        
-        # 4. Target: 5-Day Forward Return
-        df['Y_Target'] = df['Close'].shift(-5) / df['Close'] - 1
-        
-        # 5. Sympathy (Placeholder for history, filled for inference)
-        df['Sympathy'] = 0.0
-        
-        # 6. Fed Data Feature (New)
-        df['Days_Until_Fed'] = df.index.to_series().apply(lambda d: (get_next_fed_date(d.date()) - d.date()).days if get_next_fed_date(d.date()) else 99)
-        df['Is_Fed_Week'] = df['Days_Until_Fed'].apply(lambda x: 1 if x <= 7 else 0)
-
-        # Drop NaNs generated by shifting features (Beginning of history), 
-        # BUT keep the end rows where Y_Target is NaN (Critical for Inference!)
-        df.dropna(subset=['Ret_Lag3', 'Vol_5d', 'Hype_Factor', 'Macro_RSI', 'Days_Until_Fed'], inplace=True)
+        df = build_scientific_features(df, macro_data)
         
         # Fetch Event Dates for Filtering
-        earnings_dates = get_historical_earnings_dates(ticker)
+        if prefetched is not None:
+            earnings_dates = prefetched['earnings_dates']
+        else:
+            with span('calendar', ticker, source='earnings_history'):
+                earnings_dates = get_historical_earnings_dates(ticker)
         
         return df, stock, earnings_dates, macro_data
         
@@ -412,38 +400,119 @@ def prepare_scientific_features(ticker, macro_data, days_until_earnings, period=
         print(f"Error prepping {ticker}: {e}")
         return None, None, [], None
 
-def save_model(model, ticker):
+MODELS_DIR = os.path.join(os.path.dirname(__file__), 'models')
+
+# Model inputs, in training order (saved in each model's sidecar and checked at load)
+FEATURE_COLS = ['Ret_Lag1', 'Ret_Lag2', 'V_rev', 'Vol_5d', 'Hype_Factor', 'Macro_Trend', 'Macro_RSI', 'Sympathy', 'Days_Until', 'Days_Until_Fed']
+
+# Scientific frame rows with a known 5-day outcome, kept in the feature store for the
+# backtest. An update featurizes only the last STORE_TAIL_BARS bars up to the stored
+# end (enough to warm up the 30-bar Hype_Factor); if the last STORE_CHECK_ROWS stored
+# rows don't come out the same (restated bars or macro), the frame is rebuilt.
+SCIENTIFIC_SET = 'sigma_alpha'
+SCIENTIFIC_COLUMNS = ['Close'] + FEATURE_COLS + ['Y_Target']
+STORE_TAIL_BARS = 60
+STORE_CHECK_ROWS = 10
+
+def update_scientific_store(ticker, bars, macro_data):
+    """
+    Brings the ticker's stored scientific rows up to the settled bars (all but the last,
+    which may still be forming). Returns the stored row count.
+    """
+    store = get_feature_store()
+    if bars is None or len(bars) < 2:
+        return 0
+    bars = bars.iloc[:-1]
+    if bars.index.tz is not None: bars = bars.tz_localize(None)
+
+    def known_rows(b):
+        # Lean mode builds from a Close-only frame and leaves the bars alone
+        frame = build_scientific_features(b if is_lean() else b.copy(), macro_data)
+        return frame[frame['Y_Target'].notna()]
+
+    with store.lock_for(SCIENTIFIC_SET, ticker):
+        entry = store.entry(SCIENTIFIC_SET, SCIENTIFIC_COLUMNS, ticker)
+        new = None
+        if entry and entry['rows']:
+            end = pd.Timestamp(entry['end'])
+            pos = bars.index.searchsorted(end)
+            if pos < len(bars) and bars.index[pos] == end and pos >= STORE_TAIL_BARS:
+                tail = known_rows(bars.iloc[pos - STORE_TAIL_BARS:])
+                check = tail[tail.index <= end].iloc[-STORE_CHECK_ROWS:]
+                if len(check):
+                    _, stored = store.read(SCIENTIFIC_SET, SCIENTIFIC_COLUMNS, ticker, start=check.index[0])
+                    fresh = check[SCIENTIFIC_COLUMNS].to_numpy(dtype=stored.dtype)
+                    if stored.shape == fresh.shape and np.allclose(stored, fresh, rtol=1e-5, atol=1e-7, equal_nan=True):
+                        new = tail[tail.index > end]
+        append = new is not None
+        if not append:
+            new = known_rows(bars)
+        return store.write(SCIENTIFIC_SET, SCIENTIFIC_COLUMNS, ticker, new.index, new[SCIENTIFIC_COLUMNS].to_numpy(), append=append)
+
+# Refresh mode: a few boosting rounds on the rows since the model's training cutoff,
+# and a full retrain once the last one is FULL_RETRAIN_DAYS old or the new rows drift:
+# the model's error on them is above DRIFT_RATIO x the error of a flat (0%) forecast
+# over its training history (target_rms in the sidecar).
+REFRESH_ROUNDS = int(os.getenv('QUANT_REFRESH_ROUNDS', '10'))
+MIN_REFRESH_ROWS = 10 # About one pre-earnings window; fewer new rows wait for the next run
+FULL_RETRAIN_DAYS = int(os.getenv('QUANT_FULL_RETRAIN_DAYS', '90'))
+DRIFT_RATIO = float(os.getenv('QUANT_DRIFT_RATIO', '1.5'))
+
+def get_model_path(ticker):
+    return os.path.join(MODELS_DIR, f"{ticker}_xgb.json")
+
+def save_model(model, ticker, train_end=None, **meta):
     try:
-        model_dir = os.path.join(os.path.dirname(__file__), 'models')
-        if not os.path.exists(model_dir):
-            os.makedirs(model_dir)
-        path = os.path.join(model_dir, f"{ticker}_xgb.json")
+        if not os.path.exists(MODELS_DIR):
+            os.makedirs(MODELS_DIR)
+        path = get_model_path(ticker)
         model.save_model(path)
+        write_model_meta(path, FEATURE_COLS, train_end=train_end, **meta)
+        get_model_registry().put(path, model, FEATURE_COLS)
         print(f"  [Persistence] Saved model to {path}")
     except Exception as e:
         print(f"  [Persistence Error] Could not save {ticker}: {e}")
 
 def load_model(ticker):
     try:
-        path = os.path.join(os.path.dirname(__file__), 'models', f"{ticker}_xgb.json")
-        if os.path.exists(path):
-            model = xgb.XGBRegressor()
-            model.load_model(path)
+        path = get_model_path(ticker)
+        model = get_model_registry().get(path, features=FEATURE_COLS, job={'engine': 'quant', 'ticker': ticker})
+        if model is not None:
             print(f"  [Persistence] Loaded brain for {ticker}")
             return model
+    except IncompatibleModelError as e:
+        print(f"  [Persistence] Brain for {ticker} is outdated ({e.reason}); queued for retraining.")
     except Exception as e:
         print(f"  [Persistence Error] Could not load {ticker}: {e}")
     return None
 
-def train_event_driven_model(ticker, df, earnings_dates, current_model=None):
+def model_params(n_jobs=None, n_estimators=200):
+    return dict(
+        objective='reg:squarederror',
+        n_estimators=n_estimators,
+        learning_rate=0.02, 
+        max_depth=5,
+        reg_lambda=1.0, 
+        random_state=42,
+        n_jobs=n_jobs
+    )
+
+def fit_metrics(model, X, y):
+    """(RMSE, directional accuracy %) of model on X, y."""
+    # Calc Training Error (RMSE)
+    preds = model.predict(X)
+    rmse = np.sqrt(np.mean((y - preds)**2))
+    
+    # NEW: Directional Accuracy
+    correct_direction = np.sign(y) == np.sign(preds)
+    accuracy = np.mean(correct_direction) * 100.0 # Percentage
+    return float(rmse), float(accuracy)
+
+def mark_event_windows(df, earnings_dates):
     """
-    Trains XGBoost ONLY on 'Pre-Earnings Windows' (Event-Driven Constraint).
-    Refines 'Days_Until' logic.
+    Boolean mask of the rows in a 14-day pre-earnings window (Days_Until is set on them).
+    Returns (mask, number of events with rows in df).
     """
-    # 0. Ensure clean data (Drop NaNs in Y_Target which are preserved for Inference)
-    df.dropna(inplace=True)
-    
-    # 1. Filter Data Mask & Refine Days_Until
     mask = pd.Series(False, index=df.index)
     events_found = 0
     
@@ -472,29 +541,49 @@ def train_event_driven_model(ticker, df, earnings_dates, current_model=None):
             days_diff = (edate - df.index[window_mask]).days
             df.loc[window_mask, 'Days_Until'] = days_diff
 
+    return mask, events_found
+
+MIN_EVENT_ROWS = 20 # Below this, the models train on the last 250 rows instead of the event windows
+
+def training_mask(df, earnings_dates):
+    """
+    Rows the event-driven model trains on: the pre-earnings windows, or every row when
+    there are fewer than MIN_EVENT_ROWS of them. Returns (mask, number of events).
+    """
+    mask, events_found = mark_event_windows(df, earnings_dates)
+    if mask.sum() < MIN_EVENT_ROWS:
+        return pd.Series(True, index=df.index), events_found
+    return mask, events_found
+
+def train_event_driven_model(ticker, df, earnings_dates, current_model=None, n_jobs=None):
+    """
+    Trains XGBoost ONLY on 'Pre-Earnings Windows' (Event-Driven Constraint).
+    Refines 'Days_Until' logic.
+    """
+    # 0. Ensure clean data (Drop NaNs in Y_Target which are preserved for Inference)
+    df.dropna(inplace=True)
+    
+    # 1. Filter Data Mask & Refine Days_Until
+    mask, events_found = mark_event_windows(df, earnings_dates)
+
     training_df = df[mask].copy()
     
-    if len(training_df) < 20:
+    if len(training_df) < MIN_EVENT_ROWS:
         print(f"  [Insufficient Event Data] Found {events_found} events, {len(training_df)} rows. Fallback to full history.")
         training_df = df.iloc[-250:]
     else:
         print(f"  [Event-Driven Mode] Training on {len(training_df)} rows across {events_found} historical earnings windows.")
 
     # Features
-    feature_cols = ['Ret_Lag1', 'Ret_Lag2', 'V_rev', 'Vol_5d', 'Hype_Factor', 'Macro_Trend', 'Macro_RSI', 'Sympathy', 'Days_Until', 'Days_Until_Fed']
+    feature_cols = FEATURE_COLS
     X = training_df[feature_cols]
     y = training_df['Y_Target']
     
-    model = xgb.XGBRegressor(
-        objective='reg:squarederror',
-        n_estimators=200,
-        learning_rate=0.02, 
-        max_depth=5,
-        reg_lambda=1.0, 
-        random_state=42
-    )
-    
-    model.fit(X, y, xgb_model=current_model)
+    if current_model is None:
+        model, _ = fit_profiled(model_params(n_jobs), X, y, label=ticker)
+    else:
+        model = xgb.XGBRegressor(**model_params(n_jobs))
+        model.fit(X, y, xgb_model=current_model)
     
     # Logging Feature Importance
     importances = model.feature_importances_
@@ -502,101 +591,356 @@ def train_event_driven_model(ticker, df, earnings_dates, current_model=None):
     top_3 = [(feature_cols[i], importances[i]) for i in sorted_idx[:3]]
     print(f"  [Model Logic] Top Features: {top_3}")
     
-    # Calc Training Error (RMSE)
-    preds = model.predict(X)
-    rmse = np.sqrt(np.mean((y - preds)**2))
+    rmse, accuracy = fit_metrics(model, X, y)
     
-    # NEW: Directional Accuracy
-    correct_direction = np.sign(y) == np.sign(preds)
-    accuracy = np.mean(correct_direction) * 100.0 # Percentage
-    
-    return model, rmse, accuracy, feature_cols
-def run_quant_model(mode='inference', specific_ticker=None):
-    user_id = get_quant_user_id()
-    if not user_id: return
+    # Cutoff: the last labelled row considered (rows outside the event windows included)
+    return model, rmse, accuracy, feature_cols, df.index.max()
 
-    print(f"\n=== Sigma Alpha Scientific Engine (v3.0 - {mode.capitalize()} Mode) ===")
-    
-    # 1. Fetch Global Macro Context
-    macro_data = fetch_macro_context()
-    if not macro_data.empty:
-        current_macro_trend = macro_data['Macro_Trend'].iloc[-1]
-        current_macro_rsi = macro_data['Macro_RSI'].iloc[-1]
-    else:
-        current_macro_trend = 0
-        current_macro_rsi = 50
-        
-    print(f"  [Macro State] QQQ Trend: {current_macro_trend:.4f} | RSI: {current_macro_rsi:.1f}")
+def target_rms(df):
+    """RMSE of a flat 0% forecast over the labelled rows (the drift baseline)."""
+    return float(np.sqrt(np.mean(df['Y_Target'].dropna() ** 2)))
 
-    avg_accuracy = 0
-    processed_count = 0
-    
-    tickers_to_process = [specific_ticker] if specific_ticker else PEER_GROUPS.keys()
-    
-    for ticker in tickers_to_process:
-        try:
-            print(f"\n>> Analyzing {ticker}...")
-            
-            # 2A. Precision Scheduling (Calendar Gatekeeper)
+MAX_DAILY_MOVE = 0.05 # 5% limit for daily predictions
+
+def apply_safety_clamps(predictions, days_to_fed, daily):
+    """
+    SAFETY CLAMPS (Tuning v3.1), vectorized:
+    1. Fed Risk Dampener: halve the signal with a Fed decision within a day.
+    2. Max Daily Move Constraint (Prevent Outliers like 18%).
+    """
+    predictions = np.where(np.asarray(days_to_fed) <= 1, np.asarray(predictions, dtype='float64') * 0.5, predictions)
+    return np.where(daily, np.clip(predictions, -MAX_DAILY_MOVE, MAX_DAILY_MOVE), predictions)
+
+def plan_refresh(meta, today=None):
+    """('incremental' | 'full', reason) for a model with sidecar meta (None: no model)."""
+    today = today or datetime.date.today()
+    if not meta or not meta.get('train_end') or not meta.get('full_trained_at'):
+        return 'full', 'no refreshable model'
+    age = (today - datetime.date.fromisoformat(meta['full_trained_at'][:10])).days
+    if age >= FULL_RETRAIN_DAYS:
+        return 'full', f"last full retrain {age} days ago"
+    return 'incremental', f"{meta.get('refreshes', 0)} refreshes since last full retrain"
+
+def refresh_event_driven_model(ticker, df, earnings_dates, current_model, meta, n_jobs=None):
+    """
+    Warm start: REFRESH_ROUNDS more trees on top of current_model, fitted only on the
+    labelled rows after meta['train_end'] that a full fit would train on (pre-earnings
+    windows, see training_mask). Returns (model, rmse, accuracy, train_end), None if
+    there are fewer than MIN_REFRESH_ROWS such rows (train_end stays, so they add up
+    over runs), or 'drift' if current_model misses them badly.
+    """
+    df.dropna(inplace=True)
+    mask, _ = training_mask(df, earnings_dates)
+    new_rows = df[mask & (df.index > pd.Timestamp(meta['train_end']))]
+    if len(new_rows) < MIN_REFRESH_ROWS:
+        print(f"  [Refresh] {len(new_rows)} new training rows since {meta['train_end']} (need {MIN_REFRESH_ROWS}). Skipping.")
+        return None
+
+    X, y = new_rows[FEATURE_COLS], new_rows['Y_Target']
+    rmse_before, _ = fit_metrics(current_model, X, y)
+    if meta.get('target_rms') and rmse_before > DRIFT_RATIO * meta['target_rms']:
+        print(f"  [Drift] RMSE on new rows {rmse_before:.4f} vs flat-forecast {meta['target_rms']:.4f} in training.")
+        return 'drift'
+
+    model = xgb.XGBRegressor(**model_params(n_jobs, n_estimators=REFRESH_ROUNDS))
+    model.fit(X, y, xgb_model=current_model.get_booster())
+    rmse, accuracy = fit_metrics(model, X, y)
+    print(f"  [Refresh] +{REFRESH_ROUNDS} rounds on {len(new_rows)} rows since {meta['train_end']} (RMSE {rmse_before:.4f} -> {rmse:.4f}).")
+    return model, rmse, accuracy, df.index.max()
+
+# Days before a report that get an inference run (T-7: Weekly, T-5..T-1: Daily)
+INFERENCE_DAYS = (7, 5, 4, 3, 2, 1)
+
+def prefetch_universe(tickers, mode):
+    """
+    Fetches everything process_ticker needs for the whole universe up front through the
+    acquisition layer: calendar (Nasdaq pages + yfinance fallbacks), then bars and report
+    history for every ticker that will actually run (in inference: T-7 / T-5..T-1).
+    Returns {ticker: {'bars', 'earnings_dates'}} for process_ticker(prefetched=...).
+    """
+    t0 = datetime.datetime.now()
+    calendar = get_earnings_calendar()
+    calendar.prefetch(tickers)
+    today = datetime.date.today()
+    active = []
+    for ticker in tickers:
+        next_date = calendar.next_earnings_date(ticker)
+        if isinstance(next_date, datetime.datetime):
+            next_date = next_date.date()
+        if next_date and (mode != 'inference' or (next_date - today).days in INFERENCE_DAYS):
+            active.append(ticker)
+
+    start_date, end_date = history_range("1y" if mode == 'inference' else "2y")
+    results = acquire([('adapter', fetch_data_from_node_adapter, t, start_date, end_date) for t in active] +
+                      [('yahoo', get_historical_earnings_dates, t) for t in active])
+    n = len(active)
+    elapsed = (datetime.datetime.now() - t0).total_seconds()
+    print(f"  [Prefetch] {n}/{len(tickers)} tickers active; bars and report history fetched in {elapsed:.1f}s.")
+    return {t: {'bars': results[i], 'earnings_dates': results[n + i] or []} for i, t in enumerate(active)}
+
+def process_ticker(ticker, mode, user_id, macro_data, current_macro_trend, current_macro_rsi, n_jobs=None, sympathy_scores=None, prefetched=None):
+    """
+    Full per-ticker pipeline: calendar gate -> data -> features -> train/predict -> db write.
+    Returns the training accuracy in train mode, None otherwise.
+    prefetched: this ticker's entry from prefetch_universe, if the run prefetched.
+    """
+    try:
+        print(f"\n>> Analyzing {ticker}...")
+        
+        # 2A. Precision Scheduling (Calendar Gatekeeper)
+        with span('calendar', ticker):
             next_earnings_date = fetch_nasdaq_earnings_date(ticker)
+        
+        # Default Logic: If no date found, skip (Strict Mode)
+        if not next_earnings_date:
+            print("  [Schedule] No upcoming earnings date found. Skipping.")
+            return None
             
-            # Default Logic: If no date found, skip (Strict Mode)
-            if not next_earnings_date:
-                print("  [Schedule] No upcoming earnings date found. Skipping.")
-                continue
-                
-            # Calc Days Until
-            today = datetime.date.today()
-            if isinstance(next_earnings_date, datetime.datetime):
-                 next_earnings_date = next_earnings_date.date()
-                 
-            days_until = (next_earnings_date - today).days
-            print(f"  [Schedule] Next Earnings: {next_earnings_date} (T-{days_until})")
-            
-            # INFERENCE MODE GATES
-            if mode == 'inference':
-                if days_until > 7 and days_until != 14:
-                     pass # We continue to check specific windows below
-
-                # Prediction Type Logic
+        # Calc Days Until
+        today = datetime.date.today()
+        if isinstance(next_earnings_date, datetime.datetime):
+             next_earnings_date = next_earnings_date.date()
+             
+        days_until = (next_earnings_date - today).days
+        print(f"  [Schedule] Next Earnings: {next_earnings_date} (T-{days_until})")
+        
+        # INFERENCE MODE GATES
+        if mode == 'inference':
+            if days_until > 7 and days_until != 14:
+                 pass # We continue to check specific windows below
+
+            # Prediction Type Logic
+            prediction_type = "Daily"
+            if days_until == 7:
+                print("  [Schedule] T-7 Detected. Generating Weekly Prediction.")
+                prediction_type = "Weekly"
+            elif days_until in [5, 4, 3, 2, 1]:
+                print(f"  [Schedule] T-{days_until} Detected. Generating Daily Prediction.")
                 prediction_type = "Daily"
-                if days_until == 7:
-                    print("  [Schedule] T-7 Detected. Generating Weekly Prediction.")
-                    prediction_type = "Weekly"
-                elif days_until in [5, 4, 3, 2, 1]:
-                    print(f"  [Schedule] T-{days_until} Detected. Generating Daily Prediction.")
-                    prediction_type = "Daily"
-                elif days_until == 14:
-                    # Optional: Early Warning
-                    pass
+            elif days_until == 14:
+                # Optional: Early Warning
+                pass
+            else:
+                print(f"  [Schedule] T-{days_until} is outside active inference window. Skipping.")
+                return None
+        
+        # 2B. Data Acquisition
+        fetch_period = "1y" if mode == 'inference' else "2y"
+        with span('featurize', ticker):
+            df, stock_obj, e_dates, _ = prepare_scientific_features(ticker, macro_data, days_until, period=fetch_period, prefetched=prefetched)
+        
+        if df is None:
+            print("  [Error] Insufficient data. Skipping.")
+            return None
+
+        print(f"  [Data Debug] {ticker} | Last Date: {df.index[-1].date()} | Close: {df['Close'].iloc[-1]:.2f}")
+
+        # 3. Mode Branching
+        with span('load_model', ticker):
+            brain = load_model(ticker)
+        
+        if mode == 'refresh':
+            # REFRESH MODE: warm start between full retrains
+            meta = read_model_meta(get_model_path(ticker)) if brain else None
+            plan, reason = plan_refresh(meta)
+            if plan == 'incremental':
+                with span('train', ticker, kind='incremental'):
+                    result = refresh_event_driven_model(ticker, df, e_dates, brain, meta, n_jobs=n_jobs)
+                if result is None:
+                    return None
+                if result == 'drift':
+                    reason = 'drift on new rows'
                 else:
-                    print(f"  [Schedule] T-{days_until} is outside active inference window. Skipping.")
-                    continue
+                    model, rmse, accuracy, train_end = result
+                    with span('save_model', ticker):
+                        save_model(model, ticker, train_end=train_end, rmse=rmse, target_rms=meta.get('target_rms'),
+                                   full_trained_at=meta['full_trained_at'], refreshes=meta.get('refreshes', 0) + 1)
+                    return accuracy
+            print(f"  [Refresh] Full retrain ({reason}).")
+        
+        if mode in ('train', 'refresh'):
+            # TRAIN MODE
+            print("  [Mode] Starting Full Retraining...")
+            with span('train', ticker):
+                model, rmse, accuracy, features, train_end = train_event_driven_model(ticker, df, e_dates, current_model=None, n_jobs=n_jobs)
+            # Save the updated brain
+            with span('save_model', ticker):
+                save_model(model, ticker, train_end=train_end, rmse=rmse, target_rms=target_rms(df),
+                           full_trained_at=datetime.datetime.now().isoformat(timespec='seconds'), refreshes=0)
+            return accuracy
+            
+        elif mode == 'inference':
+            # INFERENCE MODE
+            if not brain:
+                print("  [Mode] No Brain found. Skipping inference (Cluster must be trained first).")
+                return None
+                
+            model = brain
+            features = FEATURE_COLS
             
-            # 2B. Data Acquisition
-            fetch_period = "2y" if mode == 'train' else "1y"
-            df, stock_obj, e_dates, _ = prepare_scientific_features(ticker, macro_data, days_until, period=fetch_period)
+            # Predict on LATEST row
+            X_live = df.iloc[[-1]][features]
+            current_price = df.iloc[-1]['Close']
             
-            if df is None:
-                print("  [Error] Insufficient data. Skipping.")
-                continue
+            with span('predict', ticker):
+                prediction_val = model.predict(X_live)[0]
 
-            print(f"  [Data Debug] {ticker} | Last Date: {df.index[-1].date()} | Close: {df['Close'].iloc[-1]:.2f}")
+            # --- SAFETY CLAMPS (Tuning v3.1) ---
+            days_to_fed = X_live['Days_Until_Fed'].values[0]
+            if days_to_fed <= 1:
+                print(f"  [Risk] Fed Decision in {days_to_fed} days. Dampening signal by 50%.")
+            dampened = prediction_val * (0.5 if days_to_fed <= 1 else 1.0)
+            prediction_val = float(apply_safety_clamps(prediction_val, days_to_fed, prediction_type == "Daily"))
+            if prediction_val != dampened:
+                print(f"  [Clamp] Predicted move {dampened*100:.1f}% exceeds limit. Clamping to {MAX_DAILY_MOVE*100:.1f}%.")
 
-            # 3. Mode Branching
-            brain = load_model(ticker)
+            predicted_price = current_price * (1 + prediction_val)
             
-            if mode == 'train':
-                # TRAIN MODE
-                print("  [Mode] Starting Full Retraining...")
-                model, rmse, accuracy, features = train_event_driven_model(ticker, df, e_dates, current_model=None) 
-                # Save the updated brain
-                save_model(model, ticker)
-                
-                avg_accuracy = (avg_accuracy * processed_count + accuracy) / (processed_count + 1)
-                processed_count += 1
-                
-                # Update user metrics
+            direction = "Bullish" if prediction_val > 0 else "Bearish"
+            confidence = min(abs(prediction_val) * 1000, 95.0)
+            if sympathy_scores is not None:
+                sympathy = sympathy_scores.get(ticker, 0.0)
+            else:
+                sympathy = get_peer_sympathy_score(ticker)
+            
+            print(f"  [Inference] {ticker} -> {direction} (Target: {predicted_price:.2f})")
+            
+            # Check dupes
+            with span('db_read', ticker):
+                existing = predictions_collection.find_one({
+                    "userId": user_id, "stockTicker": ticker, "status": "Active"
+                })
+            if existing:
+                print("  [Skip] Active prediction exists.")
+                return None
+
+            # Construct Rationale
+            try:
+                importances = model.feature_importances_
+                top_idx = np.argsort(importances)[::-1][0]
+                top_feat = features[top_idx]
+                top_imp = importances[top_idx]
+            except:
+                top_feat = "Quantitative"
+                top_imp = 0.0
+            
+            try:
+                 recent_5d_return = (df.iloc[-1]['Close'] / df.iloc[-6]['Close']) - 1
+            except:
+                 recent_5d_return = 0.0
+                 
+            rationale = generate_natural_language_rationale(
+                ticker, direction, top_feat, top_imp, 85.0, current_macro_trend, sympathy, recent_5d_return, current_macro_rsi,
+                days_until_fed=X_live['Days_Until_Fed'].values[0]
+            )
+                 
+            new_prediction = {
+                "userId": user_id,
+                "stockTicker": ticker,
+                "targetPrice": float(round(predicted_price, 2)),
+                "targetPriceAtCreation": float(round(predicted_price, 2)),
+                "predictionType": prediction_type,
+                "deadline": (
+                    # For ALL predictions, we target Market Close (21:00 UTC / 4:00 PM EST)
+                    # Weekly: Next Friday at 21:00 UTC
+                    (datetime.datetime.now() + datetime.timedelta(days=(4 - datetime.date.today().weekday()) % 7)).replace(hour=21, minute=0, second=0, microsecond=0)
+                    if prediction_type == "Weekly" else
+                    # Daily: Today at 21:00 UTC (if before close), else Tomorrow at 21:00 UTC
+                    (datetime.datetime.now().replace(hour=21, minute=0, second=0, microsecond=0) 
+                     if datetime.datetime.now().hour < 21 else 
+                     (datetime.datetime.now() + datetime.timedelta(days=1)).replace(hour=21, minute=0, second=0, microsecond=0))
+                ),
+                "status": "Pending", 
+                "rating": 0,
+                "actualPrice": None,
+                "priceAtCreation": float(round(current_price, 2)),
+                "maxRatingAtCreation": 100,
+                "currency": "USD",
+                "description": rationale,
+                "initialDescription": rationale,
+                "featureVector": X_live.to_dict(orient='records')[0],
+                "targetHit": False,
+                "createdAt": datetime.datetime.now(),
+                "updatedAt": datetime.datetime.now()
+            }
+            with span('db_write', ticker):
+                predictions_collection.insert_one(new_prediction)
+            print(f"  [Signal] Saved {direction} prediction.")
+
+    except Exception as e:
+        print(f"  [CRITICAL ERROR] Failed to process {ticker}: {e}")
+        return None
+    return None
+
+def latest_macro_state(macro_data):
+    """(QQQ trend, QQQ RSI) of the latest macro row, neutral if there is none."""
+    if macro_data.empty:
+        return 0, 50
+    return macro_data['Macro_Trend'].iloc[-1], macro_data['Macro_RSI'].iloc[-1]
+
+def retrain_queued():
+    """
+    Retrains the Sigma Alpha models queued as incompatible at load time (background job,
+    outside the daily inference run). save_model takes each one off the queue.
+    """
+    jobs = get_model_registry().queue.jobs(engine='quant')
+    print(f"\n=== Sigma Alpha: retraining {len(jobs)} queued models ===")
+    user_id = get_quant_user_id()
+    if not user_id or not jobs: return
+
+    macro_data = fetch_macro_context()
+    macro_trend, macro_rsi = latest_macro_state(macro_data)
+    retrained = [path for path, job in jobs
+                 if process_ticker(job['ticker'], 'train', user_id, macro_data, macro_trend, macro_rsi) is not None]
+    print(f"\n  [Retrain Queue] Retrained {len(retrained)}/{len(jobs)} models.")
+
+def run_quant_model(mode='inference', specific_ticker=None, workers=1, prefetch=False):
+    user_id = get_quant_user_id()
+    if not user_id: return
+
+    print(f"\n=== Sigma Alpha Scientific Engine (v3.0 - {mode.capitalize()} Mode) ===")
+    start_trace('quant', mode=mode, workers=workers)
+    
+    # 1. Fetch Global Macro Context
+    with span('macro'):
+        macro_data = fetch_macro_context()
+    current_macro_trend, current_macro_rsi = latest_macro_state(macro_data)
+        
+    print(f"  [Macro State] QQQ Trend: {current_macro_trend:.4f} | RSI: {current_macro_rsi:.1f}")
+
+    tickers_to_process = [specific_ticker] if specific_ticker else list(PEER_GROUPS.keys())
+    
+    # Split the cores between concurrent XGBoost fits instead of oversubscribing them
+    n_jobs = max(1, (os.cpu_count() or 1) // workers) if workers > 1 else None
+    if workers > 1:
+        print(f"  [Pool] Processing {len(tickers_to_process)} tickers on {workers} workers.")
+    
+    # Peer sympathy for the whole run: one fetch per distinct peer, scored with matrix math
+    sympathy_scores = None
+    if mode == 'inference':
+        with span('sympathy'):
+            sympathy_scores = compute_sympathy_scores(tickers_to_process, build_peer_return_matrix(tickers_to_process))
+    
+    # Prefetch: all upstream I/O for the universe up front, concurrently, before compute
+    prefetched = None
+    if prefetch:
+        with span('prefetch', rows=len(tickers_to_process)):
+            prefetched = prefetch_universe(tickers_to_process, mode)
+    
+    # The macro frame is computed once above and shared read-only by every worker
+    results = run_per_ticker(
+        lambda t: process_ticker(t, mode, user_id, macro_data, current_macro_trend, current_macro_rsi, n_jobs=n_jobs,
+                                 sympathy_scores=sympathy_scores, prefetched=prefetched.get(t) if prefetched is not None else None),
+        tickers_to_process,
+        workers=workers
+    )
+    
+    if mode in ('train', 'refresh'):
+        # Combine once at the end: mean accuracy over every ticker that actually trained
+        accuracies = [acc for acc in results.values() if acc is not None]
+        if accuracies:
+            avg_accuracy = float(np.mean(accuracies))
+            with span('db_write'):
                 users_collection.update_one(
                     {"_id": user_id},
                     {"$set": {
@@ -605,115 +949,24 @@ def run_quant_model(mode='inference', specific_ticker=None):
                         "aiMetrics.specialization": "Tech Momentum & Pre-Earnings Strategy"
                     }}
                 )
-                continue
-                
-            elif mode == 'inference':
-                # INFERENCE MODE
-                if not brain:
-                    print("  [Mode] No Brain found. Skipping inference (Cluster must be trained first).")
-                    continue
-                    
-                model = brain
-                features = ['Ret_Lag1', 'Ret_Lag2', 'V_rev', 'Vol_5d', 'Hype_Factor', 'Macro_Trend', 'Macro_RSI', 'Sympathy', 'Days_Until', 'Days_Until_Fed'] 
-                
-                # Predict on LATEST row
-                X_live = df.iloc[[-1]][features]
-                current_price = df.iloc[-1]['Close']
-                
-                prediction_val = model.predict(X_live)[0]
-
-                # --- SAFETY CLAMPS (Tuning v3.1) ---
-                # 1. Fed Risk Dampener
-                days_to_fed = X_live['Days_Until_Fed'].values[0]
-                if days_to_fed <= 1:
-                    print(f"  [Risk] Fed Decision in {days_to_fed} days. Dampening signal by 50%.")
-                    prediction_val *= 0.5 
-
-                # 2. Max Daily Move Constraint (Prevent Outliers like 18%)
-                if prediction_type == "Daily":
-                    max_move = 0.05 # 5% limit for daily predictions
-                    if abs(prediction_val) > max_move:
-                        print(f"  [Clamp] Predicted move {prediction_val*100:.1f}% exceeds limit. Clamping to {max_move*100:.1f}%.")
-                        prediction_val = max_move if prediction_val > 0 else -max_move
-
-                predicted_price = current_price * (1 + prediction_val)
-                
-                direction = "Bullish" if prediction_val > 0 else "Bearish"
-                confidence = min(abs(prediction_val) * 1000, 95.0)
-                sympathy = get_peer_sympathy_score(ticker)
-                
-                print(f"  [Inference] {ticker} -> {direction} (Target: {predicted_price:.2f})")
-                
-                # Check dupes
-                existing = predictions_collection.find_one({
-                    "userId": user_id, "stockTicker": ticker, "status": "Active"
-                })
-                if existing:
-                    print("  [Skip] Active prediction exists.")
-                    continue
-
-                # Construct Rationale
-                try:
-                    importances = model.feature_importances_
-                    top_idx = np.argsort(importances)[::-1][0]
-                    top_feat = features[top_idx]
-                    top_imp = importances[top_idx]
-                except:
-                    top_feat = "Quantitative"
-                    top_imp = 0.0
-                
-                try:
-                     recent_5d_return = (df.iloc[-1]['Close'] / df.iloc[-6]['Close']) - 1
-                except:
-                     recent_5d_return = 0.0
-                     
-                rationale = generate_natural_language_rationale(
-                    ticker, direction, top_feat, top_imp, 85.0, current_macro_trend, sympathy, recent_5d_return, current_macro_rsi,
-                    days_until_fed=X_live['Days_Until_Fed'].values[0]
-                )
-                     
-                new_prediction = {
-                    "userId": user_id,
-                    "stockTicker": ticker,
-                    "targetPrice": float(round(predicted_price, 2)),
-                    "targetPriceAtCreation": float(round(predicted_price, 2)),
-                    "predictionType": prediction_type,
-                    "deadline": (
-                        # For ALL predictions, we target Market Close (21:00 UTC / 4:00 PM EST)
-                        # Weekly: Next Friday at 21:00 UTC
-                        (datetime.datetime.now() + datetime.timedelta(days=(4 - datetime.date.today().weekday()) % 7)).replace(hour=21, minute=0, second=0, microsecond=0)
-                        if prediction_type == "Weekly" else
-                        # Daily: Today at 21:00 UTC (if before close), else Tomorrow at 21:00 UTC
-                        (datetime.datetime.now().replace(hour=21, minute=0, second=0, microsecond=0) 
-                         if datetime.datetime.now().hour < 21 else 
-                         (datetime.datetime.now() + datetime.timedelta(days=1)).replace(hour=21, minute=0, second=0, microsecond=0))
-                    ),
-                    "status": "Pending", 
-                    "rating": 0,
-                    "actualPrice": None,
-                    "priceAtCreation": float(round(current_price, 2)),
-                    "maxRatingAtCreation": 100,
-                    "currency": "USD",
-                    "description": rationale,
-                    "initialDescription": rationale,
-                    "featureVector": X_live.to_dict(orient='records')[0],
-                    "targetHit": False,
-                    "createdAt": datetime.datetime.now(),
-                    "updatedAt": datetime.datetime.now()
-                }
-                predictions_collection.insert_one(new_prediction)
-                print(f"  [Signal] Saved {direction} prediction.")
-
-        except Exception as e:
-            print(f"  [CRITICAL ERROR] Failed to process {ticker}: {e}")
-            continue
+            print(f"\n  [Metrics] Training accuracy {avg_accuracy:.1f}% across {len(accuracies)} models.")
 
+    print(f"  [Bar Cache] {get_bar_cache().summary()}")
+    print(f"  [Model Registry] {get_model_registry().summary()}")
+    print(f"  [Acquire] {get_acquirer().summary()}")
+    end_trace()
     print(f"\n--- [Cron] Bot Run Completed Successfully ---")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Sigma Alpha Quant Engine')
-    parser.add_argument('--mode', type=str, default='inference', choices=['train', 'inference'], help='Mode: train (quarterly) or inference (daily)')
+    parser.add_argument('--mode', type=str, default='inference', choices=['train', 'refresh', 'inference'], help='Mode: train (quarterly), refresh (nightly warm start) or inference (daily)')
     parser.add_argument('--ticker', type=str, help='Specific ticker to process (optional)')
+    parser.add_argument('--workers', type=int, default=1, help='Process tickers in parallel on N workers (default: 1, sequential)')
+    parser.add_argument('--retrain-queued', action='store_true', help='Only retrain the models queued as incompatible, then exit')
+    parser.add_argument('--prefetch', action='store_true', help='Fetch calendar, bars and report history for the whole universe concurrently before compute')
     args = parser.parse_args()
     
-    run_quant_model(mode=args.mode, specific_ticker=args.ticker)
+    if args.retrain_queued:
+        retrain_queued()
+        sys.exit(0)
+    run_quant_model(mode=args.mode, specific_ticker=args.ticker, workers=max(1, args.workers), prefetch=args.prefetch)
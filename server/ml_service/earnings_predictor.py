@@ -1,6 +1,7 @@
 import os
 import sys
 import datetime
+import argparse
 import yfinance as yf
 import pandas as pd
 import numpy as np
@@ -8,6 +9,8 @@ from pymongo import MongoClient
 from dotenv import load_dotenv
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
+import indicators
+from acquisition import acquire, get_acquirer
 
 # Load env variables
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
@@ -33,18 +36,24 @@ def get_ai_user_id():
     return user['_id']
 
 def calculate_rsi(data, window=14):
-    delta = data['Close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
+    # Simple-average RSI (not Wilder), shared kernel
+    close = np.asarray(data['Close'], dtype='float64').ravel()
+    return pd.Series(indicators.rsi(close, window, smoothing='sma'), index=data.index)
 
-def prepare_features(ticker, period="2y"):
+def download_history(ticker, period="2y"):
+    return yf.download(ticker, period=period, progress=False)
+
+def fetch_calendar(ticker):
+    return yf.Ticker(ticker).calendar
+
+def prepare_features(ticker, period="2y", df=None):
     """
     Fetches data and engineering features for ML.
+    df: already downloaded history (see prefetch_stocks).
     """
-    df = yf.download(ticker, period=period, progress=False)
-    if df.empty:
+    if df is None:
+        df = download_history(ticker, period)
+    if df is None or df.empty:
         return None
 
     # Feature Engineering
@@ -83,19 +92,31 @@ def train_and_predict(ticker, df):
     current_price = last_row['Close'].values[0]
     return current_price, predicted_price
 
-def run_predictions():
+def prefetch_stocks(tickers, period="2y"):
+    """
+    Calendars and price histories of every ticker, fetched concurrently through the
+    acquisition layer (yfinance host limits). Returns {ticker: (calendar, history)}.
+    yf.download only keeps per-call state in recent yfinance releases; with older ones,
+    run this with ACQUIRE_YAHOO_CONCURRENCY=1.
+    """
+    results = acquire([('yahoo', fetch_calendar, t) for t in tickers] +
+                      [('yahoo', download_history, t, period) for t in tickers])
+    n = len(tickers)
+    return {t: (results[i], results[n + i]) for i, t in enumerate(tickers)}
+
+def run_predictions(prefetch=False):
     ai_user_id = get_ai_user_id()
     if not ai_user_id:
         return
 
     print("--- Starting Earnings AI Prediction Cycle ---")
+    prefetched = prefetch_stocks(STOCKS) if prefetch else {}
     
     for ticker in STOCKS:
         try:
             print(f"Analyzing {ticker}...")
             # 1. Check Earnings Date
-            stock = yf.Ticker(ticker)
-            calendar = stock.calendar
+            calendar, history = prefetched[ticker] if ticker in prefetched else (fetch_calendar(ticker), None)
             
             if calendar is None or calendar.empty:
                # print(f"No calendar data for {ticker}")
@@ -110,7 +131,7 @@ def run_predictions():
                 pass
 
             # 2. Get Data & Train
-            df = prepare_features(ticker)
+            df = prepare_features(ticker, df=history)
             if df is None or len(df) < 60:
                 print(f"Not enough data for {ticker}")
                 continue
@@ -173,4 +194,9 @@ def run_predictions():
             print(f"Error processing {ticker}: {e}")
 
 if __name__ == "__main__":
-    run_predictions()
+    parser = argparse.ArgumentParser(description='Earnings AI predictions')
+    parser.add_argument('--prefetch', action='store_true', help='Fetch every calendar and price history concurrently before compute')
+    args = parser.parse_args()
+    run_predictions(prefetch=args.prefetch)
+    if args.prefetch:
+        print(f"[Acquire] {get_acquirer().summary()}")
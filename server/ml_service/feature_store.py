@@ -0,0 +1,213 @@
+import os
+import json
+import threading
+import contextlib
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError: # Windows: in-process lock only
+    fcntl = None
+
+from model_registry import schema_hash
+
+# Memory-mapped store of finished training rows (features + target) per ticker.
+# Rows live under <root>/<feature set>/<feature version>/, where the version is the
+# schema hash of the column list (the same hash the model sidecars carry), so a
+# feature change starts a new store instead of mixing layouts. Per ticker:
+#   <T>.f32    float32 rows x columns, C order, raw (read back with np.memmap)
+#   <T>.dates  int64 ns timestamp per row
+#   <T>.json   index entry {rows, start, end} plus the feeder's resume state
+# Rows are appended as they settle (target known). Data is written before the entry,
+# so an interrupted append is cut back to the indexed row count on the next write.
+# Several processes can update the same ticker (the smart crons, --retrain-queued),
+# so every read-modify-write runs under lock_for, which also holds an OS lock on
+# <root>/<feature set>/<T>.lock.
+
+STORE_DIR = os.getenv('FEATURE_STORE_DIR', os.path.join(os.path.dirname(__file__), 'cache', 'features'))
+STORE_ENABLED = os.getenv('FEATURE_STORE', 'on').lower() not in ('off', '0', 'false')
+DTYPE = np.dtype('<f4')
+
+def _safe(ticker):
+    return ticker.replace('/', '_').replace('^', '_')
+
+class FeatureStore:
+    def __init__(self, root=None, enabled=STORE_ENABLED):
+        self.root = root or STORE_DIR
+        self.enabled = enabled # Off: the engines featurize from the bars as before
+        self._locks = {}
+        self._guard = threading.Lock()
+        self.stats = {'appended': 0, 'rebuilt': 0, 'rows_written': 0, 'rows_read': 0}
+
+    def _dir(self, name, columns):
+        return os.path.join(self.root, name, schema_hash(columns))
+
+    def _paths(self, name, columns, ticker):
+        base = os.path.join(self._dir(name, columns), _safe(ticker))
+        return base + '.f32', base + '.dates', base + '.json'
+
+    @contextlib.contextmanager
+    def lock_for(self, name, ticker):
+        """Serializes the builders of one (feature set, ticker) across threads and processes."""
+        with self._guard:
+            lock = self._locks.setdefault((name, ticker), threading.Lock())
+        with lock:
+            if fcntl is None:
+                yield
+                return
+            folder = os.path.join(self.root, name)
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, _safe(ticker) + '.lock'), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # --- Index ---
+
+    def entry(self, name, columns, ticker):
+        """Index entry {rows, start, end, ...feeder state} or None if the ticker has no rows."""
+        try:
+            with open(self._paths(name, columns, ticker)[2]) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def index(self, name, columns):
+        """{ticker: {rows, start, end}} for every ticker of the feature version."""
+        folder = self._dir(name, columns)
+        if not os.path.isdir(folder):
+            return {}
+        out = {}
+        for fname in sorted(os.listdir(folder)):
+            if fname.endswith('.json') and fname != 'columns.json':
+                with open(os.path.join(folder, fname)) as f:
+                    e = json.load(f)
+                out[e.get('ticker', fname[:-5])] = {k: e[k] for k in ('rows', 'start', 'end')}
+        return out
+
+    def _write_entry(self, path, entry):
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+    # --- Writing ---
+
+    def write(self, name, columns, ticker, dates, values, state=None, append=False):
+        """
+        Stores rows (dates ascending, values rows x len(columns)). append=True adds them
+        after the existing rows (their dates must be later); otherwise they replace them.
+        state is kept in the entry for the feeder to resume from. Call under lock_for.
+        """
+        data_path, dates_path, entry_path = self._paths(name, columns, ticker)
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        columns_path = os.path.join(os.path.dirname(data_path), 'columns.json')
+        if not os.path.exists(columns_path):
+            self._write_entry(columns_path, list(columns))
+
+        values = np.ascontiguousarray(values, dtype=DTYPE).reshape(-1, len(columns))
+        stamps = pd.DatetimeIndex(dates).values.astype('datetime64[ns]').astype('<i8')
+        previous = self.entry(name, columns, ticker) if append else None
+        if previous is not None and len(stamps) and str(pd.Timestamp(stamps[0])) <= previous['end']:
+            raise ValueError(f"{ticker}: appended rows must start after {previous['end']}")
+
+        rows = previous['rows'] if previous else 0
+        for path, arr, width in ((data_path, values, len(columns) * DTYPE.itemsize), (dates_path, stamps, 8)):
+            if previous:
+                with open(path, 'r+b') as f:
+                    f.truncate(rows * width) # Drops any rows of an interrupted append
+                    f.seek(rows * width)
+                    f.write(arr.tobytes())
+            else:
+                # New file, so maps of the old rows stay valid for their readers
+                with open(path + '.tmp', 'wb') as f:
+                    f.write(arr.tobytes())
+                os.replace(path + '.tmp', path)
+
+        total = rows + len(values)
+        start = previous['start'] if previous else (str(pd.Timestamp(stamps[0])) if len(stamps) else None)
+        end = str(pd.Timestamp(stamps[-1])) if len(stamps) else (previous['end'] if previous else None)
+        self._write_entry(entry_path, {'ticker': ticker, 'rows': total, 'start': start, 'end': end, 'state': state})
+        self.stats['appended' if previous else 'rebuilt'] += 1
+        self.stats['rows_written'] += len(values)
+        return total
+
+    # --- Reading ---
+
+    def _maps(self, name, columns, ticker, entry):
+        data_path, dates_path, _ = self._paths(name, columns, ticker)
+        rows = entry['rows'] if entry else 0
+        if rows == 0:
+            return np.empty(0, dtype='datetime64[ns]'), np.empty((0, len(columns)), dtype=DTYPE)
+        dates = np.memmap(dates_path, dtype='<i8', mode='r', shape=(rows,)).view('datetime64[ns]')
+        values = np.memmap(data_path, dtype=DTYPE, mode='r', shape=(rows, len(columns)))
+        return dates, values
+
+    def _bounds(self, dates, start, end):
+        def stamp(ts):
+            ts = pd.Timestamp(ts)
+            # Stored dates are naive (tz-aware bars are kept as UTC)
+            return np.datetime64(ts.tz_convert(None) if ts.tzinfo is not None else ts, 'ns')
+        lo = 0 if start is None else int(np.searchsorted(dates, stamp(start), side='left'))
+        hi = len(dates) if end is None else int(np.searchsorted(dates, stamp(end), side='right'))
+        return lo, hi
+
+    def read(self, name, columns, ticker, start=None, end=None):
+        """
+        (dates, values) for rows dated in [start, end]: read-only memory-mapped slices
+        straight from disk (no parsing, no copy). Empty arrays if there are no rows.
+        """
+        dates, values = self._maps(name, columns, ticker, self.entry(name, columns, ticker))
+        lo, hi = self._bounds(dates, start, end)
+        self.stats['rows_read'] += hi - lo
+        return dates[lo:hi], values[lo:hi]
+
+    def frame(self, name, columns, ticker, start=None, end=None):
+        """read() as a DataFrame over the mapped rows (a view: copy before modifying)."""
+        dates, values = self.read(name, columns, ticker, start, end)
+        return pd.DataFrame(values, index=pd.DatetimeIndex(dates), columns=list(columns), copy=False)
+
+    def read_many(self, name, columns, tickers, start=None, end=None, extra=0):
+        """
+        Rows of several tickers stacked into one float32 array, filled straight from the
+        maps (one copy). extra appends that many zeroed columns for the caller to fill.
+        Returns (dates, values, owner): owner[i] is the position in tickers of row i.
+        """
+        parts = []
+        for i, ticker in enumerate(tickers):
+            dates, values = self._maps(name, columns, ticker, self.entry(name, columns, ticker))
+            lo, hi = self._bounds(dates, start, end)
+            if hi > lo:
+                parts.append((i, dates[lo:hi], values[lo:hi]))
+
+        total = sum(len(d) for _, d, _ in parts)
+        out = np.zeros((total, len(columns) + extra), dtype=DTYPE)
+        out_dates = np.empty(total, dtype='datetime64[ns]')
+        owner = np.empty(total, dtype=np.int32)
+        pos = 0
+        for i, dates, values in parts:
+            n = len(dates)
+            out[pos:pos + n, :len(columns)] = values
+            out_dates[pos:pos + n] = dates
+            owner[pos:pos + n] = i
+            pos += n
+        self.stats['rows_read'] += total
+        return out_dates, out, owner
+
+    def summary(self):
+        s = self.stats
+        return f"appended={s['appended']} rebuilt={s['rebuilt']} rows_written={s['rows_written']} rows_read={s['rows_read']}"
+
+_store = None
+_store_guard = threading.Lock()
+
+def get_feature_store():
+    """Process-wide FeatureStore shared by the engines."""
+    global _store
+    with _store_guard:
+        if _store is None:
+            _store = FeatureStore()
+        return _store
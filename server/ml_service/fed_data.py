@@ -1,4 +1,7 @@
+import bisect
 import datetime
+import numpy as np
+import pandas as pd
 
 # Federal Reserve Interest Rate Decision Dates
 # Sources: Federal Reserve Board, FOMC Calendars
@@ -36,15 +39,54 @@ FED_DATES = [
     datetime.date(2025, 12, 10),
 ]
 
+class EventCalendar:
+    """
+    Sorted, array-backed calendar of event dates (day resolution).
+    The vectorized methods take a whole DatetimeIndex and use binary search,
+    so feature building never loops over rows in Python.
+    """
+
+    def __init__(self, dates):
+        self.dates = sorted(set(dates))
+        self.days = np.array(self.dates, dtype='datetime64[D]')
+
+    def next_event(self, current_date):
+        """Next event on/after current_date (datetime.date), or None."""
+        i = bisect.bisect_left(self.dates, current_date)
+        return self.dates[i] if i < len(self.dates) else None
+
+    def days_until_next(self, index, missing=99):
+        """
+        Calendar days from each timestamp's date to the next event on/after it.
+        Timestamps past the last known event get `missing`.
+        """
+        days = pd.DatetimeIndex(index).values.astype('datetime64[D]')
+        pos = np.searchsorted(self.days, days, side='left')
+        has_next = pos < len(self.days)
+        out = np.full(len(days), missing, dtype='int64')
+        out[has_next] = (self.days[pos[has_next]] - days[has_next]).astype('int64')
+        return out
+
+    def is_event_week(self, index, window=7, missing=99):
+        """1 where the next event is at most `window` days away, else 0."""
+        return (self.days_until_next(index, missing=missing) <= window).astype('int64')
+
+FED_CALENDAR = EventCalendar(FED_DATES)
+
 def get_next_fed_date(current_date=None):
     """Returns the next scheduled Fed decision date relative to current_date."""
     if current_date is None:
         current_date = datetime.date.today()
         
-    for d in FED_DATES:
-        if d >= current_date:
-            return d
-    return None
+    return FED_CALENDAR.next_event(current_date)
+
+def days_until_fed(index):
+    """Vectorized Days_Until_Fed for a DatetimeIndex (99 when beyond the known calendar)."""
+    return FED_CALENDAR.days_until_next(index)
+
+def fed_week_flags(index, window=7):
+    """Vectorized Is_Fed_Week flags for a DatetimeIndex."""
+    return FED_CALENDAR.is_event_week(index, window=window)
 
 def is_fed_week(current_date=None):
     """Returns True if the current date is within the same ISO week as a Fed decision."""
@@ -2,11 +2,98 @@
 // Actually, since server is CommonJS (require), I should use require('yahoo-finance2').default if it works?
 // My debug script used import().
 // Let's stick to the method that worked in the debug script (using dynamic import to be safe in CJS environment if package is ESM).
+//
+// Modes:
+//   node fetch_stock_history.js <ticker> <startDate> <endDate> [interval]   -> one JSON document on stdout
+//   node fetch_stock_history.js --serve                                   -> long-lived worker (see serve())
+
+const readline = require('readline');
+
+// Max concurrent Yahoo requests while serving (keeps us under their throttling)
+const SERVE_CONCURRENCY = parseInt(process.env.ADAPTER_CONCURRENCY || '4', 10);
+
+async function loadClient() {
+    const { default: YahooFinance } = await import('yahoo-finance2');
+    return new YahooFinance({ suppressNotices: ['yahooSurvey', 'ripHistorical'] });
+}
+
+async function fetchHistory(yahooFinance, ticker, startDate, endDate, interval) {
+    const queryOptions = {
+        // yahoo-finance2 rejected raw YYYY-MM-DD strings for intraday (InvalidOptionsError), so force dates.
+        period1: new Date(startDate),
+        period2: new Date(endDate),
+        interval: interval || '1d' // '1h' or '60m'
+    };
+
+    // console.error("Query Options:", JSON.stringify(queryOptions)); // Debug log to stderr
+
+    try {
+        const result = await yahooFinance.historical(ticker, queryOptions);
+        return JSON.stringify(result);
+    } catch (error) {
+        // console.error("Yahoo Error:", error);
+        return JSON.stringify({ error: error.message, details: error });
+    }
+}
+
+// Worker protocol (line-delimited):
+//   stdin : {"id": 1, "ticker": "AAPL", "start": "2024-01-01", "end": "2024-06-01", "interval": "1d"}
+//   stdout: 1\t<same JSON document the one-shot mode prints>
+// Responses are written as soon as each request finishes, so they may arrive out of order.
+async function serve() {
+    let yahooFinance;
+    try {
+        yahooFinance = await loadClient();
+    } catch (error) {
+        console.error(`[Adapter] Failed to load yahoo-finance2: ${error.message}`);
+        process.exit(1);
+    }
+
+    const queue = [];
+    let running = 0;
+    let closed = false;
+
+    const pump = () => {
+        while (running < SERVE_CONCURRENCY && queue.length > 0) {
+            const req = queue.shift();
+            running++;
+            fetchHistory(yahooFinance, req.ticker, req.start, req.end, req.interval)
+                .then((payload) => process.stdout.write(`${req.id}\t${payload}\n`))
+                .finally(() => {
+                    running--;
+                    pump();
+                    if (closed && running === 0 && queue.length === 0) process.exit(0);
+                });
+        }
+    };
+
+    const rl = readline.createInterface({ input: process.stdin, terminal: false });
+    rl.on('line', (line) => {
+        if (!line.trim()) return;
+        let req;
+        try {
+            req = JSON.parse(line);
+        } catch (error) {
+            console.error(`[Adapter] Bad request line: ${line}`);
+            return;
+        }
+        queue.push(req);
+        pump();
+    });
+    rl.on('close', () => {
+        closed = true;
+        if (running === 0 && queue.length === 0) process.exit(0);
+    });
+}
 
 async function main() {
     const args = process.argv.slice(2);
+    if (args[0] === '--serve') {
+        return serve();
+    }
+
     if (args.length < 3) {
-        console.error("Usage: node fetch_stock_history.js <ticker> <startDate> <endDate>");
+        console.error("Usage: node fetch_stock_history.js <ticker> <startDate> <endDate> [interval] | --serve");
         process.exit(1);
     }
 
@@ -16,25 +103,9 @@ async function main() {
     const interval = args[3] || '1d';
 
     try {
-        const { default: YahooFinance } = await import('yahoo-finance2');
-        const yahooFinance = new YahooFinance({ suppressNotices: ['yahooSurvey', 'ripHistorical'] });
-
-        const queryOptions = {
-            period1: startDate, // yahoo-finance2 handles YYYY-MM-DD strings well often, but for intraday let's be strict? 
-            // Actually, let's try just passing them as is first but realize the previous error was "InvalidOptionsError".
-            // Maybe it's the interval validation.
-            // Let's force dates to be dates.
-            period1: new Date(startDate),
-            period2: new Date(endDate),
-            interval: interval // '1h' or '60m'
-        };
-
-        // console.error("Query Options:", JSON.stringify(queryOptions)); // Debug log to stderr
-
-        const result = await yahooFinance.historical(ticker, queryOptions);
-        console.log(JSON.stringify(result));
+        const yahooFinance = await loadClient();
+        console.log(await fetchHistory(yahooFinance, ticker, startDate, endDate, interval));
     } catch (error) {
-        // console.error("Yahoo Error:", error);
         console.log(JSON.stringify({ error: error.message, details: error }));
     }
 }
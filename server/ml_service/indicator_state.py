@@ -0,0 +1,237 @@
+import os
+import json
+import math
+import threading
+import numpy as np
+import pandas as pd
+
+# Incremental technical indicators per (ticker, interval).
+# The state behind the engines' indicators (Wilder RSI averages, the MACD EMAs, and
+# the last closes/returns for the SMA, Bollinger and volatility windows) is kept on
+# disk, so a run only folds in the bars that arrived since the last one. Each bar
+# costs a fixed amount of work, and history is recomputed only when the stored
+# closes no longer match the fetched ones (split, restatement, gap).
+# Conventions follow ta (RSIIndicator, MACD, BollingerBands, SMAIndicator).
+
+INDICATOR_DIR = os.getenv('INDICATOR_CACHE_DIR', os.path.join(os.path.dirname(__file__), 'cache', 'indicators'))
+
+RSI_WINDOW = 14
+SMA_FAST, SMA_SLOW = 20, 50
+BB_WINDOW, BB_DEV = 20, 2
+VOL_WINDOW = 20
+MACD_FAST, MACD_SLOW, MACD_SIGN = 12, 26, 9
+RET_LONG = 5
+
+ROW_COLUMNS = ['Close', 'Ret_1d', 'Ret_5d', 'RSI', 'SMA_20', 'SMA_50', 'Trend_Signal', 'Vol_20d',
+               'MACD', 'MACD_Diff', 'BB_High', 'BB_Low', 'BB_Mid', 'BB_Pos']
+
+def _window_mean(values, n):
+    return math.fsum(values[-n:]) / n
+
+def _window_std(values, n, ddof):
+    window = values[-n:]
+    mean = math.fsum(window) / n
+    return math.sqrt(math.fsum((v - mean) ** 2 for v in window) / (n - ddof))
+
+class IndicatorState:
+    """Indicator recursion state after `count` bars."""
+
+    def __init__(self):
+        self.count = 0
+        self.last_ts = None
+        self.closes = []  # last SMA_SLOW closes
+        self.rets = []    # last VOL_WINDOW one-bar returns
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.ema_fast = None
+        self.ema_slow = None
+        self.signal = None
+        self.macd_obs = 0
+
+    def copy(self):
+        other = IndicatorState()
+        other.__dict__.update(self.__dict__)
+        other.closes = list(self.closes)
+        other.rets = list(self.rets)
+        return other
+
+    def to_dict(self):
+        return dict(self.__dict__, last_ts=None if self.last_ts is None else self.last_ts.isoformat())
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls()
+        state.__dict__.update(data)
+        state.last_ts = None if data.get('last_ts') is None else pd.Timestamp(data['last_ts'])
+        return state
+
+    def update(self, ts, close):
+        """Folds in one bar and returns its feature row (dict over ROW_COLUMNS, NaN where undefined)."""
+        close = float(close)
+        prev = self.closes[-1] if self.closes else None
+        self.count += 1
+        self.last_ts = pd.Timestamp(ts)
+        self.closes = (self.closes + [close])[-SMA_SLOW:]
+
+        # Returns (pct_change)
+        ret_1d = np.nan if prev is None else close / prev - 1
+        if prev is not None:
+            self.rets = (self.rets + [ret_1d])[-VOL_WINDOW:]
+        ret_5d = close / self.closes[-RET_LONG - 1] - 1 if self.count > RET_LONG else np.nan
+
+        # Wilder RSI (ewm alpha=1/14, adjust=False; the first bar contributes a 0 move)
+        change = 0.0 if prev is None else close - prev
+        alpha = 1 / RSI_WINDOW
+        if self.count == 1:
+            self.avg_gain, self.avg_loss = max(change, 0.0), max(-change, 0.0)
+        else:
+            self.avg_gain = (1 - alpha) * self.avg_gain + alpha * max(change, 0.0)
+            self.avg_loss = (1 - alpha) * self.avg_loss + alpha * max(-change, 0.0)
+        if self.count < RSI_WINDOW:
+            rsi = np.nan
+        elif self.avg_loss == 0:
+            rsi = 100.0
+        else:
+            rsi = 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+
+        # MACD (span EMAs seeded with the first close; signal seeded with the first MACD)
+        a_fast, a_slow, a_sign = 2 / (MACD_FAST + 1), 2 / (MACD_SLOW + 1), 2 / (MACD_SIGN + 1)
+        self.ema_fast = close if self.ema_fast is None else (1 - a_fast) * self.ema_fast + a_fast * close
+        self.ema_slow = close if self.ema_slow is None else (1 - a_slow) * self.ema_slow + a_slow * close
+        macd = macd_diff = np.nan
+        if self.count >= MACD_SLOW:
+            macd = self.ema_fast - self.ema_slow
+            self.signal = macd if self.signal is None else (1 - a_sign) * self.signal + a_sign * macd
+            self.macd_obs += 1
+            if self.macd_obs >= MACD_SIGN:
+                macd_diff = macd - self.signal
+
+        # Rolling windows
+        sma_20 = _window_mean(self.closes, SMA_FAST) if self.count >= SMA_FAST else np.nan
+        sma_50 = _window_mean(self.closes, SMA_SLOW) if self.count >= SMA_SLOW else np.nan
+        vol_20 = _window_std(self.rets, VOL_WINDOW, ddof=1) if len(self.rets) >= VOL_WINDOW else np.nan
+        bb_mid = bb_high = bb_low = bb_pos = np.nan
+        if self.count >= BB_WINDOW:
+            bb_mid = _window_mean(self.closes, BB_WINDOW)
+            std = _window_std(self.closes, BB_WINDOW, ddof=0)
+            bb_high, bb_low = bb_mid + BB_DEV * std, bb_mid - BB_DEV * std
+            bb_pos = (close - bb_low) / (bb_high - bb_low) if bb_high != bb_low else np.nan
+
+        return {
+            'Close': close, 'Ret_1d': ret_1d, 'Ret_5d': ret_5d, 'RSI': rsi,
+            'SMA_20': sma_20, 'SMA_50': sma_50,
+            'Trend_Signal': 1 if sma_20 > sma_50 else -1, # NaN compares False, like np.where
+            'Vol_20d': vol_20, 'MACD': macd, 'MACD_Diff': macd_diff,
+            'BB_High': bb_high, 'BB_Low': bb_low, 'BB_Mid': bb_mid, 'BB_Pos': bb_pos
+        }
+
+def replay(close):
+    """Full recompute: (state after every bar, DataFrame of feature rows)."""
+    state = IndicatorState()
+    rows = [state.update(ts, c) for ts, c in close.items()]
+    return state, pd.DataFrame(rows, index=close.index, columns=ROW_COLUMNS)
+
+def state_matches(state, close):
+    """A saved state can be continued on close: its stored closes match the bars ending at its last bar."""
+    if state is None or state.last_ts is None or state.last_ts not in close.index:
+        return False
+    pos = close.index.get_loc(state.last_ts)
+    if not isinstance(pos, int):
+        return False
+    k = min(len(state.closes), pos + 1)
+    fetched = close.to_numpy(dtype='float64')[pos + 1 - k:pos + 1]
+    return k > 0 and np.allclose(fetched, state.closes[-k:], rtol=1e-9, atol=0)
+
+class IndicatorStore:
+    """
+    On-disk indicator state per (ticker, interval). The committed state stops at the
+    second-to-last bar; the last bar may still be forming, so it is only previewed.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or INDICATOR_DIR
+        self._locks = {}
+        self._guard = threading.Lock()
+        self.stats = {'incremental': 0, 'recomputed': 0, 'bars_applied': 0}
+
+    def _path(self, ticker, interval):
+        safe = ticker.replace('/', '_').replace('^', '_')
+        return os.path.join(self.cache_dir, f"{safe}_{interval}.json")
+
+    def _lock_for(self, key):
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _load(self, ticker, interval):
+        path = self._path(ticker, interval)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path) as f:
+                return IndicatorState.from_dict(json.load(f))
+        except Exception as e:
+            print(f"  [Indicators] Ignoring unreadable state for {ticker} ({e}).")
+            return None
+
+    def _save(self, ticker, interval, state):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(ticker, interval)
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state.to_dict(), f)
+        os.replace(tmp, path)
+
+    def committed(self, ticker, interval):
+        """The stored state (None if there is none), e.g. to continue it bar by bar."""
+        with self._lock_for((ticker, interval)):
+            return self._load(ticker, interval)
+
+    def commit(self, ticker, interval, state):
+        """Stores a state advanced elsewhere (e.g. by a bar stream)."""
+        if state.count > 0:
+            with self._lock_for((ticker, interval)):
+                self._save(ticker, interval, state)
+
+    def latest(self, ticker, interval, close):
+        """
+        Feature row (dict over ROW_COLUMNS plus 'bars') for the last bar of close,
+        a Close series with a DatetimeIndex. None if close is empty.
+        """
+        if close is None or len(close) == 0:
+            return None
+        with self._lock_for((ticker, interval)):
+            state = self._load(ticker, interval)
+            settled = close.iloc[:-1]
+            if state_matches(state, settled):
+                new = settled[settled.index > state.last_ts]
+                for ts, c in new.items():
+                    state.update(ts, c)
+                self.stats['incremental'] += 1
+                self.stats['bars_applied'] += len(new)
+                changed = len(new) > 0
+            else:
+                state, _ = replay(settled)
+                self.stats['recomputed'] += 1
+                self.stats['bars_applied'] += len(settled)
+                changed = True
+            if changed and state.count > 0:
+                self._save(ticker, interval, state)
+
+        row = state.copy().update(close.index[-1], close.iloc[-1])
+        row['bars'] = state.count + 1
+        return row
+
+    def summary(self):
+        s = self.stats
+        return f"incremental={s['incremental']} recomputed={s['recomputed']} bars_applied={s['bars_applied']}"
+
+_store = None
+_store_guard = threading.Lock()
+
+def get_indicator_store():
+    """Process-wide IndicatorStore shared by the engines."""
+    global _store
+    with _store_guard:
+        if _store is None:
+            _store = IndicatorStore()
+        return _store
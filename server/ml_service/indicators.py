@@ -0,0 +1,156 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Vectorized indicator kernels shared by the engines.
+# Every kernel takes a 1-D series or a 2-D (tickers x time) panel of closes and works
+# along the last axis, so a whole universe is computed in one pass. Tickers with a
+# shorter history are left-padded with NaN (see to_panel); each row then behaves as
+# if it started at its first valid value. Values match the ta package (RSIIndicator,
+# SMAIndicator, MACD, BollingerBands) and pandas rolling/pct_change; accumulation is
+# float64 and results come back as float32 only for float32 input.
+
+# Bounds the (rows x time x window) temporaries of the rolling std
+_STD_CHUNK_BYTES = 64 * 1024 * 1024
+
+def _prepare(x):
+    arr = np.asarray(x)
+    out_dtype = np.float32 if arr.dtype == np.float32 else np.float64
+    squeeze = arr.ndim == 1
+    panel = np.atleast_2d(arr).astype(np.float64, copy=False)
+    return panel, out_dtype, squeeze
+
+def _finish(result, out_dtype, squeeze):
+    result = result.astype(out_dtype, copy=False)
+    return result[0] if squeeze else result
+
+def to_panel(series_list, dtype=np.float64):
+    """Stacks 1-D arrays of different lengths into a right-aligned, NaN-padded panel."""
+    length = max((len(s) for s in series_list), default=0)
+    panel = np.full((len(series_list), length), np.nan, dtype=dtype)
+    for i, s in enumerate(series_list):
+        if len(s):
+            panel[i, length - len(s):] = np.asarray(s, dtype=dtype)
+    return panel
+
+def from_panel(panel_row, length):
+    """The last `length` values of a panel row (undoes the padding of to_panel)."""
+    return panel_row[panel_row.shape[-1] - length:]
+
+# --- Rolling windows (pandas rolling(window) semantics: NaN until `window` values) ---
+
+def _rolling_sum(a, window):
+    valid = ~np.isnan(a)
+    zero = np.zeros(a.shape[:-1] + (1,))
+    csum = np.concatenate([zero, np.cumsum(np.where(valid, a, 0.0), axis=-1)], axis=-1)
+    ccount = np.concatenate([zero, np.cumsum(valid, axis=-1)], axis=-1)
+    out = np.full(a.shape, np.nan)
+    if a.shape[-1] >= window:
+        sums = csum[..., window:] - csum[..., :-window]
+        full = (ccount[..., window:] - ccount[..., :-window]) == window
+        out[..., window - 1:] = np.where(full, sums, np.nan)
+    return out
+
+def rolling_sum(x, window):
+    a, dtype, squeeze = _prepare(x)
+    return _finish(_rolling_sum(a, window), dtype, squeeze)
+
+def sma(x, window):
+    a, dtype, squeeze = _prepare(x)
+    return _finish(_rolling_sum(a, window) / window, dtype, squeeze)
+
+def _rolling_std(a, window, ddof):
+    out = np.full(a.shape, np.nan)
+    if a.shape[-1] < window:
+        return out
+    rows = max(1, _STD_CHUNK_BYTES // (a.shape[-1] * window * 8))
+    for start in range(0, a.shape[0], rows):
+        windows = sliding_window_view(a[start:start + rows], window, axis=-1)
+        # Two-pass (mean, then squared deviations) like pandas; NaN anywhere -> NaN
+        out[start:start + rows, window - 1:] = np.std(windows, axis=-1, ddof=ddof)
+    return out
+
+def rolling_std(x, window, ddof=1):
+    a, dtype, squeeze = _prepare(x)
+    return _finish(_rolling_std(a, window, ddof), dtype, squeeze)
+
+def pct_change(x, periods=1):
+    a, dtype, squeeze = _prepare(x)
+    out = np.full(a.shape, np.nan)
+    out[..., periods:] = a[..., periods:] / a[..., :-periods] - 1
+    return _finish(out, dtype, squeeze)
+
+# --- Exponential averages (pandas ewm(adjust=False)) ---
+
+def _ewm(a, alpha, min_periods):
+    """
+    Recursive mean seeded with each row's first valid value. Loops over time but is
+    vectorized across tickers. NaNs are assumed to be leading (padding / warm-up).
+    """
+    out = np.full(a.shape, np.nan)
+    state = np.full(a.shape[0], np.nan)
+    count = np.zeros(a.shape[0], dtype=np.int64)
+    threshold = max(min_periods, 1)
+    for t in range(a.shape[-1]):
+        v = a[:, t]
+        ok = ~np.isnan(v)
+        state = np.where(ok & np.isnan(state), v, np.where(ok, (1 - alpha) * state + alpha * v, state))
+        count += ok
+        out[:, t] = np.where(count >= threshold, state, np.nan)
+    return out
+
+def ema(x, span, min_periods=None):
+    """ta's _ema: ewm(span=span, min_periods=span, adjust=False)."""
+    a, dtype, squeeze = _prepare(x)
+    return _finish(_ewm(a, 2 / (span + 1), span if min_periods is None else min_periods), dtype, squeeze)
+
+# --- Indicators ---
+
+def _gains_losses(a):
+    diff = np.full(a.shape, np.nan)
+    diff[..., 1:] = a[..., 1:] - a[..., :-1]
+    present = ~np.isnan(a)
+    # Like ta: the first bar's (NaN) change counts as no move
+    up = np.where(present, np.where(diff > 0, diff, 0.0), np.nan)
+    down = np.where(present, np.where(diff < 0, -diff, 0.0), np.nan)
+    return up, down
+
+def wilder_averages(x, window=14):
+    """Raw Wilder averages of gains and losses (no warm-up masking), e.g. for stored state."""
+    a, dtype, squeeze = _prepare(x)
+    up, down = _gains_losses(a)
+    alpha = 1 / window
+    return _finish(_ewm(up, alpha, 0), dtype, squeeze), _finish(_ewm(down, alpha, 0), dtype, squeeze)
+
+def rsi(x, window=14, smoothing='wilder'):
+    """
+    RSIIndicator(window).rsi(). smoothing='sma' gives the simple-average (Cutler)
+    variant used by earnings_predictor.
+    """
+    a, dtype, squeeze = _prepare(x)
+    up, down = _gains_losses(a)
+    if smoothing == 'wilder':
+        avg_up, avg_down = _ewm(up, 1 / window, window), _ewm(down, 1 / window, window)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out = np.where(avg_down == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_up / avg_down))
+        out = np.where(np.isnan(avg_down), np.nan, out)
+    elif smoothing == 'sma':
+        avg_up, avg_down = _rolling_sum(up, window) / window, _rolling_sum(down, window) / window
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out = 100.0 - 100.0 / (1.0 + avg_up / avg_down)
+    else:
+        raise ValueError(f"Unknown RSI smoothing: {smoothing}")
+    return _finish(out, dtype, squeeze)
+
+def macd(x, fast=12, slow=26, sign=9):
+    """MACD(close, slow, fast, sign): returns (macd, signal, diff)."""
+    a, dtype, squeeze = _prepare(x)
+    line = _ewm(a, 2 / (fast + 1), fast) - _ewm(a, 2 / (slow + 1), slow)
+    signal = _ewm(line, 2 / (sign + 1), sign)
+    return tuple(_finish(v, dtype, squeeze) for v in (line, signal, line - signal))
+
+def bollinger(x, window=20, dev=2):
+    """BollingerBands(window, window_dev=dev): returns (mavg, hband, lband)."""
+    a, dtype, squeeze = _prepare(x)
+    mavg = _rolling_sum(a, window) / window
+    std = _rolling_std(a, window, ddof=0)
+    return tuple(_finish(v, dtype, squeeze) for v in (mavg, mavg + dev * std, mavg - dev * std))
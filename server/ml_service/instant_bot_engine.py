@@ -3,68 +3,90 @@ import sys
 import datetime
 import json
 import argparse
-import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
-from ta.volatility import BollingerBands
-from ta.momentum import RSIIndicator
+from bar_cache import get_bar_cache
+from node_adapter import get_adapter_client
+from run_trace import start_trace, end_trace, span, TRACE_ROLL_SPANS
+from indicator_state import get_indicator_store, IndicatorState, RSI_WINDOW, BB_WINDOW, BB_DEV, RET_LONG
+import indicators
 
-def get_node_adapter_path():
-    return os.path.join(os.path.dirname(__file__), 'fetch_stock_history.js')
+MIN_BARS = 20 # Bollinger window: fewer bars give no bands to target
+SCAN_FETCH_WORKERS = int(os.getenv('INSTANT_SCAN_FETCH_WORKERS', '8')) # Concurrent bar fetches in scan mode
+
+# Server mode keeps recently used bars in memory for this many seconds (0 = off, CLI mode),
+# for at most WARM_BARS_MAX (ticker, period, interval) keys
+WARM_BARS_TTL = 0
+WARM_BARS_MAX = int(os.getenv('INSTANT_WARM_BARS_MAX', '512'))
+_warm_bars = {} # key -> (stored at, bars), oldest first
+_warm_lock = threading.Lock()
+
+def _remember_bars(key, df):
+    now = time.time()
+    with _warm_lock:
+        _warm_bars.pop(key, None)
+        _warm_bars[key] = (now, df)
+        # Oldest first, so expired entries (and any over the cap) are at the front
+        while _warm_bars:
+            oldest = next(iter(_warm_bars))
+            if now - _warm_bars[oldest][0] < WARM_BARS_TTL and len(_warm_bars) <= WARM_BARS_MAX:
+                break
+            del _warm_bars[oldest]
 
 def fetch_data(ticker, period_days=20, interval='1h'): # Intraday default
+    key = (ticker, period_days, interval)
+    if WARM_BARS_TTL > 0:
+        with _warm_lock:
+            hit = _warm_bars.get(key)
+        if hit is not None and time.time() - hit[0] < WARM_BARS_TTL:
+            return hit[1]
+
     end_date = datetime.datetime.now() + datetime.timedelta(days=1)
     # Yahoo Limit: 60d for 1h data. 7d for 1m. limit to 20d for safety.
     start_date = end_date - datetime.timedelta(days=period_days)
     
-    script_path = get_node_adapter_path()
     try:
-        # Pass interval as 4th arg
-        cmd = ['node', script_path, ticker, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'), interval]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        data = json.loads(result.stdout)
-        if not data or 'error' in data: return None
-        
-        df = pd.DataFrame(data)
-        df.rename(columns={'date': 'Date', 'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume'}, inplace=True)
-        df['Date'] = pd.to_datetime(df['Date'])
-        df.set_index('Date', inplace=True)
-        df.sort_index(inplace=True)
-        if df.index.tz is not None: df.index = df.index.tz_convert(None)
-        return df
+        df = get_bar_cache().get_bars(ticker, start_date, end_date, interval, get_adapter_client().fetch)
     except:
         return None
 
+    if WARM_BARS_TTL > 0 and df is not None:
+        _remember_bars(key, df)
+    return df
+
 def analyze_instant_setup(ticker, interval='1h'):
     # Try requested interval (default 1h)
-    df = fetch_data(ticker, interval=interval)
+    with span('fetch', ticker, interval=interval):
+        df = fetch_data(ticker, interval=interval)
     
     # Fallback to Daily if Intraday fails
     if (df is None or len(df) < 20) and interval != '1d':
         # print(f"Fallback: {interval} -> 1d") # Debug
         interval = '1d'
-        df = fetch_data(ticker, period_days=90, interval='1d')
+        with span('fetch', ticker, interval='1d'):
+            df = fetch_data(ticker, period_days=90, interval='1d')
 
-    if df is None or len(df) < 20:
+    if df is None or len(df) < MIN_BARS:
         return {"error": "Insufficient data"}
 
     col = 'Close'
-    current_price = df[col].iloc[-1]
-    
-    # 1. Bollinger Bands Squeeze
-    bb = BollingerBands(close=df[col], window=20, window_dev=2)
-    df['bb_h'] = bb.bollinger_hband()
-    df['bb_l'] = bb.bollinger_lband()
-    df['bb_m'] = bb.bollinger_mavg()
-    df['bb_w'] = (df['bb_h'] - df['bb_l']) / df['bb_l']
     
-    # 2. RSI
-    rsi = RSIIndicator(close=df[col], window=14)
-    df['rsi'] = rsi.rsi()
+    with span('featurize', ticker):
+        # Bollinger Bands (20, 2) + RSI 14 for the latest bar, from the stored
+        # indicator state (only bars since the last call are folded in)
+        latest = get_indicator_store().latest(ticker, interval, df[col])
     
-    last_rsi = df['rsi'].iloc[-1]
+    return signal_from_row(ticker, latest, interval)
+
+def signal_from_row(ticker, latest, interval):
+    """Direction/target/rationale from one indicator row (see indicator_state.ROW_COLUMNS)."""
+    current_price = latest['Close']
+    last_rsi = latest['RSI']
     
-    mid_band = df['bb_m'].iloc[-1]
+    mid_band = latest['BB_Mid']
     
     # Logic for Intraday (1H)
     # Overbought/Oversold thresholds tighter or standard? Standard 30/70 works for 1H.
@@ -83,15 +105,15 @@ def analyze_instant_setup(ticker, interval='1h'):
         if interval == '1d': timeframe = "2-3 Days"
     else:
         # Momentum check
-        ret_5 = df[col].pct_change(5).iloc[-1] # 5 hours return
+        ret_5 = latest['Ret_5d'] # 5 hours return
         if ret_5 > 0:
             direction = "Bullish"
-            target = df['bb_h'].iloc[-1] # Target upper band
+            target = latest['BB_High'] # Target upper band
             rationale = "Bullish Momentum Continuation"
             timeframe = "Short Term (4H)"
         else:
             direction = "Bearish"
-            target = df['bb_l'].iloc[-1] # Target lower band
+            target = latest['BB_Low'] # Target lower band
             rationale = "Bearish Momentum Continuation"
             timeframe = "Short Term (4H)"
 
@@ -117,15 +139,247 @@ def analyze_instant_setup(ticker, interval='1h'):
         "interval": interval
     }
 
+def safe_analyze(ticker, interval='1h'):
+    try:
+        # Self time of 'predict' is the signal logic; fetch/featurize are nested spans
+        with span('predict', ticker):
+            return analyze_instant_setup(ticker, interval=interval)
+    except Exception as e:
+        return {"error": f"Engine Crash: {str(e)}", "ticker": ticker}
+
+def fetch_many(tickers, period_days=20, interval='1h', workers=SCAN_FETCH_WORKERS):
+    """fetch_data for several tickers concurrently (one shared adapter worker). {ticker: df or None}"""
+    if not tickers:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tickers)))) as pool:
+        frames = pool.map(lambda t: fetch_data(t, period_days=period_days, interval=interval), tickers)
+        return dict(zip(tickers, frames))
+
+def latest_rows(closes):
+    """
+    Signal inputs (see signal_from_row) for the last bar of each close array. The
+    arrays are stacked into one (tickers x time) panel, so Bollinger (20, 2), RSI 14
+    and the 5-bar return are computed for the whole group in one pass.
+    """
+    panel = indicators.to_panel(closes)
+    mid, high, low = (band[:, -1] for band in indicators.bollinger(panel, BB_WINDOW, BB_DEV))
+    rsi = indicators.rsi(panel, RSI_WINDOW)[:, -1]
+    ret_5 = indicators.pct_change(panel, RET_LONG)[:, -1]
+    return [
+        {'Close': float(panel[i, -1]), 'RSI': float(rsi[i]), 'BB_Mid': float(mid[i]),
+         'BB_High': float(high[i]), 'BB_Low': float(low[i]), 'Ret_5d': float(ret_5[i])}
+        for i in range(len(closes))
+    ]
+
+def scan(tickers, interval='1h', workers=SCAN_FETCH_WORKERS):
+    """
+    analyze_instant_setup for a list of tickers in one invocation. Bars are fetched
+    concurrently and the signal logic runs once per interval group on a stacked panel.
+    The 1h -> 1d fallback is per ticker: tickers short of intraday bars form a second,
+    daily group. Yields one result per ticker (with 'ticker' set, also on errors) as
+    soon as its group is done.
+    """
+    pending = list(dict.fromkeys(t.upper() for t in tickers if t))
+    groups = [(interval, 20)] + ([('1d', 90)] if interval != '1d' else [])
+    for group_interval, period_days in groups:
+        if not pending:
+            break
+        with span('fetch', interval=group_interval, rows=len(pending)):
+            frames = fetch_many(pending, period_days, group_interval, workers)
+        ready = [t for t in pending if frames[t] is not None and len(frames[t]) >= MIN_BARS]
+        if ready:
+            with span('featurize', interval=group_interval, rows=len(ready)):
+                rows = latest_rows([frames[t]['Close'].to_numpy(dtype='float64') for t in ready])
+            for ticker, row in zip(ready, rows):
+                try:
+                    yield signal_from_row(ticker, row, group_interval)
+                except Exception as e:
+                    yield {"error": f"Engine Crash: {str(e)}", "ticker": ticker}
+        done = set(ready)
+        pending = [t for t in pending if t not in done]
+    for ticker in pending:
+        yield {"error": "Insufficient data", "ticker": ticker}
+
+class BarStream:
+    """
+    Streaming analysis: per (ticker, interval) indicator state kept in memory, so each
+    closed bar costs one state update (no refetch, no recompute) and yields a signal
+    record once MIN_BARS bars are in. State starts from the on-disk indicator store
+    (if it has the ticker) and is written back by close().
+    """
+
+    def __init__(self, store=None, min_bars=MIN_BARS):
+        self.store = store or get_indicator_store()
+        self.min_bars = min_bars
+        self.states = {}
+        self.stats = {'bars': 0, 'records': 0, 'skipped': 0, 'seconds': 0.0}
+
+    def _state(self, ticker, interval):
+        key = (ticker, interval)
+        state = self.states.get(key)
+        if state is None:
+            state = self.states[key] = self.store.committed(ticker, interval) or IndicatorState()
+        return state
+
+    def on_bar(self, ticker, interval, ts, close):
+        """Folds in a closed bar. Returns its signal record, or None (warming up / stale bar)."""
+        t0 = time.perf_counter()
+        state = self._state(ticker, interval)
+        ts = pd.Timestamp(ts)
+        if state.last_ts is not None and ts <= state.last_ts:
+            self.stats['skipped'] += 1 # Duplicate or out-of-order bar
+            return None
+        row = state.update(ts, close)
+        self.stats['bars'] += 1
+        record = None
+        if state.count >= self.min_bars:
+            record = dict(signal_from_row(ticker, row, interval), ts=ts.isoformat(), bars=state.count)
+            self.stats['records'] += 1
+        self.stats['seconds'] += time.perf_counter() - t0
+        return record
+
+    def close(self):
+        for (ticker, interval), state in self.states.items():
+            self.store.commit(ticker, interval, state)
+
+    def summary(self):
+        s = self.stats
+        per_bar = s['seconds'] / s['bars'] * 1e6 if s['bars'] else 0.0
+        return (f"{s['bars']} bars over {len(self.states)} series, {s['records']} records, "
+                f"{s['skipped']} stale bars skipped, {per_bar:.0f} us/bar")
+
+def stream(source, default_interval='1h'):
+    """
+    Reads closed bars as NDJSON and writes one signal record per bar to stdout:
+      in : {"ticker": "AAPL", "ts": "2025-01-02T10:00:00", "close": 187.2, "interval": "1h"}
+      out: {...analyze_instant_setup output..., "ts": ..., "bars": ...}
+    source is a replay file path or '-' for stdin. Bars flagged "final": false (still
+    forming) are ignored.
+    """
+    out = sys.stdout
+    sys.stdout = sys.stderr
+    bars = BarStream()
+    handle = sys.stdin if source == '-' else open(source)
+    try:
+        for line in handle:
+            if not line.strip():
+                continue
+            try:
+                bar = json.loads(line)
+                if bar.get('final', True) is False:
+                    continue
+                record = bars.on_bar(bar['ticker'].upper(), bar.get('interval', default_interval), bar['ts'], float(bar['close']))
+            except (ValueError, KeyError, AttributeError) as e:
+                print(f"[Stream] Bad bar line ({e}): {line.strip()}")
+                continue
+            if record is not None:
+                out.write(json.dumps(record, default=float) + "\n")
+                out.flush()
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+        bars.close()
+        sys.stdout = out
+    print(f"[Stream] {bars.summary()}", file=sys.stderr)
+    return bars
+
+class InstantService:
+    """
+    Resident analysis service. Concurrent requests for the same (ticker, interval)
+    share one in-flight computation.
+    """
+
+    def __init__(self, workers=4):
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'computed': 0, 'coalesced': 0}
+
+    def submit(self, ticker, interval='1h'):
+        key = (ticker.upper(), interval)
+        with self.lock:
+            self.stats['requests'] += 1
+            future = self.inflight.get(key)
+            if future is not None:
+                self.stats['coalesced'] += 1
+                return future
+            future = self.pool.submit(safe_analyze, key[0], interval)
+            self.inflight[key] = future
+            self.stats['computed'] += 1
+        future.add_done_callback(lambda f: self._release(key, f))
+        return future
+
+    def _release(self, key, future):
+        with self.lock:
+            if self.inflight.get(key) is future:
+                del self.inflight[key]
+
+def serve(workers=4, warm_ttl=60):
+    """
+    Line-delimited request loop on stdin/stdout:
+      in : {"id": 1, "ticker": "AAPL", "interval": "1h"}
+      out: {"id": 1, "result": {...analyze_instant_setup output...}}
+    """
+    global WARM_BARS_TTL
+    WARM_BARS_TTL = warm_ttl
+
+    # stdout is the protocol channel; anything else printed goes to stderr
+    out = sys.stdout
+    sys.stdout = sys.stderr
+    write_lock = threading.Lock()
+    service = InstantService(workers=workers)
+    start_trace('instant', log=sys.stderr, roll_spans=TRACE_ROLL_SPANS, serve=True)
+
+    def respond(req_id, future):
+        line = json.dumps({"id": req_id, "result": future.result()}, default=float)
+        with write_lock:
+            out.write(line + "\n")
+            out.flush()
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            req = json.loads(line)
+        except ValueError:
+            print(f"[InstantService] Bad request line: {line.strip()}")
+            continue
+        future = service.submit(req.get('ticker', ''), req.get('interval', '1h'))
+        future.add_done_callback(lambda f, req_id=req.get('id'): respond(req_id, f))
+
+    service.pool.shutdown(wait=True)
+    end_trace()
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument('ticker', type=str)
+    parser.add_argument('ticker', type=str, nargs='?')
     parser.add_argument('--interval', type=str, default='1h')
+    parser.add_argument('--serve', action='store_true', help='Run as a resident service (NDJSON requests on stdin)')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent analyses in --serve mode')
+    parser.add_argument('--stream', type=str, nargs='?', const='-', help='Streaming mode: NDJSON bars from a replay file (or stdin), one signal per closed bar')
+    parser.add_argument('--tickers', type=str, help='Batch scan: comma-separated tickers, one JSON result per line')
     args = parser.parse_args()
+
+    if args.tickers:
+        start_trace('instant', log=sys.stderr, scan=True)
+        for result in scan(args.tickers.split(','), interval=args.interval):
+            print(json.dumps(result, default=float), flush=True)
+        end_trace()
+        sys.exit(0)
+
+    if args.stream:
+        stream(args.stream, default_interval=args.interval)
+        sys.exit(0)
+
+    if args.serve:
+        serve(workers=max(1, args.workers))
+        sys.exit(0)
+    if not args.ticker:
+        parser.error('ticker is required unless --serve, --stream or --tickers is given')
     
-    try:
-        result = analyze_instant_setup(args.ticker, interval=args.interval)
-        print(json.dumps(result))
-    except Exception as e:
-        print(json.dumps({"error": f"Engine Crash: {str(e)}", "ticker": args.ticker}))
-        sys.exit(0) # Exit 0 to pass JSON error to Node
+    # Trace summary goes to stderr: stdout must stay a single JSON document
+    start_trace('instant', log=sys.stderr, ticker=args.ticker)
+    result = safe_analyze(args.ticker, interval=args.interval)
+    end_trace()
+    print(json.dumps(result))
+    sys.exit(0) # Exit 0 even on errors to pass JSON error to Node
@@ -0,0 +1,182 @@
+import os
+import json
+import datetime
+import threading
+import numpy as np
+import pandas as pd
+
+from bar_cache import get_bar_cache
+from node_adapter import get_adapter_client
+import indicators
+
+# Shared Nasdaq-100 (QQQ) macro context for every engine.
+# The frame (Pct_Change, Macro_Trend = slope of SMA20, Macro_RSI = RSI14) is computed
+# at most once per day, persisted to disk, and extended bar by bar afterwards: the
+# Wilder averages behind the RSI are stored next to it, so a new bar costs O(1)
+# instead of recomputing two years of history.
+
+MACRO_SYMBOL = 'QQQ'
+LOOKBACK_DAYS = 730
+SMA_WINDOW = 20
+RSI_WINDOW = 14
+MACRO_DIR = os.getenv('MACRO_CACHE_DIR', os.path.join(os.path.dirname(__file__), 'cache', 'macro'))
+MACRO_COLUMNS = ['Pct_Change', 'Macro_Trend', 'Macro_RSI']
+
+_STATE_COLUMNS = ['Close', 'Pct_Change', 'SMA_20', 'Macro_Trend', 'Avg_Gain', 'Avg_Loss', 'Macro_RSI']
+
+_memo = {}
+_memo_lock = threading.Lock()
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    # Same convention as ta.momentum.RSIIndicator: no losses -> 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        return np.where(avg_loss == 0, 100.0, 100.0 - (100.0 / (1.0 + rs)))
+
+def compute_macro_frame(close):
+    """
+    Full computation over a Close series (matches the ta SMAIndicator/RSIIndicator output).
+    """
+    df = pd.DataFrame({'Close': close.astype('float64')})
+    df['Pct_Change'] = df['Close'].pct_change()
+    df['SMA_20'] = indicators.sma(df['Close'].to_numpy(), SMA_WINDOW)
+    df['Macro_Trend'] = df['SMA_20'].diff()
+
+    # Raw Wilder state (no min_periods) so later bars can continue the recursion
+    df['Avg_Gain'], df['Avg_Loss'] = indicators.wilder_averages(df['Close'].to_numpy(), RSI_WINDOW)
+    rsi = _rsi_from_averages(df['Avg_Gain'].to_numpy(), df['Avg_Loss'].to_numpy())
+    rsi[:RSI_WINDOW - 1] = np.nan
+    df['Macro_RSI'] = rsi
+    return df
+
+def extend_macro_frame(frame, new_close):
+    """
+    Appends bars to an already computed frame using only its last rows as state.
+    """
+    if new_close.empty:
+        return frame
+
+    closes = list(frame['Close'].iloc[-SMA_WINDOW:])
+    prev_close = closes[-1]
+    prev_sma = frame['SMA_20'].iloc[-1]
+    avg_gain = frame['Avg_Gain'].iloc[-1]
+    avg_loss = frame['Avg_Loss'].iloc[-1]
+    alpha = 1 / RSI_WINDOW
+
+    rows = []
+    for ts, c in new_close.items():
+        c = float(c)
+        change = c - prev_close
+        avg_gain = (1 - alpha) * avg_gain + alpha * max(change, 0.0)
+        avg_loss = (1 - alpha) * avg_loss + alpha * max(-change, 0.0)
+
+        closes.append(c)
+        closes = closes[-SMA_WINDOW:]
+        sma = float(np.mean(closes)) if len(closes) == SMA_WINDOW else np.nan
+
+        rows.append({
+            'Close': c,
+            'Pct_Change': c / prev_close - 1,
+            'SMA_20': sma,
+            'Macro_Trend': sma - prev_sma,
+            'Avg_Gain': avg_gain,
+            'Avg_Loss': avg_loss,
+            'Macro_RSI': float(_rsi_from_averages(np.array(avg_gain), np.array(avg_loss)))
+        })
+        prev_close, prev_sma = c, sma
+
+    added = pd.DataFrame(rows, index=new_close.index)
+    return pd.concat([frame, added])
+
+def _path(symbol):
+    return os.path.join(MACRO_DIR, f"{symbol}_macro.npz")
+
+def _load(symbol):
+    path = _path(symbol)
+    if not os.path.exists(path):
+        return None, None
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            meta = json.loads(str(z['meta']))
+            index = pd.DatetimeIndex(z['index'].astype('datetime64[ns]'), name='Date')
+            frame = pd.DataFrame({c: z[f"col_{c}"] for c in _STATE_COLUMNS}, index=index)
+        return frame, meta
+    except Exception as e:
+        print(f"  [Macro] Ignoring unreadable cache ({e}).")
+        return None, None
+
+def _save(symbol, frame, meta):
+    os.makedirs(MACRO_DIR, exist_ok=True)
+    path = _path(symbol)
+    tmp = path + '.tmp'
+    arrays = {f"col_{c}": frame[c].to_numpy(dtype='float64') for c in _STATE_COLUMNS}
+    with open(tmp, 'wb') as f:
+        np.savez(f, index=frame.index.values.astype('datetime64[ns]').astype('int64'), meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp, path)
+
+def _fetch_bars(symbol):
+    end_date = datetime.datetime.now() + datetime.timedelta(days=1)
+    start_date = end_date - datetime.timedelta(days=LOOKBACK_DAYS)
+    return get_bar_cache().get_bars(symbol, start_date, end_date, '1d', get_adapter_client().fetch)
+
+def _can_extend(stored, bars):
+    """The stored frame (minus its possibly partial last bar) must be a prefix of the new bars."""
+    if stored is None or len(stored) < SMA_WINDOW + 1:
+        return False
+    anchor = stored.index[-2]
+    if anchor not in bars.index:
+        return False
+    return np.isclose(bars.at[anchor, 'Close'], stored.at[anchor, 'Close'], rtol=1e-9)
+
+def get_macro_context(symbol=MACRO_SYMBOL, fetch_bars=_fetch_bars):
+    """
+    Returns the macro frame (Pct_Change, Macro_Trend, Macro_RSI) indexed by date.
+    Computed at most once per day; an empty frame if no data is available.
+    """
+    today = str(datetime.date.today())
+    with _memo_lock:
+        cached = _memo.get(symbol)
+        if cached is not None and cached[0] == today:
+            return cached[1]
+
+        stored, meta = _load(symbol)
+        if stored is not None and meta.get('as_of') == today:
+            frame = stored
+        else:
+            bars = None
+            try:
+                bars = fetch_bars(symbol)
+            except Exception as e:
+                print(f"  [Macro] Fetch failed for {symbol}: {e}")
+
+            if bars is None or bars.empty:
+                if stored is None:
+                    return pd.DataFrame({c: [] for c in MACRO_COLUMNS})
+                print(f"  [Macro] Using last stored {symbol} context ({meta.get('as_of')}).")
+                frame = stored
+            elif _can_extend(stored, bars):
+                base = stored.iloc[:-1]
+                new_close = bars.loc[bars.index > base.index[-1], 'Close']
+                frame = extend_macro_frame(base, new_close)
+                print(f"  [Macro] Extended {symbol} context by {len(new_close)} bar(s).")
+            else:
+                frame = compute_macro_frame(bars['Close'])
+                print(f"  [Macro] Recomputed {symbol} context over {len(frame)} bars.")
+
+            cutoff = pd.Timestamp(today) - pd.Timedelta(days=LOOKBACK_DAYS)
+            frame = frame.loc[frame.index >= cutoff]
+            _save(symbol, frame, {'as_of': today, 'symbol': symbol})
+
+        result = frame[MACRO_COLUMNS]
+        _memo[symbol] = (today, result)
+        return result
+
+def get_macro_state(symbol=MACRO_SYMBOL):
+    """Latest (trend, rsi) for engines that only need the current regime."""
+    frame = get_macro_context(symbol)
+    if frame.empty:
+        return 0.0, 50.0
+    last = frame.iloc[-1]
+    trend = 0.0 if pd.isna(last['Macro_Trend']) else float(last['Macro_Trend'])
+    rsi = 50.0 if pd.isna(last['Macro_RSI']) else float(last['Macro_RSI'])
+    return trend, rsi
@@ -0,0 +1,48 @@
+import os
+import sys
+
+try:
+    import resource
+except ImportError: # Windows: no getrusage
+    resource = None
+
+# Memory-lean pipeline mode shared by the engines.
+# PIPELINE_MODE=lean keeps only the OHLCV columns of fetched bars, as float32, and the
+# feature builders emit just the model columns (no intermediate indicator columns, no
+# defensive copies of the bars). XGBoost casts its input to float32 anyway, so the
+# models see the same precision; indicator recursions still accumulate in float64.
+# The bar cache keeps float64 on disk in both modes.
+# The RSS helpers back the per-ticker memory figures of the run trace.
+
+PIPELINE_MODE = os.getenv('PIPELINE_MODE', 'standard')
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+LEAN_DTYPE = 'float32'
+
+def is_lean():
+    return PIPELINE_MODE == 'lean'
+
+def compact_bars(df):
+    """Bars as the engines should hold them: OHLCV only as float32 in lean mode, unchanged otherwise."""
+    if not is_lean() or df is None:
+        return df
+    return df[[c for c in BAR_COLUMNS if c in df.columns]].astype(LEAN_DTYPE)
+
+def feature_dtype():
+    return LEAN_DTYPE if is_lean() else 'float64'
+
+def current_rss_mb():
+    """Resident set size now (Linux /proc), falling back to the peak where unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_mb()
+
+def peak_rss_mb():
+    """Process high-water RSS in MB (None without getrusage)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
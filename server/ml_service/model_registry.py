@@ -0,0 +1,243 @@
+import os
+import json
+import time
+import hashlib
+import datetime
+import threading
+import contextlib
+from collections import OrderedDict
+import xgboost as xgb
+
+try:
+    import fcntl
+except ImportError: # Windows: in-process lock only
+    fcntl = None
+
+# In-process registry for XGBoost models saved under models/.
+# Loaded boosters are kept in an LRU bounded by count and by on-disk size, and are
+# reloaded transparently when the file's mtime changes (e.g. after a train run).
+# Every model has a sidecar (<name>.meta.json) with its feature list, a hash of that
+# list and the last date it was trained on. Callers that pass the feature list they
+# will predict with get IncompatibleModelError for models trained on another schema,
+# and the model is put on the retrain queue, so the engines never find out via a
+# failed predict (and never retrain inline in a user-facing run).
+
+MAX_MODELS = int(os.getenv('MODEL_CACHE_MAX_MODELS', '64'))
+MAX_BYTES = int(os.getenv('MODEL_CACHE_MAX_MB', '256')) * 1024 * 1024
+RETRAIN_QUEUE_PATH = os.getenv('RETRAIN_QUEUE_PATH', os.path.join(os.path.dirname(__file__), 'models', '_retrain_queue.json'))
+
+class IncompatibleModelError(Exception):
+    def __init__(self, path, reason):
+        super().__init__(reason)
+        self.path = path
+        self.reason = reason
+
+def schema_hash(features):
+    """Order-sensitive fingerprint of a feature list (column order matters to XGBoost)."""
+    return hashlib.sha1(json.dumps(list(features)).encode()).hexdigest()[:16]
+
+def meta_path(path):
+    return os.path.splitext(path)[0] + '.meta.json'
+
+def read_model_meta(path):
+    """The sidecar of the model at path, or None if it has none (or it's unreadable)."""
+    try:
+        with open(meta_path(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_model_meta(path, features, train_end=None, **extra):
+    """Writes the sidecar for the model just saved at path. Returns the metadata."""
+    meta = {
+        'features': list(features),
+        'schema_hash': schema_hash(features),
+        'train_end': None if train_end is None else str(train_end)[:10],
+        'trained_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        **extra
+    }
+    tmp = meta_path(path) + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, default=str)
+    os.replace(tmp, meta_path(path))
+    return meta
+
+class RetrainQueue:
+    """
+    Models waiting for a background retrain, persisted as {model_path: job} in one JSON
+    file. A job says who owns the model (engine, ticker, interval) and why it's queued.
+    The engines and the --retrain-queued job update it from separate processes, so each
+    read-modify-write holds an OS lock on <queue>.lock.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or RETRAIN_QUEUE_PATH
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _locked(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path + '.lock', 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, jobs):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(jobs, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def add(self, model_path, reason, **job):
+        """Queues model_path (idempotent). Returns True if it wasn't queued yet."""
+        with self._locked():
+            jobs = self._read()
+            if model_path in jobs:
+                return False
+            jobs[model_path] = dict(job, reason=reason, queued_at=datetime.datetime.now().isoformat(timespec='seconds'))
+            self._write(jobs)
+            return True
+
+    def jobs(self, engine=None):
+        """[(model_path, job)] in queue order, optionally only one engine's."""
+        with self._locked():
+            return [(p, j) for p, j in self._read().items() if engine is None or j.get('engine') == engine]
+
+    def done(self, model_path):
+        with self._locked():
+            jobs = self._read()
+            if jobs.pop(model_path, None) is not None:
+                self._write(jobs)
+
+class ModelRegistry:
+    def __init__(self, max_models=MAX_MODELS, max_bytes=MAX_BYTES, queue=None):
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.queue = queue or RetrainQueue()
+        self._entries = OrderedDict()  # path -> (mtime, size, model, schema_hash)
+        self._rejected = {}            # path -> (mtime, schema_hash, reason)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'reloads': 0, 'evictions': 0, 'incompatible': 0, 'load_seconds': 0.0}
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_models or self._bytes > self.max_bytes):
+            _, (_, size, _, _) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.stats['evictions'] += 1
+
+    def _store(self, path, mtime, size, model, schema):
+        old = self._entries.pop(path, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._entries[path] = (mtime, size, model, schema)
+        self._bytes += size
+        self._evict()
+
+    def _reject(self, path, mtime, expected, reason, job):
+        with self._lock:
+            self._rejected[path] = (mtime, expected, reason)
+            self.stats['incompatible'] += 1
+        if job is not None and self.queue.add(path, reason, **job):
+            print(f"  [Model Registry] Queued {os.path.basename(path)} for retraining ({reason}).")
+        raise IncompatibleModelError(path, reason)
+
+    def get(self, path, model_cls=xgb.XGBRegressor, features=None, job=None):
+        """
+        Returns the model stored at path (cached), or None if the file doesn't exist.
+        With features, the model's sidecar must match that feature list; otherwise
+        IncompatibleModelError is raised and, with job (engine/ticker/interval info),
+        the model is queued for retraining.
+        """
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self.invalidate(path)
+            return None
+        expected = None if features is None else schema_hash(features)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == st.st_mtime_ns and expected in (None, entry[3]):
+                self._entries.move_to_end(path)
+                self.stats['hits'] += 1
+                return entry[2]
+            rejected = self._rejected.get(path)
+        if rejected is not None and rejected[:2] == (st.st_mtime_ns, expected):
+            self._reject(path, st.st_mtime_ns, expected, rejected[2], job)
+
+        # Metadata first: an incompatible model is rejected without loading the booster
+        meta = read_model_meta(path) if expected is not None else None
+        if meta is not None and meta.get('schema_hash') != expected:
+            self._reject(path, st.st_mtime_ns, expected, 'feature schema changed', job)
+
+        with self._lock:
+            if entry is not None:
+                self.stats['reloads'] += 1
+            self.stats['misses'] += 1
+
+        # Load outside the lock so one slow file doesn't block other tickers
+        t0 = time.perf_counter()
+        model = model_cls()
+        model.load_model(path)
+        elapsed = time.perf_counter() - t0
+
+        if expected is not None and meta is None:
+            # Saved before sidecars existed: the booster's own feature names decide
+            names = model.get_booster().feature_names
+            if names is None or schema_hash(names) != expected:
+                self._reject(path, st.st_mtime_ns, expected, 'no metadata, feature names differ', job)
+            write_model_meta(path, names, backfilled=True)
+
+        with self._lock:
+            self.stats['load_seconds'] += elapsed
+            self._store(path, st.st_mtime_ns, st.st_size, model, expected)
+            self._rejected.pop(path, None)
+        return model
+
+    def put(self, path, model, features=None):
+        """Registers a model that was just saved to path (avoids re-reading it)."""
+        st = os.stat(path)
+        with self._lock:
+            self._store(path, st.st_mtime_ns, st.st_size, model, None if features is None else schema_hash(features))
+            self._rejected.pop(path, None)
+        self.queue.done(path)
+
+    def invalidate(self, path):
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._bytes -= old[1]
+
+    def summary(self):
+        s = self.stats
+        lookups = s['hits'] + s['misses']
+        ratio = (s['hits'] / lookups * 100.0) if lookups else 0.0
+        return (f"hits={s['hits']} misses={s['misses']} reloads={s['reloads']} evictions={s['evictions']} "
+                f"incompatible={s['incompatible']} hit_ratio={ratio:.1f}% load_time={s['load_seconds'] * 1000:.0f} ms "
+                f"resident={len(self._entries)} ({self._bytes / 1024:.0f} KB)")
+
+_registry = None
+_registry_guard = threading.Lock()
+
+def get_model_registry():
+    """Process-wide registry shared by smart_bot_engine and earnings_model."""
+    global _registry
+    with _registry_guard:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
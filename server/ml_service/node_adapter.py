@@ -0,0 +1,174 @@
+import os
+import sys
+import json
+import atexit
+import itertools
+import threading
+import subprocess
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+# Shared client for the yahoo-finance2 Node adapter.
+# Instead of paying Node startup + the dynamic yahoo-finance2 import for every
+# ticker, one `node fetch_stock_history.js --serve` worker is kept alive per Python
+# process and requests are multiplexed over its stdin/stdout.
+
+ADAPTER_SCRIPT = os.path.join(os.path.dirname(__file__), 'fetch_stock_history.js')
+REQUEST_TIMEOUT = int(os.getenv('ADAPTER_TIMEOUT', '60'))
+# Consecutive timeouts after which the worker is taken as hung and killed (a new one starts)
+MAX_TIMEOUTS = int(os.getenv('ADAPTER_MAX_TIMEOUTS', '2'))
+
+class AdapterError(Exception):
+    pass
+
+class NodeAdapterClient:
+    """
+    Line-delimited client for the persistent adapter worker.
+
+    fetch(...) returns the adapter's raw JSON text, exactly what the one-shot CLI
+    prints, so callers (bar_cache) don't care which transport was used.
+    """
+
+    def __init__(self, command=None):
+        self.command = command or ['node', ADAPTER_SCRIPT, '--serve']
+        self.proc = None
+        self.pending = {}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.timeouts = 0 # Consecutive, reset by any reply
+        self.stats = {'requests': 0, 'workers_started': 0, 'fallbacks': 0, 'timeouts': 0, 'workers_killed': 0}
+
+    # --- Worker lifecycle ---
+
+    def _ensure_worker(self):
+        if self.proc is not None and self.proc.poll() is None:
+            return
+        self.proc = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1
+        )
+        self.stats['workers_started'] += 1
+        threading.Thread(target=self._read_loop, args=(self.proc,), daemon=True).start()
+
+    def _read_loop(self, proc):
+        for line in proc.stdout:
+            req_id, sep, payload = line.rstrip('\n').partition('\t')
+            if not sep or not req_id.isdigit():
+                continue # Not a reply (e.g. a library warning on stdout)
+            with self.lock:
+                entry = self.pending.pop(int(req_id), None)
+                self.timeouts = 0
+            if entry is not None:
+                entry[1].set_result(payload)
+
+        # Worker exited: fail whatever it still owed us, and don't queue on it again
+        # (poll() can still report it alive for a moment after its stdout closed)
+        with self.lock:
+            if self.proc is proc:
+                self.proc = None
+            owed = [rid for rid, (owner, _) in self.pending.items() if owner is proc]
+            owed = [self.pending.pop(rid)[1] for rid in owed]
+        for future in owed:
+            future.set_exception(AdapterError("Adapter worker exited"))
+
+    def close(self):
+        with self.lock:
+            proc, self.proc = self.proc, None
+        if proc is not None and proc.poll() is None:
+            try:
+                proc.stdin.close()
+                proc.wait(timeout=5)
+            except Exception:
+                proc.kill()
+
+    def _timed_out(self, future):
+        """Drops a request that got no reply; kills the worker after MAX_TIMEOUTS in a row."""
+        with self.lock:
+            owner, _ = self.pending.pop(future.req_id, (None, None))
+            self.stats['timeouts'] += 1
+            self.timeouts += 1
+            hung = owner is not None and owner is self.proc and self.timeouts >= MAX_TIMEOUTS
+            if hung:
+                self.proc, self.timeouts = None, 0
+                self.stats['workers_killed'] += 1
+        if hung:
+            print(f"  [Adapter] Worker hung ({MAX_TIMEOUTS} timeouts in a row). Restarting it.", file=sys.stderr)
+            owner.kill() # Its reader fails the requests it still owes
+
+    def _result(self, future):
+        try:
+            return future.result(timeout=REQUEST_TIMEOUT)
+        except FutureTimeout:
+            self._timed_out(future)
+            raise AdapterError(f"No reply within {REQUEST_TIMEOUT}s")
+
+    # --- Requests ---
+
+    def submit(self, ticker, start_str, end_str, interval='1d'):
+        """Queues one request on the worker. Returns a Future resolving to raw JSON text."""
+        future = Future()
+        with self.lock:
+            self._ensure_worker()
+            req_id = future.req_id = next(self.ids)
+            self.pending[req_id] = (self.proc, future)
+            self.stats['requests'] += 1
+            line = json.dumps({'id': req_id, 'ticker': ticker, 'start': start_str, 'end': end_str, 'interval': interval})
+            try:
+                self.proc.stdin.write(line + '\n')
+                self.proc.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                self.pending.pop(req_id, None)
+                future.set_exception(AdapterError(f"Adapter worker unavailable: {e}"))
+        return future
+
+    def _run_once(self, ticker, start_str, end_str, interval):
+        # Legacy path: one node process per request
+        self.stats['fallbacks'] += 1
+        cmd = ['node', ADAPTER_SCRIPT, ticker, start_str, end_str, interval]
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=REQUEST_TIMEOUT)
+        return result.stdout
+
+    def fetch(self, ticker, start_str, end_str, interval='1d'):
+        """Blocking single fetch. Falls back to a one-shot node process if the worker fails."""
+        try:
+            return self._result(self.submit(ticker, start_str, end_str, interval))
+        except (AdapterError, OSError) as e:
+            print(f"  [Adapter] Worker failed ({e}). Falling back to one-shot fetch for {ticker}.", file=sys.stderr)
+            return self._run_once(ticker, start_str, end_str, interval)
+
+    def fetch_many(self, requests):
+        """
+        Sends all (ticker, start_str, end_str, interval) requests at once and returns
+        their payloads in the same order (None for requests that failed).
+        """
+        futures = []
+        for req in requests:
+            try:
+                futures.append(self.submit(*req))
+            except OSError as e:
+                futures.append(None)
+                print(f"  [Adapter] Could not queue {req[0]}: {e}", file=sys.stderr)
+
+        results = []
+        for req, future in zip(requests, futures):
+            try:
+                results.append(self._result(future) if future else None)
+            except Exception as e:
+                print(f"  [Adapter] {req[0]} failed: {e}", file=sys.stderr)
+                results.append(None)
+        return results
+
+_client = None
+_client_guard = threading.Lock()
+
+def get_adapter_client():
+    """Process-wide adapter client shared by all engines."""
+    global _client
+    with _client_guard:
+        if _client is None:
+            _client = NodeAdapterClient()
+            atexit.register(_client.close)
+        return _client
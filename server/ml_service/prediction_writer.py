@@ -0,0 +1,74 @@
+import time
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, AutoReconnect
+from run_trace import span
+
+# Batched prediction writes for the bot engines.
+# Documents get their _id client-side before the first attempt, so re-sending a batch
+# after a dropped connection can only produce duplicate-key errors for documents that
+# already landed, never a second copy of a prediction.
+
+DUPLICATE_KEY = 11000
+
+def load_pending_tickers(collection, user_ids):
+    """
+    One query for every ticker that already has a Pending prediction by any of
+    user_ids (replaces a find_one per bot x ticker).
+    """
+    return set(collection.distinct("stockTicker", {
+        "status": "Pending",
+        "userId": {"$in": list(user_ids)}
+    }))
+
+class BulkPredictionWriter:
+    def __init__(self, collection, batch_size=200, max_retries=3):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.buffer = []
+        self.stats = {'written': 0, 'round_trips': 0, 'retries': 0}
+
+    def add(self, doc):
+        doc.setdefault('_id', ObjectId())
+        self.buffer.append(doc)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        batch, self.buffer = self.buffer, []
+        with span('db_write', rows=len(batch)):
+            self._insert(batch)
+
+    def _insert(self, batch):
+        for attempt in range(self.max_retries + 1):
+            self.stats['round_trips'] += 1
+            try:
+                result = self.collection.insert_many(batch, ordered=False)
+                self.stats['written'] += len(result.inserted_ids)
+                return
+            except BulkWriteError as e:
+                details = e.details or {}
+                errors = details.get('writeErrors', [])
+                fatal = [err for err in errors if err.get('code') != DUPLICATE_KEY]
+                # Duplicate keys are documents an earlier (dropped) attempt already stored
+                self.stats['written'] += details.get('nInserted', 0) + len(errors) - len(fatal)
+                if fatal:
+                    raise
+                return
+            except AutoReconnect:
+                if attempt == self.max_retries:
+                    raise
+                self.stats['retries'] += 1
+                time.sleep(0.5 * (2 ** attempt))
+
+    def close(self):
+        self.flush()
+
+    def saved_round_trips(self, checks, reads=1):
+        """
+        Round trips saved against the per-prediction path (one find_one per uniqueness
+        check plus one insert_one per prediction), given the reads made instead.
+        """
+        return max(0, checks + self.stats['written'] - reads - self.stats['round_trips'])
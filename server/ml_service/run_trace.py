@@ -0,0 +1,198 @@
+import os
+import sys
+import json
+import time
+import datetime
+import threading
+import contextlib
+import itertools
+from memory_profile import current_rss_mb, peak_rss_mb
+
+# Per-stage timing for engine runs.
+# Code wraps each stage in `with span('fetch', ticker):`. While a trace is active every
+# finished span is appended to an NDJSON file (one JSON object per line) and, when the
+# run ends, a summary line with the slowest stages and tickers is appended and printed.
+# Spans may nest (a fetch inside a featurize); `self_ms` excludes the time of nested
+# spans and is what the summary adds up, so stage totals never double count.
+# Without an active trace span() is a no-op, so instrumented functions can be called
+# from tests and other scripts unchanged.
+# Spans of a ticker also record the process RSS when they end; the summary reports the
+# run's peak RSS and the tickers seen at the highest RSS (for sizing small machines).
+# Spans are folded into per-stage/per-ticker aggregates as they finish rather than kept.
+# A trace started with `roll_spans` (the resident --serve process, which never ends a
+# run) closes its file with a summary every `roll_spans` spans and continues in a new
+# part file, keeping only the last TRACE_KEEP_PARTS parts on disk.
+
+TRACE_DIR = os.getenv('RUN_TRACE_DIR', os.path.join(os.path.dirname(__file__), 'cache', 'traces'))
+TRACE_ENABLED = os.getenv('RUN_TRACE', 'on').lower() not in ('off', '0', 'false')
+TRACE_ROLL_SPANS = int(os.getenv('RUN_TRACE_ROLL_SPANS', '20000'))
+TRACE_KEEP_PARTS = int(os.getenv('RUN_TRACE_KEEP_PARTS', '3'))
+TOP_N = 5
+
+_run_seq = itertools.count(1)
+
+class RunTrace:
+    def __init__(self, engine, trace_dir=None, log=None, roll_spans=None, **tags):
+        self.engine = engine
+        self.run_id = f"{engine}_{datetime.datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}_{next(_run_seq)}"
+        self.log = log or sys.stdout
+        self.roll_spans = roll_spans
+        self.tags = tags
+        self.lock = threading.Lock()
+        self.local = threading.local() # Per-thread stack of open spans' child time
+
+        self.trace_dir = trace_dir or TRACE_DIR
+        os.makedirs(self.trace_dir, exist_ok=True)
+        self.part = 0
+        self.parts = []
+        self._open()
+
+    def _open(self):
+        self.started = time.perf_counter()
+        self.spans = 0
+        self.stages = {}
+        self.tickers = {}
+        self.ticker_rss = {}
+        name = self.run_id if self.roll_spans is None else f"{self.run_id}_part{self.part}"
+        self.path = os.path.join(self.trace_dir, f"{name}.ndjson")
+        self.file = open(self.path, 'w')
+        self.parts.append(self.path)
+        self._write({'type': 'run', 'run_id': self.run_id, 'engine': self.engine, 'part': self.part,
+                     'started_at': datetime.datetime.now().isoformat(timespec='seconds'), **self.tags})
+
+    def _roll(self):
+        """Closes the current part with its summary and starts the next one (caller holds the lock)."""
+        summary = self.summary()
+        self._write(summary)
+        self.file.close()
+        self._report(summary)
+        self.part += 1
+        while len(self.parts) >= TRACE_KEEP_PARTS > 0:
+            with contextlib.suppress(OSError):
+                os.remove(self.parts.pop(0))
+        self._open()
+
+    def _add(self, record):
+        self.spans += 1
+        st = self.stages.setdefault(record['stage'], {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        st['count'] += 1
+        st['total_ms'] += record['self_ms']
+        st['max_ms'] = max(st['max_ms'], record['self_ms'])
+        ticker = record['ticker']
+        if ticker:
+            self.tickers[ticker] = self.tickers.get(ticker, 0.0) + record['self_ms']
+            if record.get('rss_mb') is not None:
+                self.ticker_rss[ticker] = max(self.ticker_rss.get(ticker, 0.0), record['rss_mb'])
+
+    def _write(self, record):
+        self.file.write(json.dumps(record, default=str) + '\n')
+        self.file.flush()
+
+    @contextlib.contextmanager
+    def span(self, stage, ticker=None, **tags):
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        stack.append(0.0)
+        t0 = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            elapsed = time.perf_counter() - t0
+            child = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            record = {
+                'type': 'span', 'stage': stage, 'ticker': ticker,
+                'offset_ms': round((t0 - self.started) * 1000, 2),
+                'ms': round(elapsed * 1000, 2),
+                'self_ms': round((elapsed - child) * 1000, 2),
+                'depth': len(stack),
+                'thread': threading.current_thread().name
+            }
+            if ticker:
+                record['rss_mb'] = _round(current_rss_mb())
+            if tags:
+                record.update(tags)
+            if error:
+                record['error'] = error
+            with self.lock:
+                self._add(record)
+                self._write(record)
+                if self.roll_spans and self.spans >= self.roll_spans:
+                    self._roll()
+
+    def summary(self):
+        slowest_stages = sorted(self.stages.items(), key=lambda kv: kv[1]['total_ms'], reverse=True)
+        slowest_tickers = sorted(self.tickers.items(), key=lambda kv: kv[1], reverse=True)[:TOP_N]
+        heaviest_tickers = sorted(self.ticker_rss.items(), key=lambda kv: kv[1], reverse=True)[:TOP_N]
+        return {
+            'type': 'summary',
+            'run_id': self.run_id,
+            'part': self.part,
+            'wall_ms': round((time.perf_counter() - self.started) * 1000, 2),
+            'spans': self.spans,
+            'tickers': len(self.tickers),
+            'stages': {name: {k: round(v, 2) for k, v in st.items()} for name, st in slowest_stages},
+            'slowest_tickers': [{'ticker': t, 'ms': round(ms, 2)} for t, ms in slowest_tickers],
+            'peak_rss_mb': _round(peak_rss_mb()),
+            'rss_tickers': [{'ticker': t, 'rss_mb': mb} for t, mb in heaviest_tickers]
+        }
+
+    def close(self):
+        with self.lock:
+            summary = self.summary()
+            self._write(summary)
+            self.file.close()
+        self._report(summary)
+        return summary
+
+    def _report(self, summary):
+        out = self.log
+        print(f"  [Trace] {self.engine}: {summary['wall_ms'] / 1000:.1f}s wall, {summary['spans']} spans over {summary['tickers']} tickers -> {self.path}", file=out)
+        for name, st in list(summary['stages'].items())[:TOP_N]:
+            print(f"  [Trace]   stage {name:<12} {st['total_ms'] / 1000:8.2f}s total  x{st['count']:<5} max {st['max_ms']:.0f} ms", file=out)
+        for t in summary['slowest_tickers']:
+            print(f"  [Trace]   ticker {t['ticker']:<11} {t['ms'] / 1000:8.2f}s", file=out)
+        if summary['peak_rss_mb'] is not None:
+            heaviest = ', '.join(f"{t['ticker']} {t['rss_mb']:.0f}" for t in summary['rss_tickers'])
+            print(f"  [Trace]   peak RSS {summary['peak_rss_mb']:.0f} MB" + (f" | highest per ticker (MB): {heaviest}" if heaviest else ''), file=out)
+
+def _round(mb):
+    return None if mb is None else round(mb, 1)
+
+_active = None
+_active_guard = threading.Lock()
+
+def start_trace(engine, log=None, roll_spans=None, **tags):
+    """Starts the process-wide trace (returns None when RUN_TRACE=off or unwritable).
+    Long-lived processes pass roll_spans to bound the trace file (see RunTrace)."""
+    global _active
+    if not TRACE_ENABLED:
+        return None
+    with _active_guard:
+        if _active is not None:
+            _active.close()
+        try:
+            _active = RunTrace(engine, log=log, roll_spans=roll_spans, **tags)
+        except OSError as e:
+            print(f"  [Trace] Disabled ({e}).", file=log or sys.stdout)
+            _active = None
+        return _active
+
+def end_trace():
+    """Closes the active trace and returns its summary (None if no trace was running)."""
+    global _active
+    with _active_guard:
+        trace, _active = _active, None
+    return trace.close() if trace is not None else None
+
+def span(stage, ticker=None, **tags):
+    trace = _active
+    if trace is None:
+        return contextlib.nullcontext()
+    return trace.span(stage, ticker, **tags)
@@ -3,15 +3,22 @@ import sys
 import datetime
 import json
 import argparse
-import subprocess
 import pandas as pd
 import numpy as np
-import xgboost as xgb
 from pymongo import MongoClient
 from dotenv import load_dotenv
-from ta.momentum import RSIIndicator
-from ta.trend import SMAIndicator, MACD
-from ta.volatility import BollingerBands
+from bar_cache import get_bar_cache
+from node_adapter import get_adapter_client
+from model_registry import get_model_registry, read_model_meta, write_model_meta, IncompatibleModelError
+from macro_context import get_macro_state
+from prediction_writer import BulkPredictionWriter, load_pending_tickers
+from run_trace import start_trace, end_trace, span
+from train_profile import fit_profiled
+from indicator_state import get_indicator_store, IndicatorState, state_matches, MACD_SLOW, MACD_SIGN
+from feature_store import get_feature_store
+from memory_profile import is_lean, feature_dtype
+from acquisition import acquire, get_acquirer
+import indicators
 
 # Load env variables
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
@@ -34,136 +41,340 @@ MODELS_DIR = os.path.join(os.path.dirname(__file__), 'models')
 if not os.path.exists(MODELS_DIR):
     os.makedirs(MODELS_DIR)
 
-def get_node_adapter_path():
-    return os.path.join(os.path.dirname(__file__), 'fetch_stock_history.js')
-
 def fetch_data(ticker, period_days=730):
     """
-    Fetches historical data using the Node.js adapter.
+    Fetches historical data using the Node.js adapter (via the on-disk bar cache).
     """
     end_date = datetime.datetime.now() + datetime.timedelta(days=1)
     start_date = end_date - datetime.timedelta(days=period_days)
     
-    script_path = get_node_adapter_path()
-    
     try:
-        cmd = ['node', script_path, ticker, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        
-        data = json.loads(result.stdout)
-        if not data or 'error' in data:
-            return None
-            
-        df = pd.DataFrame(data)
-        df.rename(columns={'date': 'Date', 'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume'}, inplace=True)
-        df['Date'] = pd.to_datetime(df['Date'])
-        df.set_index('Date', inplace=True)
-        df.sort_index(inplace=True)
-        
-        if df.index.tz is not None:
-            df.index = df.index.tz_convert(None)
-            
-        return df
+        return get_bar_cache().get_bars(ticker, start_date, end_date, '1d', get_adapter_client().fetch)
     except Exception as e:
         # print(f"  [Data Error] {ticker}: {e}")
         return None
 
+FEATURES = ['Ret_1d', 'Ret_5d', 'RSI', 'Trend_Signal', 'Vol_20d', 'MACD', 'MACD_Diff', 'BB_Pos']
+# Bars needed for 50 complete feature rows (the MACD histogram is the last to warm up)
+MIN_BARS = 50 + MACD_SLOW + MACD_SIGN - 2
+
 def prepare_features(df):
     """
     Generates technical features for XGBoost.
     """
-    if df is None or len(df) < 50: return None, None
-    
-    df = df.copy()
+    return prepare_features_many([df])[0]
+
+def prepare_features_many(dfs):
+    """
+    prepare_features for several tickers at once: the closes are stacked into one
+    (tickers x time) panel and every indicator is computed in a single pass.
+    Returns a list of (df, features) / (None, None), in input order.
+    In lean pipeline mode each frame holds only Close, the features and Y_Next (float32)
+    and the input bars are not copied.
+    """
+    results = [(None, None)] * len(dfs)
+    usable = [i for i, df in enumerate(dfs) if df is not None and len(df) >= 50]
+    if not usable:
+        return results
+
     col = 'Close'
+    close = indicators.to_panel([dfs[i][col].to_numpy() for i in usable], dtype=feature_dtype())
     
     # Features
-    df['Ret_1d'] = df[col].pct_change()
-    df['Ret_5d'] = df[col].pct_change(5)
-    
-    rsi = RSIIndicator(close=df[col], window=14)
-    df['RSI'] = rsi.rsi()
-    
-    df['SMA_20'] = SMAIndicator(close=df[col], window=20).sma_indicator()
-    df['SMA_50'] = SMAIndicator(close=df[col], window=50).sma_indicator()
-    df['Trend_Signal'] = np.where(df['SMA_20'] > df['SMA_50'], 1, -1)
-    
-    df['Vol_20d'] = df['Ret_1d'].rolling(20).std()
-
+    ret_1d = indicators.pct_change(close)
+    sma_20 = indicators.sma(close, 20)
+    sma_50 = indicators.sma(close, 50)
     # 5. MACD (Scientific/Standard ML Feature)
-    macd = MACD(close=df[col])
-    df['MACD'] = macd.macd()
-    df['MACD_Diff'] = macd.macd_diff() # Histogram usually very predictive
-
+    macd, _, macd_diff = indicators.macd(close) # Histogram usually very predictive
     # 6. Bollinger Bands
-    bb = BollingerBands(close=df[col], window=20, window_dev=2)
-    df['BB_High'] = bb.bollinger_hband()
-    df['BB_Low'] = bb.bollinger_lband()
-    # Distance from bands
-    df['BB_Pos'] = (df[col] - df['BB_Low']) / (df['BB_High'] - df['BB_Low'])
-    
-    # Target (for training)
-    df['Y_Next'] = df[col].shift(-1) / df[col] - 1
-    
-    features = ['Ret_1d', 'Ret_5d', 'RSI', 'Trend_Signal', 'Vol_20d', 'MACD', 'MACD_Diff', 'BB_Pos']
-    df.dropna(subset=features, inplace=True)
+    _, bb_high, bb_low = indicators.bollinger(close, 20, 2)
+    panel = {
+        'Ret_1d': ret_1d,
+        'Ret_5d': indicators.pct_change(close, 5),
+        'RSI': indicators.rsi(close, 14),
+        'SMA_20': sma_20,
+        'SMA_50': sma_50,
+        'Trend_Signal': np.where(sma_20 > sma_50, 1, -1),
+        'Vol_20d': indicators.rolling_std(ret_1d, 20),
+        'MACD': macd,
+        'MACD_Diff': macd_diff,
+        'BB_High': bb_high,
+        'BB_Low': bb_low,
+        # Distance from bands
+        'BB_Pos': (close - bb_low) / (bb_high - bb_low)
+    }
     
-    return df, features
+    features = list(FEATURES)
+    if is_lean():
+        # Intermediates (SMAs, bands) were only needed to derive the features above
+        panel = {name: panel[name] for name in features}
+    for row, i in enumerate(usable):
+        n = len(dfs[i])
+        df = pd.DataFrame({col: dfs[i][col]}) if is_lean() else dfs[i].copy()
+        for name, values in panel.items():
+            df[name] = indicators.from_panel(values[row], n)
+        # Target (for training)
+        df['Y_Next'] = df[col].shift(-1) / df[col] - 1
+        df.dropna(subset=features, inplace=True)
+        results[i] = (df, features)
+    return results
+
+def latest_feature_row(ticker, df):
+    """
+    Features of the latest bar only, from the incremental indicator state (O(new bars)
+    instead of recomputing the whole history). 1-row DataFrame, or None if too short.
+    """
+    if df is None or len(df) < MIN_BARS: return None
+    row = get_indicator_store().latest(ticker, '1d', df['Close'])
+    if row['bars'] < MIN_BARS or any(pd.isna(row[f]) for f in FEATURES): return None
+    return pd.DataFrame([row], index=df.index[-1:])[['Close'] + FEATURES]
+
+# --- Feature Store ---
+# Training rows (features + next-bar return) are kept in the memory-mapped feature
+# store and extended bar by bar from the indicator state saved with them, so training
+# reads a matrix instead of featurizing the whole history on every run.
+FEATURE_SET = 'smart'
+STORE_COLUMNS = FEATURES + ['Y_Next']
+
+def update_feature_store(ticker, df):
+    """
+    Brings the ticker's stored training rows up to the bars in df; returns the row count.
+    A bar's row is stored once the following bar has settled (the last bar may still be
+    forming). Restated bars (closes no longer matching the saved state) rebuild the rows.
+    """
+    store = get_feature_store()
+    if df is None or len(df) < 2:
+        return 0
+    settled = df['Close'].iloc[:-1]
+    with store.lock_for(FEATURE_SET, ticker):
+        entry = store.entry(FEATURE_SET, STORE_COLUMNS, ticker)
+        saved = (entry or {}).get('state') or {}
+        state = IndicatorState.from_dict(saved['indicators']) if saved.get('indicators') else None
+        append = state_matches(state, settled)
+        if append:
+            pending = saved.get('pending') # Feature row of the last bar, waiting for its target
+            new = settled[settled.index > state.last_ts]
+            if new.empty:
+                return entry['rows']
+        else:
+            state, pending, new = IndicatorState(), None, settled
+
+        dates, rows = [], []
+        for ts, close in new.items():
+            if pending is not None and not any(np.isnan(pending['features'])):
+                dates.append(pending['ts'])
+                rows.append(pending['features'] + [close / pending['close'] - 1])
+            row = state.update(ts, close)
+            pending = {'ts': ts.isoformat(), 'close': float(close), 'features': [float(row[f]) for f in FEATURES]}
+
+        values = np.array(rows, dtype='float64').reshape(-1, len(STORE_COLUMNS))
+        return store.write(FEATURE_SET, STORE_COLUMNS, ticker, pd.DatetimeIndex(dates), values,
+                           state={'indicators': state.to_dict(), 'pending': pending}, append=append)
+
+def training_matrix(ticker, df):
+    """
+    (X, y) of the per-ticker model: every row of the bars' window whose next-bar return
+    is known. Read from the feature store (updated first; older stored rows are left
+    out) or, with the store off, featurized from df. (None, None) if there are fewer
+    than 50 rows.
+    """
+    if df is None or df.empty: return None, None
+    store = get_feature_store()
+    if store.enabled:
+        update_feature_store(ticker, df)
+        dates, values = store.read(FEATURE_SET, STORE_COLUMNS, ticker, start=df.index[0])
+        X = pd.DataFrame(values[:, :-1], index=pd.DatetimeIndex(dates), columns=FEATURES, copy=False)
+        y = values[:, -1]
+    else:
+        df_clean, _ = prepare_features(df)
+        if df_clean is None: return None, None
+        # Last row has no next-day target yet
+        X, y = df_clean.iloc[:-1][FEATURES], df_clean.iloc[:-1]['Y_Next']
+    if len(X) < 50: return None, None
+    return X, y
 
 def get_model_path(ticker, interval):
     return os.path.join(MODELS_DIR, f"{ticker}_{interval}.json")
 
-def load_model(ticker, interval):
-    path = get_model_path(ticker, interval)
-    if os.path.exists(path):
-        model = xgb.XGBRegressor()
-        model.load_model(path)
-        return model
+# Rudimentary Sector Map (Top tickers) - Expand as needed
+SECTOR_MAP = {
+    'Technology': ['AAPL', 'MSFT', 'NVDA', 'GOOGL', 'AMZN', 'TSLA', 'AMD', 'INTC', 'ORCL', 'IBM', 'CRM', 'ADBE'],
+    'Finance': ['JPM', 'BAC', 'WFC', 'C', 'GS', 'MS', 'V', 'MA'],
+    'Energy': ['XOM', 'CVX', 'COP', 'SLB', 'EOG'],
+    'Healthcare': ['JNJ', 'PFE', 'UNH', 'LLY', 'MRK', 'ABBV']
+}
+SECTOR_IDS = {name: i + 1 for i, name in enumerate(SECTOR_MAP)} # 0 = Other
+
+def get_sector(ticker):
+    for name, members in SECTOR_MAP.items():
+        if ticker in members:
+            return name
     return None
 
-def save_model(model, ticker, interval):
+# --- Pooled Mode ---
+# One booster per interval trained on every ticker's rows stacked together, with
+# Ticker_Id / Sector_Id columns so it can still learn per-name and per-sector offsets.
+POOLED_ID_FEATURES = ['Ticker_Id', 'Sector_Id']
+
+def get_pooled_model_path(interval):
+    return os.path.join(MODELS_DIR, f"_POOLED_{interval}.json")
+
+def add_id_features(df, ticker, ticker_ids):
+    # Tickers the pooled model never saw get a missing Ticker_Id (XGBoost routes NaN natively)
+    df['Ticker_Id'] = float(ticker_ids[ticker]) if ticker in ticker_ids else np.nan
+    df['Sector_Id'] = float(SECTOR_IDS.get(get_sector(ticker), 0))
+    return df
+
+def train_pooled_model(tickers, interval):
+    """
+    Stacks the feature frames of all tickers and fits one booster for the interval.
+    Returns (model, ticker_ids) or (None, {}) if no ticker had enough data.
+    """
+    t0 = datetime.datetime.now()
+    ticker_ids = {t: i for i, t in enumerate(sorted(set(tickers)))}
+    frames = []
+    for ticker in ticker_ids:
+        with span('fetch', ticker):
+            frames.append(fetch_data(ticker))
+    store = get_feature_store()
+    columns = FEATURES + POOLED_ID_FEATURES
+    if store.enabled:
+        # One float32 matrix filled straight from the per-ticker maps (no per-ticker frames)
+        with span('featurize', rows=len(frames)):
+            usable = [t for t, df in zip(ticker_ids, frames) if update_feature_store(t, df) >= 50]
+            # Only the fetched window (the store keeps older rows too)
+            start = min((df.index[0] for df in frames if df is not None and not df.empty), default=None)
+            dates, values, owner = store.read_many(FEATURE_SET, STORE_COLUMNS, usable, start=start, extra=len(POOLED_ID_FEATURES))
+        if len(values):
+            values[:, -2] = np.array([ticker_ids[t] for t in usable], dtype=values.dtype)[owner]
+            values[:, -1] = np.array([SECTOR_IDS.get(get_sector(t), 0) for t in usable], dtype=values.dtype)[owner]
+        pooled = pd.DataFrame(values, index=pd.DatetimeIndex(dates), columns=STORE_COLUMNS + POOLED_ID_FEATURES, copy=False)
+        n_tickers = len(usable)
+    else:
+        with span('featurize', rows=len(frames)):
+            prepared = prepare_features_many(frames)
+        parts = []
+        for ticker, (df_clean, _) in zip(ticker_ids, prepared):
+            if df_clean is None or len(df_clean) < 50: continue
+            # Last row has no next-day target yet
+            part = df_clean.iloc[:-1][FEATURES + ['Y_Next']].copy()
+            parts.append(add_id_features(part, ticker, ticker_ids))
+        pooled = pd.concat(parts) if parts else pd.DataFrame(columns=columns + ['Y_Next'])
+        n_tickers = len(parts)
+
+    if pooled.empty:
+        print(f"  [Pooled] No usable data for {interval}; nothing trained.")
+        return None, {}
+
+    params = dict(n_estimators=300, learning_rate=0.05, max_depth=5, objective='reg:squarederror', n_jobs=-1)
+    with span('train', rows=len(pooled)):
+        # Rows are stacked per ticker: the validation tail is the latest dates across all of them
+        model, _ = fit_profiled(params, pooled[columns], pooled['Y_Next'], dates=pooled.index, label=f"pooled {interval}")
+
+    path = get_pooled_model_path(interval)
+    model.save_model(path)
+    write_model_meta(path, columns, train_end=pooled.index.max(), ticker_ids=ticker_ids)
+    get_model_registry().put(path, model, columns)
+
+    elapsed = (datetime.datetime.now() - t0).total_seconds()
+    print(f"  [Pooled] Trained {interval} model on {len(pooled)} rows from {n_tickers} tickers in {elapsed:.1f}s.")
+    return model, ticker_ids
+
+def load_pooled_model(interval):
+    """
+    Returns (model, ticker_ids) or (None, {}) if the interval has no pooled model yet.
+    Raises IncompatibleModelError (and queues a retrain) if it was trained on other features.
+    """
+    path = get_pooled_model_path(interval)
+    meta = read_model_meta(path)
+    if meta is None or 'ticker_ids' not in meta:
+        return None, {}
+    job = {'engine': 'smart', 'ticker': None, 'interval': interval, 'pooled': True}
+    model = get_model_registry().get(path, features=FEATURES + POOLED_ID_FEATURES, job=job)
+    if model is None:
+        return None, {}
+    return model, meta['ticker_ids']
+
+def load_model(ticker, interval):
+    """
+    Cached: bots sharing a ticker reuse the same booster within (and across) runs.
+    Raises IncompatibleModelError (and queues a retrain) if it was trained on other features.
+    """
+    job = {'engine': 'smart', 'ticker': ticker, 'interval': interval}
+    return get_model_registry().get(get_model_path(ticker, interval), features=FEATURES, job=job)
+
+def save_model(model, ticker, interval, features, train_end=None):
     path = get_model_path(ticker, interval)
     model.save_model(path)
+    write_model_meta(path, features, train_end=train_end)
+    get_model_registry().put(path, model, features)
+
+def predict_pooled(ticker, df, pooled):
+    """
+    Scores the latest bar of ticker with the interval's pooled model.
+    """
+    with span('featurize', ticker):
+        last_row = latest_feature_row(ticker, df)
+    if last_row is None: return None
+
+    model, ticker_ids = pooled
+    features = FEATURES
+    last_row = add_id_features(last_row, ticker, ticker_ids)
+    prediction = model.predict(last_row[features + POOLED_ID_FEATURES])[0]
+
+    # Primary driver among the technical features (the id columns aren't a rationale)
+    importances = model.feature_importances_[:len(features)]
+    primary_driver = features[int(np.argmax(importances))]
+
+    return prediction, primary_driver, last_row['Close'].iloc[0]
+
+def train_model(ticker, X, y, interval):
+    """Fits and saves the per-ticker model on the training rows X, y (see training_matrix)."""
+    # print(f"    [Train] Training new model for {ticker}...")
+    features = list(X.columns)
+    params = dict(n_estimators=100, learning_rate=0.05, max_depth=3, objective='reg:squarederror')
+    with span('train', ticker):
+        model, _ = fit_profiled(params, X, y, label=f"{ticker} {interval}")
+        save_model(model, ticker, interval, features, train_end=X.index[-1])
+    return model
 
-def train_and_predict(ticker, df, interval, mode='inference'):
+def train_and_predict(ticker, df, interval, mode='inference', pooled=None):
     """
     Trains or Loads XGBoost model based on mode.
+    With pooled=(model, ticker_ids) the shared interval model is used instead.
     """
-    df_clean, features = prepare_features(df)
-    if df_clean is None or len(df_clean) < 50: return None
-    
+    if pooled is not None:
+        return predict_pooled(ticker, df, pooled)
+
     model = None
+    last_row = None
+    features = FEATURES
     
-    # 1. Try Load if in Inference Mode
+    # 1. Try Load if in Inference Mode (only the latest feature row is needed)
     if mode == 'inference':
-        model = load_model(ticker, interval)
+        try:
+            with span('load_model', ticker):
+                model = load_model(ticker, interval)
+        except IncompatibleModelError:
+            # Trained on an older feature set: retrained in the background (--retrain-queued)
+            print(f"    [Retrain Queue] {ticker} ({interval}) model is outdated. Skipping until retrained.")
+            return None
         if model:
-            try:
-                # Validation: Check if model works with current feature set
-                # (Crucial since we added MACD/BB and old models will have wrong shape)
-                latest_features = df_clean.iloc[[-1]][features]
-                model.predict(latest_features)
-            except Exception as e:
-                print(f"    [Auto-Retrain] Model mismatch for {ticker} (Features changed). Retraining...")
-                model = None # Force Retrain
+            with span('featurize', ticker):
+                last_row = latest_feature_row(ticker, df)
+            if last_row is None: return None
     
-    # 2. Train if missing or in Train mode
+    # 2. Train if missing or in Train mode (full history)
     if model is None:
-        # print(f"    [Train] Training new model for {ticker}...")
-        train_data = df_clean.iloc[:-1]
-        X = train_data[features]
-        y = train_data['Y_Next']
-        
-        model = xgb.XGBRegressor(
-            n_estimators=100, learning_rate=0.05, max_depth=3,
-            objective='reg:squarederror', n_jobs=1
-        )
-        model.fit(X, y)
-        save_model(model, ticker, interval)
+        with span('featurize', ticker):
+            X, y = training_matrix(ticker, df)
+            last_row = latest_feature_row(ticker, df)
+        if X is None or last_row is None: return None
+        model = train_model(ticker, X, y, interval)
     
     # 3. Predict
-    last_row = df_clean.iloc[[-1]] 
-    prediction = model.predict(last_row[features])[0]
+    with span('predict', ticker):
+        prediction = model.predict(last_row[features])[0]
     
     # Feature Importance
     importances = model.feature_importances_
@@ -204,18 +415,7 @@ def get_sector_bias(ticker, sentiment_config):
     
     if sector == 'All' and sentiment == 'Neutral': return 0.0, None
 
-    # Rudimentary Sector Map (Top tickers) - Expand as needed
-    TECH = ['AAPL', 'MSFT', 'NVDA', 'GOOGL', 'AMZN', 'TSLA', 'AMD', 'INTC', 'ORCL', 'IBM', 'CRM', 'ADBE']
-    FINANCE = ['JPM', 'BAC', 'WFC', 'C', 'GS', 'MS', 'V', 'MA']
-    ENERGY = ['XOM', 'CVX', 'COP', 'SLB', 'EOG']
-    HEALTH = ['JNJ', 'PFE', 'UNH', 'LLY', 'MRK', 'ABBV']
-    
-    is_match = False
-    if sector == 'All': is_match = True
-    elif sector == 'Technology' and ticker in TECH: is_match = True
-    elif sector == 'Finance' and ticker in FINANCE: is_match = True
-    elif sector == 'Energy' and ticker in ENERGY: is_match = True
-    elif sector == 'Healthcare' and ticker in HEALTH: is_match = True
+    is_match = sector == 'All' or ticker in SECTOR_MAP.get(sector, [])
     
     if not is_match: return 0.0, None
     
@@ -230,31 +430,190 @@ def get_sector_bias(ticker, sentiment_config):
     
     return BIAS_MAP.get(sentiment, 0.0), f"{sector} {sentiment}"
 
-def run_smart_engine(interval, mode, specific_ticker=None, sentiment_json=None):
-    print(f"\n--- Smart Bot Engine v1.2 ({interval}) [Mode: {mode}] ---")
+def prefetch_bars(tickers):
+    """fetch_data for the whole universe, concurrently through the acquisition layer. {ticker: df or None}"""
+    t0 = datetime.datetime.now()
+    frames = acquire([('adapter', fetch_data, t) for t in tickers])
+    print(f"  [Prefetch] Bars for {sum(f is not None for f in frames)}/{len(tickers)} tickers in {(datetime.datetime.now() - t0).total_seconds():.1f}s.")
+    return dict(zip(tickers, frames))
+
+def predict_tickers(tickers, interval, mode, pooled=None, bars=None):
+    """
+    Fetches and featurizes each ticker once and predicts the next move.
+    Returns {ticker: (prediction, primary_driver, current_price)} for tickers with data.
+    Pooled mode scores every ticker's latest bar in a single predict call.
+    bars: prefetched {ticker: df} (see prefetch_bars); tickers not in it are fetched here.
+    """
+    def bars_for(ticker):
+        if bars is not None and ticker in bars:
+            return bars[ticker]
+        with span('fetch', ticker):
+            return fetch_data(ticker)
+
+    results = {}
+    if pooled is None:
+        for ticker in tickers:
+            try:
+                df = bars_for(ticker)
+                result = train_and_predict(ticker, df, interval, mode)
+                if result is not None:
+                    results[ticker] = result
+            except Exception as e:
+                print(f"    Error {ticker}: {e}")
+        return results
+
+    model, ticker_ids = pooled
+    rows = []
+    features = FEATURES
+    for ticker in tickers:
+        df = bars_for(ticker)
+        with span('featurize', ticker):
+            last_row = latest_feature_row(ticker, df)
+        if last_row is None: continue
+        rows.append(add_id_features(last_row, ticker, ticker_ids).assign(Ticker=ticker))
+    if not rows:
+        return results
+
+    batch = pd.concat(rows)
+    with span('predict', rows=len(batch)):
+        predictions = model.predict(batch[features + POOLED_ID_FEATURES])
+    importances = model.feature_importances_[:len(features)]
+    primary_driver = features[int(np.argmax(importances))]
+    for ticker, prediction, price in zip(batch['Ticker'], predictions, batch['Close']):
+        results[ticker] = (prediction, primary_driver, price)
+    return results
+
+# Personality multipliers (Momentum only boosts predicted winners)
+STRATEGY_MULT = {
+    'Momentum': 1.1,      # Boost winners
+    'MeanReversion': 0.9, # Dampen strong moves to simulate taking profits early
+    'Contrarian': 0.95,   # Slight fade
+    'Conservative': 0.8   # Always reduce volatility
+}
+
+def get_horizon_mult(interval):
+    # Interval multiplier allows slightly more room for longer horizons
+    if interval == 'Weekly': return 1.5
+    if interval == 'Quarterly': return 3.0
+    return 1.0
+
+def apply_bot_adjustments(base, strategies, risk_caps, biases, interval, jitter=None):
+    """
+    Applies strategy bias, sector sentiment, micro-jitter and risk caps to an array of
+    raw model predictions (one entry per bot x ticker assignment).
+    """
+    pct = np.asarray(base, dtype='float64').copy()
+
+    # 1. Strategy Bias
+    mult = np.array([STRATEGY_MULT.get(s, 1.0) for s in strategies])
+    is_momentum = np.array([s == 'Momentum' for s in strategies])
+    mult = np.where(is_momentum & (pct <= 0), 1.0, mult)
+    pct *= mult
+
+    # 2. Sector/Sentiment Bias
+    pct += biases
+
+    # 3. Micro-Jitter (Uniqueness): +/- 0.5% so no two bots match exactly
+    if jitter is None:
+        jitter = (np.random.random(len(pct)) - 0.5) * 0.01
+    pct += jitter
+
+    # 4. Risk-Based Clamping (The "Cap"), with a hard 20% sanity limit per horizon
+    horizon_mult = get_horizon_mult(interval)
+    final_limit = np.minimum(np.asarray(risk_caps, dtype='float64') * horizon_mult, 0.20 * horizon_mult)
+    return np.clip(pct, -final_limit, final_limit)
+
+def get_bot_universe(bot):
+    universe = bot.get('universe', [])
+    if not universe or len(universe) < 3:
+        bio = bot.get('about', '').lower()
+        if 'dividend' in bio or 'stable' in bio or 'blue chip' in bio:
+            universe = ['KO', 'JNJ', 'PG', 'WMT', 'VZ', 'T', 'PEP', 'MCD', 'COST']
+        else:
+            universe = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA']
+    return list(universe)
+
+def get_pooled_universe(bots):
+    universe = set()
+    for bot in bots:
+        if bot.get('username') == 'Sigma Alpha': continue
+        universe.update(get_bot_universe(bot))
+    return sorted(universe)
+
+def retrain_queued():
+    """
+    Retrains every smart-engine model on the retrain queue (models found incompatible
+    at load time). Meant for a background job, outside the prediction runs.
+    """
+    jobs = get_model_registry().queue.jobs(engine='smart')
+    print(f"\n--- Smart Bot Engine: retraining {len(jobs)} queued models ---")
+    bots = None
+    retrained = 0
+    for path, job in jobs:
+        ticker, interval = job.get('ticker'), job.get('interval')
+        try:
+            if job.get('pooled'):
+                if bots is None:
+                    bots = list(users_collection.find({"isBot": True}))
+                model, _ = train_pooled_model(get_pooled_universe(bots), interval)
+            else:
+                X, y = training_matrix(ticker, fetch_data(ticker))
+                model = train_model(ticker, X, y, interval) if X is not None else None
+            if model is None:
+                print(f"    [Retrain Queue] {os.path.basename(path)}: not enough data, left queued.")
+                continue
+            retrained += 1 # save_model/train_pooled_model take it off the queue
+        except Exception as e:
+            print(f"    [Retrain Queue] {os.path.basename(path)} failed: {e}")
+    print(f"--- Retrained {retrained}/{len(jobs)} models. ---")
+    return retrained
+
+def run_smart_engine(interval, mode, specific_ticker=None, sentiment_json=None, pooled_mode=False, prefetch=False):
+    print(f"\n--- Smart Bot Engine v1.2 ({interval}) [Mode: {mode}{', pooled' if pooled_mode else ''}] ---")
+    
+    start_trace('smart', interval=interval, mode=mode, pooled=pooled_mode)
     
     # Bots Logic
-    bots = list(users_collection.find({"isBot": True}))
+    with span('db_read'):
+        bots = list(users_collection.find({"isBot": True}))
     print(f"--> Found {len(bots)} bots.")
+
+    # Pooled: one model for the whole universe (trained up front in train mode or if missing)
+    pooled = None
+    if pooled_mode:
+        try:
+            model, ticker_ids = (None, {}) if mode == 'train' else load_pooled_model(interval)
+            if model is None:
+                model, ticker_ids = train_pooled_model(get_pooled_universe(bots), interval)
+            if model is not None:
+                pooled = (model, ticker_ids)
+        except IncompatibleModelError:
+            print(f"  [Retrain Queue] Pooled {interval} model is outdated; using per-ticker models until retrained.")
     
     success_count = 0
     
+    # Shared market regime (QQQ), cached for the day by macro_context
+    with span('macro'):
+        macro_trend, macro_rsi = get_macro_state()
+    print(f"--> Macro: QQQ {'uptrend' if macro_trend > 0 else 'downtrend'} (SMA20 slope {macro_trend:.3f}, RSI {macro_rsi:.1f})")
+    
     # Collect all bot IDs for the global check
     all_bot_ids = [b['_id'] for b in bots]
+    
+    # GLOBAL UNIQUENESS SET: every ticker any bot already has a pending prediction for,
+    # loaded once and kept current in memory as this run adds predictions.
+    with span('db_read'):
+        pending_tickers = load_pending_tickers(predictions_collection, all_bot_ids)
+    writer = BulkPredictionWriter(predictions_collection)
+    uniqueness_checks = 0
 
+    # --- 1. Assignments: which bot predicts which ticker ---
+    assignments = [] # (bot, ticker)
     for bot in bots:
         if bot.get('username') == 'Sigma Alpha': continue
         
-        # 1. Universe
-        universe = bot.get('universe', [])
-        
-        # 2. Fallback
-        if not universe or len(universe) < 3:
-            bio = bot.get('about', '').lower()
-            if 'dividend' in bio or 'stable' in bio or 'blue chip' in bio:
-                universe = ['KO', 'JNJ', 'PG', 'WMT', 'VZ', 'T', 'PEP', 'MCD', 'COST']
-            else:
-                universe = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA']
+        # Universe (with bio-based fallback)
+        universe = get_bot_universe(bot)
         
         # Specific Ticker Filter (Bot must have it in universe)
         if specific_ticker:
@@ -274,111 +633,92 @@ def run_smart_engine(interval, mode, specific_ticker=None, sentiment_json=None):
             targets = universe
 
         for ticker in targets:
-            try:
-                # GLOBAL UNIQUENESS CHECK
-                # Check if ANY bot has a pending prediction for this ticker
-                # This enforces "One AI Prediction Per Stock"
-                exists = predictions_collection.find_one({
-                    "stockTicker": ticker, 
-                    "status": "Pending",
-                    "userId": {"$in": all_bot_ids}
-                })
-                
-                if exists: 
-                    # print(f"    [Skip] Existing pending prediction for {ticker} by another bot")
-                    continue
-                
-                # Fetch Data
-                df = fetch_data(ticker)
-                
-                prediction_pct, top_feature, current_price = train_and_predict(ticker, df, interval, mode)
-                
-                if prediction_pct is None: continue
-                
-                if prediction_pct is None: continue
-                
-                # --- PERSONALITY & STRATEGY BIAS ---
-                strategy = bot.get('strategy', 'Neutral')
-                risk_cap = bot.get('volatilityCap', 0.05) # Default 5%
-                
-                # 1. Strategy Bias
-                if strategy == 'Momentum' and prediction_pct > 0:
-                    prediction_pct *= 1.1 # Boost winners
-                elif strategy == 'MeanReversion':
-                    # Dampen trends, boost reversals? 
-                    # For simplicity: just slightly dampen strong moves to simulate taking profits early
-                    prediction_pct *= 0.9
-                elif strategy == 'Contrarian': 
-                    # Slight fade
-                    prediction_pct *= 0.95
-                elif strategy == 'Conservative':
-                    prediction_pct *= 0.8 # Always reduce volatility
-                
-                # 2. Sector/Sentiment Bias (Existing)
-                bias, bias_reason = get_sector_bias(ticker, sentiment_json)
-                if bias != 0:
-                    prediction_pct += bias
-
-                # 3. Micro-Jitter (Uniqueness)
-                # Adds +/- 0.5% random variation so no two bots match exactly
-                jitter = (np.random.random() - 0.5) * 0.01 
-                prediction_pct += jitter
-
-                # 4. Risk-Based Clamping (The "Cap")
-                # Interval multiplier allows slightly more room for longer horizons
-                horizon_mult = 1.0
-                if interval == 'Weekly': horizon_mult = 1.5
-                elif interval == 'Quarterly': horizon_mult = 3.0
-                
-                personal_limit = risk_cap * horizon_mult
-                
-                # Hard limit for sanity (prevent 50% moves unless warranted)
-                global_max = 0.20 * horizon_mult
-                final_limit = min(personal_limit, global_max)
-
-                if abs(prediction_pct) > final_limit:
-                    # print(f"    [Clamp] {ticker} ({bot['username']}): {prediction_pct*100:.1f}% -> {final_limit*100:.1f}% (Risk Cap)")
-                    prediction_pct = final_limit if prediction_pct > 0 else -final_limit
-
-                # Sanity Limit (Extreme Hallucination Check)
-                if abs(prediction_pct) > (final_limit * 1.5):
-                     print(f"    [Skip] {ticker}: {prediction_pct*100:.1f}% exceeds sanity.")
-                     continue
-                    
-                target_price = current_price * (1 + prediction_pct)
-                direction = "Bullish" if prediction_pct > 0 else "Bearish"
-                
-                rationale = (f"Market analysis indicates a {direction} trend driven by {top_feature}.")
-                if bias != 0:
-                    rationale += f" Adjusted for {bias_reason} sentiment."
-                rationale += f" Model ({mode}) confidence based on {interval} data."
-                             
-                new_pred = {
-                    "userId": bot['_id'],
-                    "stockTicker": ticker,
-                    "targetPrice": float(round(target_price, 2)),
-                    "targetPriceAtCreation": float(round(target_price, 2)),
-                    "predictionType": interval,
-                    "deadline": get_deadline(interval),
-                    "status": "Pending",
-                    "priceAtCreation": float(round(current_price, 2)),
-                    "currency": "USD",
-                    "description": rationale,
-                    "createdAt": datetime.datetime.utcnow(),
-                    "updatedAt": datetime.datetime.utcnow()
-                }
-                
-                if mode == 'train':
-                    print(f"    [Train] ({bot['username']}) Model updated for {ticker}. Result: {direction} @ {target_price:.2f} (Not saving to DB)")
-                else:
-                    predictions_collection.insert_one(new_pred)
-                    print(f"    [P] ({bot['username']}) {ticker} -> {direction} @ {target_price:.2f}")
-                    success_count += 1
-                
-            except Exception as e:
-                print(f"    Error {ticker}: {e}")
+            # GLOBAL UNIQUENESS CHECK
+            # Check if ANY bot has a pending prediction for this ticker
+            # This enforces "One AI Prediction Per Stock"
+            uniqueness_checks += 1
+            if ticker in pending_tickers: 
                 continue
+            assignments.append((bot, ticker))
+            if mode != 'train':
+                # Claimed by this bot for the rest of the run
+                pending_tickers.add(ticker)
+
+    # --- 2. Fetch, featurize and predict each unique ticker once ---
+    unique_tickers = list(dict.fromkeys(ticker for _, ticker in assignments))
+    print(f"--> {len(assignments)} assignments over {len(unique_tickers)} unique tickers.")
+    bars = None
+    if prefetch:
+        with span('prefetch', rows=len(unique_tickers)):
+            bars = prefetch_bars(unique_tickers)
+    results = predict_tickers(unique_tickers, interval, mode, pooled, bars=bars)
+
+    assignments = [(bot, ticker) for bot, ticker in assignments if ticker in results]
+    if assignments:
+        # --- 3. Personality, sentiment, jitter and risk caps for every bot at once ---
+        base = np.array([results[ticker][0] for _, ticker in assignments], dtype='float64')
+        strategies = [bot.get('strategy', 'Neutral') for bot, _ in assignments]
+        risk_caps = np.array([bot.get('volatilityCap', 0.05) for bot, _ in assignments], dtype='float64') # Default 5%
+        bias_by_ticker = {ticker: get_sector_bias(ticker, sentiment_json) for ticker in results}
+        biases = np.array([bias_by_ticker[ticker][0] for _, ticker in assignments], dtype='float64')
+        with span('adjust', rows=len(assignments)):
+            final_pcts = apply_bot_adjustments(base, strategies, risk_caps, biases, interval)
+
+    for i, (bot, ticker) in enumerate(assignments):
+        try:
+            prediction_pct = final_pcts[i]
+            _, top_feature, current_price = results[ticker]
+            bias, bias_reason = bias_by_ticker[ticker]
+                
+            target_price = current_price * (1 + prediction_pct)
+            direction = "Bullish" if prediction_pct > 0 else "Bearish"
+            
+            rationale = (f"Market analysis indicates a {direction} trend driven by {top_feature}.")
+            if bias != 0:
+                rationale += f" Adjusted for {bias_reason} sentiment."
+            rationale += f" Macro backdrop: Nasdaq-100 {'uptrend' if macro_trend > 0 else 'downtrend'} (QQQ RSI {macro_rsi:.0f})."
+            rationale += f" Model ({mode}) confidence based on {interval} data."
+                         
+            new_pred = {
+                "userId": bot['_id'],
+                "stockTicker": ticker,
+                "targetPrice": float(round(target_price, 2)),
+                "targetPriceAtCreation": float(round(target_price, 2)),
+                "predictionType": interval,
+                "deadline": get_deadline(interval),
+                "status": "Pending",
+                "priceAtCreation": float(round(current_price, 2)),
+                "currency": "USD",
+                "description": rationale,
+                "createdAt": datetime.datetime.utcnow(),
+                "updatedAt": datetime.datetime.utcnow()
+            }
+            
+            if mode == 'train':
+                print(f"    [Train] ({bot['username']}) Model updated for {ticker}. Result: {direction} @ {target_price:.2f} (Not saving to DB)")
+            else:
+                writer.add(new_pred)
+                print(f"    [P] ({bot['username']}) {ticker} -> {direction} @ {target_price:.2f}")
+                success_count += 1
+            
+        except Exception as e:
+            print(f"    Error {ticker}: {e}")
+            continue
                 
+    try:
+        writer.close()
+    except Exception as e:
+        print(f"  [DB Error] Bulk insert failed: {e}")
+    # One distinct() read for the uniqueness set, then the batched inserts
+    saved = writer.saved_round_trips(uniqueness_checks, reads=1)
+    print(f"  [DB] {1 + writer.stats['round_trips']} round trips ({writer.stats['written']} inserted, saved {saved}).")
+    print(f"  [Bar Cache] {get_bar_cache().summary()}")
+    print(f"  [Model Registry] {get_model_registry().summary()}")
+    print(f"  [Indicators] {get_indicator_store().summary()}")
+    print(f"  [Feature Store] {get_feature_store().summary()}")
+    if prefetch:
+        print(f"  [Acquire] {get_acquirer().summary()}")
+    end_trace()
     print(f"--- Completed. {success_count} predictions generated. ---")
 
 if __name__ == "__main__":
@@ -387,6 +727,12 @@ if __name__ == "__main__":
     parser.add_argument('--mode', type=str, default='inference', choices=['train', 'inference'])
     parser.add_argument('--ticker', type=str, help='Run for a specific ticker only')
     parser.add_argument('--sentiment', type=str, help='JSON string for sentiment overrides')
+    parser.add_argument('--pooled', action='store_true', help='Use one cross-ticker model per interval')
+    parser.add_argument('--retrain-queued', action='store_true', help='Only retrain the models queued as incompatible, then exit')
+    parser.add_argument('--prefetch', action='store_true', help='Fetch the bars of every assigned ticker concurrently before compute')
     args = parser.parse_args()
     
-    run_smart_engine(args.interval, args.mode, specific_ticker=args.ticker, sentiment_json=args.sentiment)
+    if args.retrain_queued:
+        retrain_queued()
+        sys.exit(0)
+    run_smart_engine(args.interval, args.mode, specific_ticker=args.ticker, sentiment_json=args.sentiment, pooled_mode=args.pooled, prefetch=args.prefetch)
@@ -0,0 +1,96 @@
+import time
+import datetime
+import threading
+
+import earnings_model
+from acquisition import Acquirer, TokenBucket
+
+def test_results_keep_submission_order_under_host_limits():
+    acquirer = Acquirer({'slow': {'concurrency': 2, 'rate': 0, 'burst': 1},
+                         'fast': {'concurrency': 8, 'rate': 0, 'burst': 1}})
+    running = {'slow': 0, 'peak': 0}
+    lock = threading.Lock()
+
+    def slow(i):
+        with lock:
+            running['slow'] += 1
+            running['peak'] = max(running['peak'], running['slow'])
+        time.sleep(0.02 * (5 - i % 5)) # Later submissions finish first
+        with lock:
+            running['slow'] -= 1
+        return i
+
+    def fail(i):
+        raise IOError('upstream down')
+
+    calls = [('slow', slow, i) for i in range(6)] + [('fast', fail, 6), ('fast', lambda i: i * 10, 7)]
+    assert acquirer.run(calls) == [0, 1, 2, 3, 4, 5, None, 70]
+    assert running['peak'] == 2
+    assert acquirer.stats['fast'] == {'requests': 2, 'failed': 1, 'rate_wait_s': 0.0}
+
+def test_token_bucket_paces_request_starts():
+    acquirer = Acquirer({'api': {'concurrency': 10, 'rate': 50, 'burst': 2}})
+    starts = []
+    t0 = time.monotonic()
+    acquirer.run([('api', lambda: starts.append(time.monotonic() - t0))] * 7)
+    # 2 at once from the burst, then one every 20 ms
+    assert sorted(starts)[-1] >= 0.09
+    assert acquirer.stats['api']['rate_wait_s'] > 0
+    assert TokenBucket(0).rate == 0 # rate 0 = unlimited
+
+class StubCalendar:
+    def __init__(self, dates):
+        self.dates = dates
+        self.prefetched = None
+
+    def prefetch(self, tickers):
+        self.prefetched = list(tickers)
+
+    def next_earnings_date(self, ticker):
+        return self.dates.get(ticker)
+
+def test_quant_prefetch_fetches_only_active_tickers(monkeypatch):
+    today = datetime.date.today()
+    calendar = StubCalendar({'AAA': today + datetime.timedelta(days=3), 'BBB': today + datetime.timedelta(days=30)})
+    fetched = []
+    monkeypatch.setattr(earnings_model, 'get_earnings_calendar', lambda: calendar)
+    monkeypatch.setattr(earnings_model, 'fetch_data_from_node_adapter', lambda t, s, e: fetched.append(t) or f"bars:{t}")
+    monkeypatch.setattr(earnings_model, 'get_historical_earnings_dates', lambda t: [f"dates:{t}"])
+
+    inference = earnings_model.prefetch_universe(['AAA', 'BBB', 'CCC'], 'inference')
+    assert calendar.prefetched == ['AAA', 'BBB', 'CCC']
+    assert inference == {'AAA': {'bars': 'bars:AAA', 'earnings_dates': ['dates:AAA']}}
+    assert sorted(earnings_model.prefetch_universe(['AAA', 'BBB', 'CCC'], 'train')) == ['AAA', 'BBB']
+
+def test_limits_hold_across_concurrent_batches():
+    acquirer = Acquirer({'host': {'concurrency': 2, 'rate': 0, 'burst': 1}})
+    running = {'now': 0, 'peak': 0}
+    lock = threading.Lock()
+
+    def call(i):
+        with lock:
+            running['now'] += 1
+            running['peak'] = max(running['peak'], running['now'])
+        time.sleep(0.03)
+        with lock:
+            running['now'] -= 1
+        return i
+
+    results = {}
+    def batch(name):
+        results[name] = acquirer.run([('host', call, i) for i in range(4)])
+    threads = [threading.Thread(target=batch, args=(n,)) for n in 'ab']
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+    assert results == {'a': [0, 1, 2, 3], 'b': [0, 1, 2, 3]}
+    assert running['peak'] == 2
+    assert acquirer.stats['host']['requests'] == 8
+
+    # One bucket per host: a second batch doesn't get a fresh burst
+    paced = Acquirer({'api': {'concurrency': 4, 'rate': 20, 'burst': 2}})
+    paced.run([('api', lambda: None)] * 2)
+    t0 = time.monotonic()
+    paced.run([('api', lambda: None)])
+    assert time.monotonic() - t0 >= 0.03
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest
+import earnings_model
+
+from backtest import run_backtest, backtest_ticker, HORIZON
+from benchmarks.fixtures import synthetic_ohlcv, synthetic_earnings_dates
+from macro_context import compute_macro_frame, MACRO_COLUMNS
+from feature_store import FeatureStore
+
+START, END = '2022-01-01', '2025-01-01'
+TICKERS = ['AAA', 'BBB', 'CCC']
+
+@pytest.fixture(autouse=True)
+def feature_store(tmp_path, monkeypatch):
+    store = FeatureStore(str(tmp_path / 'features'))
+    monkeypatch.setattr(backtest, 'get_feature_store', lambda: store)
+    monkeypatch.setattr(earnings_model, 'get_feature_store', lambda: store)
+    return store
+
+def inputs():
+    bars = {t: synthetic_ohlcv(t, START, END) for t in TICKERS}
+    macro = compute_macro_frame(synthetic_ohlcv('QQQ', START, END)['Close'])[MACRO_COLUMNS]
+    dates = {t: synthetic_earnings_dates(t, quarters=12, today=END) for t in TICKERS}
+    return bars, macro, dates
+
+def test_walk_forward_scores_only_earnings_windows():
+    bars, macro, dates = inputs()
+    report, predictions = run_backtest(TICKERS, bars, macro, dates, retrain_every=60, min_train=200, workers=1)
+    assert report['summary']['predictions'] == len(predictions) > 0
+    assert set(predictions['type']) == {'Daily', 'Weekly'}
+    assert set(predictions.loc[predictions['type'] == 'Daily', 'days_until']) <= {1, 2, 3, 4, 5}
+    assert (predictions.loc[predictions['type'] == 'Weekly', 'days_until'] == 7).all()
+    assert predictions.loc[predictions['type'] == 'Daily', 'prediction'].abs().max() <= 0.05
+    assert 0 <= report['summary']['hit_rate'] <= 100
+
+    parallel, _ = run_backtest(TICKERS, bars, macro, dates, retrain_every=60, min_train=200, workers=2)
+    assert parallel['by_ticker'] == report['by_ticker']
+
+def test_predictions_do_not_see_later_bars():
+    bars, macro, dates = inputs()
+    base = backtest_ticker('AAA', bars['AAA'], macro, dates['AAA'], retrain_every=60, min_train=200)
+    cut = bars['AAA'].index[500]
+    altered = bars['AAA'].copy()
+    later = altered.index >= cut
+    # A drift rather than a constant factor, so the returns after the cut change too
+    altered.loc[later, ['Open', 'High', 'Low', 'Close']] *= np.linspace(1.0, 1.5, later.sum())[:, None]
+    changed = backtest_ticker('AAA', altered, macro, dates['AAA'], retrain_every=60, min_train=200)
+
+    before = lambda p: p[p['date'] < cut].set_index('date')['prediction']
+    pd.testing.assert_series_equal(before(base), before(changed))
+    # Outcomes realized after the change do see it
+    assert not base['realized'].equals(changed['realized'])
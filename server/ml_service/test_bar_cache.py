@@ -0,0 +1,69 @@
+import json
+import time
+import pandas as pd
+
+from bar_cache import BarCache
+
+def make_adapter(calls, closes=None):
+    """Fake Node adapter: one bar per business day in [start, end)."""
+    def fetch_payload(ticker, start_str, end_str, interval):
+        calls.append((start_str, end_str))
+        days = pd.bdate_range(start_str, end_str, inclusive='left')
+        rows = [{
+            'date': d.strftime('%Y-%m-%dT00:00:00.000Z'),
+            'open': 1.0, 'high': 1.0, 'low': 1.0,
+            'close': (closes or {}).get(d.strftime('%Y-%m-%d'), float(d.day)),
+            'volume': 100
+        } for d in days]
+        return json.dumps(rows)
+    return fetch_payload
+
+def test_first_call_is_a_miss_then_hit(tmp_path):
+    cache = BarCache(cache_dir=str(tmp_path))
+    calls = []
+    adapter = make_adapter(calls)
+
+    df = cache.get_bars('AAPL', '2024-01-01', '2024-02-01', '1d', adapter)
+    again = cache.get_bars('AAPL', '2024-01-01', '2024-02-01', '1d', adapter)
+
+    assert len(calls) == 1
+    assert cache.stats['misses'] == 1 and cache.stats['hits'] == 1
+    assert cache.stats['bytes_fetched'] > 0
+    pd.testing.assert_frame_equal(df, again, check_freq=False)
+
+def test_only_missing_tail_and_head_are_fetched(tmp_path):
+    cache = BarCache(cache_dir=str(tmp_path))
+    calls = []
+    adapter = make_adapter(calls)
+
+    cache.get_bars('MSFT', '2024-01-10', '2024-02-01', '1d', adapter)
+    df = cache.get_bars('MSFT', '2024-01-02', '2024-02-06', '1d', adapter)
+
+    assert calls[1] == ('2024-01-02', '2024-01-10')
+    # Tail restarts at the last stored bar so a partial bar gets replaced
+    assert calls[2] == ('2024-01-31', '2024-02-06')
+    assert cache.stats['partial'] == 1
+    assert df.index.is_monotonic_increasing and not df.index.duplicated().any()
+    assert df.index[0] == pd.Timestamp('2024-01-02') and df.index[-1] == pd.Timestamp('2024-02-05')
+
+def test_restated_history_triggers_full_refresh(tmp_path):
+    cache = BarCache(cache_dir=str(tmp_path))
+    calls = []
+    cache.get_bars('NVDA', '2024-01-02', '2024-02-01', '1d', make_adapter(calls))
+
+    # Simulate a split: the settled last bar comes back with a different close
+    path = cache._path('NVDA', '1d')
+    df, meta = cache._load('NVDA', '1d')
+    meta['fetched_at'] = time.time() - 86400 * 30
+    cache._save('NVDA', '1d', df, meta)
+
+    split = make_adapter(calls, closes={'2024-01-31': 3.1})
+    cache.get_bars('NVDA', '2024-01-02', '2024-02-06', '1d', split)
+
+    assert cache.stats['restated'] == 1
+    assert calls[-1] == ('2024-01-02', '2024-02-06')
+
+def test_adapter_error_returns_none(tmp_path):
+    cache = BarCache(cache_dir=str(tmp_path))
+    df = cache.get_bars('XXXX', '2024-01-01', '2024-02-01', '1d', lambda *a: json.dumps({'error': 'Not Found'}))
+    assert df is None
@@ -0,0 +1,28 @@
+import json
+
+from bar_cache import payload_to_frame
+from benchmarks.fixtures import MockAdapter, InMemoryCollection, synthetic_ohlcv
+from benchmarks.run import run_benchmarks
+
+def test_mock_adapter_payload_round_trips():
+    adapter = MockAdapter()
+    df = payload_to_frame(json.loads(adapter.fetch('AAA', '2024-01-01', '2024-03-01', '1d')))
+    expected = synthetic_ohlcv('AAA', '2024-01-01', '2024-03-01', '1d')
+    assert list(df.columns) == ['Open', 'High', 'Low', 'Close', 'Volume']
+    assert (df.index == expected.index).all()
+    assert (df['Low'] <= df['High']).all()
+    assert adapter.calls == 1
+
+def test_in_memory_collection_filters():
+    coll = InMemoryCollection([{'t': 'A', 'status': 'Pending'}, {'t': 'B', 'status': 'Done'}])
+    assert coll.distinct('t', {'status': {'$in': ['Pending']}}) == ['A']
+    coll.insert_many([{'t': 'C', 'status': 'Pending'}])
+    assert coll.find_one({'t': 'C'})['_id'] is not None
+
+def test_run_benchmarks_reports_each_stage():
+    doc = run_benchmarks(sizes=[3], stages=['smart_features', 'instant_analysis'], track_memory=True, log=lambda msg: None)
+    stages = [r['stage'] for r in doc['results']]
+    assert stages == ['smart_features', 'instant_analysis']
+    for r in doc['results']:
+        assert r['tickers'] == 3 and r['rows'] > 0 and r['seconds'] > 0 and r['peak_mb'] is not None
+    json.dumps(doc)
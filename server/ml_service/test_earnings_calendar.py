@@ -0,0 +1,86 @@
+import json
+import datetime
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from earnings_calendar import EarningsCalendar, HORIZON_DAYS
+
+TODAY = datetime.date(2024, 11, 18)
+
+# Local stand-in for api.nasdaq.com/api/calendar/earnings
+CALENDAR = {
+    '2024-11-20': ['NVDA', 'PANW'],
+    '2024-11-25': ['NVDA', 'DELL'],
+}
+
+class NasdaqStandIn(BaseHTTPRequestHandler):
+    hits = []
+
+    def do_GET(self):
+        date = parse_qs(urlparse(self.path).query)['date'][0]
+        NasdaqStandIn.hits.append(date)
+        rows = [{'symbol': s} for s in CALENDAR.get(date, [])]
+        body = json.dumps({'data': {'rows': rows}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_server():
+    server = HTTPServer(('127.0.0.1', 0), NasdaqStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/api/calendar/earnings"
+
+def test_each_date_fetched_once_for_many_tickers(tmp_path):
+    server, url = start_server()
+    NasdaqStandIn.hits = []
+    fallback_calls = []
+    def fallback(ticker):
+        fallback_calls.append(ticker)
+        return datetime.date(2025, 1, 30)
+    try:
+        cal = EarningsCalendar(base_url=url, cache_dir=str(tmp_path), today=TODAY, fallback=fallback)
+        assert cal.next_earnings_date('NVDA') == datetime.date(2024, 11, 20)
+        assert cal.next_earnings_date('DELL') == datetime.date(2024, 11, 25)
+        assert cal.next_earnings_date('AAPL') == datetime.date(2025, 1, 30)
+        assert cal.next_earnings_date('AAPL') == datetime.date(2025, 1, 30)
+        assert len(NasdaqStandIn.hits) == HORIZON_DAYS
+        assert fallback_calls == ['AAPL']
+    finally:
+        server.shutdown()
+
+def test_snapshot_is_reused_from_disk(tmp_path):
+    server, url = start_server()
+    NasdaqStandIn.hits = []
+    try:
+        EarningsCalendar(base_url=url, cache_dir=str(tmp_path), today=TODAY, fallback=lambda t: None).next_earnings_date('AAPL')
+        fresh = EarningsCalendar(base_url=url, cache_dir=str(tmp_path), today=TODAY, fallback=lambda t: 1 / 0)
+        assert fresh.next_earnings_date('PANW') == datetime.date(2024, 11, 20)
+        # Cached negative yfinance answer, no second fallback call
+        assert fresh.next_earnings_date('AAPL') is None
+        assert len(NasdaqStandIn.hits) == HORIZON_DAYS
+    finally:
+        server.shutdown()
+
+def test_failed_fallback_is_retried_not_cached(tmp_path):
+    server, url = start_server()
+    answers = [ConnectionError('rate limited'), datetime.date(2025, 2, 5)]
+    def flaky(ticker):
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+    try:
+        cal = EarningsCalendar(base_url=url, cache_dir=str(tmp_path), today=TODAY, fallback=flaky)
+        cal.prefetch(['AAPL'])
+        assert 'AAPL' not in cal.fallbacks
+        fresh = EarningsCalendar(base_url=url, cache_dir=str(tmp_path), today=TODAY, fallback=flaky)
+        assert fresh.next_earnings_date('AAPL') == datetime.date(2025, 2, 5)
+        assert fresh.fallbacks['AAPL'] == '2025-02-05'
+    finally:
+        server.shutdown()
@@ -0,0 +1,102 @@
+import multiprocessing
+import numpy as np
+import pandas as pd
+import pytest
+
+import smart_bot_engine
+import earnings_model
+from feature_store import FeatureStore
+from benchmarks.fixtures import synthetic_ohlcv
+from macro_context import compute_macro_frame, MACRO_COLUMNS
+
+COLUMNS = ['A', 'B']
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = FeatureStore(str(tmp_path))
+    monkeypatch.setattr(smart_bot_engine, 'get_feature_store', lambda: store)
+    monkeypatch.setattr(earnings_model, 'get_feature_store', lambda: store)
+    return store
+
+def test_append_read_and_interrupted_append(store):
+    dates = pd.date_range('2024-01-01', periods=6)
+    values = np.arange(12, dtype='float64').reshape(6, 2)
+    store.write('set', COLUMNS, 'AAA', dates[:4], values[:4])
+    # An append that died after writing its rows but before the index entry
+    with open(store._paths('set', COLUMNS, 'AAA')[0], 'ab') as f:
+        f.write(np.ones((3, 2), dtype='<f4').tobytes())
+    assert store.write('set', COLUMNS, 'AAA', dates[4:], values[4:], state={'k': 1}, append=True) == 6
+    with pytest.raises(ValueError):
+        store.write('set', COLUMNS, 'AAA', dates[5:], values[5:], append=True)
+
+    read_dates, read_values = store.read('set', COLUMNS, 'AAA', start=dates[2])
+    assert isinstance(read_values, np.memmap) and read_values.dtype == np.float32
+    np.testing.assert_array_equal(read_values, values[2:])
+    assert list(read_dates) == list(dates[2:].values)
+    assert store.entry('set', COLUMNS, 'AAA')['state'] == {'k': 1}
+
+    store.write('set', COLUMNS, 'BBB', dates[:2], values[:2] + 100)
+    stacked_dates, stacked, owner = store.read_many('set', COLUMNS, ['AAA', 'BBB', 'ZZZ'], end=dates[1], extra=1)
+    np.testing.assert_array_equal(stacked[:, :2], np.vstack([values[:2], values[:2] + 100]))
+    assert (stacked[:, 2] == 0).all() and list(owner) == [0, 0, 1, 1]
+    # Another column list is another feature version
+    assert store.entry('set', COLUMNS + ['C'], 'AAA') is None
+
+def test_incremental_smart_rows_match_full_build(store):
+    bars = synthetic_ohlcv('AAA', '2022-01-01', '2024-01-01')
+    smart_bot_engine.update_feature_store('AAA', bars.iloc[:300])
+    total = smart_bot_engine.update_feature_store('AAA', bars)
+    assert (store.stats['rebuilt'], store.stats['appended']) == (1, 1)
+
+    X, y = smart_bot_engine.training_matrix('AAA', bars)
+    full, _ = smart_bot_engine.prepare_features(bars.iloc[:-1])
+    full = full.iloc[:-1]
+    assert total == len(X) == len(full)
+    np.testing.assert_allclose(X.to_numpy(), full[smart_bot_engine.FEATURES].to_numpy(), rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(y, full['Y_Next'].to_numpy(), rtol=1e-5, atol=1e-7)
+
+    # Restated history rebuilds the rows
+    smart_bot_engine.update_feature_store('AAA', bars * 2)
+    assert store.stats['rebuilt'] == 2
+
+def test_incremental_scientific_rows_match_full_build(store):
+    bars = synthetic_ohlcv('AAA', '2022-01-01', '2024-01-01')
+    macro = compute_macro_frame(synthetic_ohlcv('QQQ', '2022-01-01', '2024-01-01')['Close'])[MACRO_COLUMNS]
+    earnings_model.update_scientific_store('AAA', bars.iloc[:300], macro)
+    earnings_model.update_scientific_store('AAA', bars, macro)
+    assert store.stats['appended'] == 1
+
+    stored = store.frame(earnings_model.SCIENTIFIC_SET, earnings_model.SCIENTIFIC_COLUMNS, 'AAA')
+    full = earnings_model.build_scientific_features(bars.iloc[:-1].copy(), macro).dropna(subset=['Y_Target'])
+    assert list(stored.index) == list(full.index)
+    np.testing.assert_allclose(stored.to_numpy(), full[earnings_model.SCIENTIFIC_COLUMNS].to_numpy(), rtol=1e-5, atol=1e-6)
+
+def test_training_rows_stay_within_the_fetched_window(store):
+    bars = synthetic_ohlcv('AAA', '2020-01-01', '2024-01-01')
+    sizes = []
+    for first in (0, 100, 200):
+        window = bars.iloc[first:first + 500]
+        X, _ = smart_bot_engine.training_matrix('AAA', window)
+        assert X.index[0] >= window.index[0]
+        sizes.append(len(X))
+    assert store.stats['appended'] == 2 # Later windows extend the same rows
+    assert sizes[1] == sizes[2] # A later window of the same length doesn't train on more rows
+
+def _append_rows(root, count):
+    store = FeatureStore(root)
+    for _ in range(count):
+        with store.lock_for('set', 'AAA'):
+            entry = store.entry('set', COLUMNS, 'AAA')
+            n = entry['rows'] if entry else 0
+            store.write('set', COLUMNS, 'AAA', [pd.Timestamp('2020-01-01') + pd.Timedelta(days=n)], [[n, -n]], append=entry is not None)
+
+def test_concurrent_processes_append_without_losing_rows(tmp_path):
+    ctx = multiprocessing.get_context('fork')
+    workers = [ctx.Process(target=_append_rows, args=(str(tmp_path), 25)) for _ in range(4)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join(timeout=60)
+    dates, values = FeatureStore(str(tmp_path)).read('set', COLUMNS, 'AAA')
+    np.testing.assert_array_equal(values[:, 0], np.arange(100))
+    assert (np.diff(dates) == np.timedelta64(1, 'D')).all()
@@ -0,0 +1,30 @@
+import datetime
+import pandas as pd
+
+from fed_data import FED_DATES, EventCalendar, days_until_fed, fed_week_flags, get_next_fed_date
+
+def scalar_days_until(ts):
+    # Reference: the per-row logic prepare_scientific_features used before vectorizing
+    d = ts.date()
+    nxt = next((f for f in FED_DATES if f >= d), None)
+    return (nxt - d).days if nxt else 99
+
+def test_vectorized_matches_scalar_on_daily_history():
+    index = pd.date_range('2022-11-01', '2026-02-01', freq='B')
+    expected = [scalar_days_until(ts) for ts in index]
+    assert days_until_fed(index).tolist() == expected
+    assert fed_week_flags(index).tolist() == [1 if x <= 7 else 0 for x in expected]
+
+def test_intraday_bars_use_calendar_days():
+    index = pd.DatetimeIndex(['2024-12-17 15:30', '2024-12-18 09:30', '2024-12-18 20:00', '2024-12-19 10:00'])
+    assert days_until_fed(index).tolist() == [1, 0, 0, 41]
+
+def test_next_event_scalar_api():
+    assert get_next_fed_date(datetime.date(2024, 12, 8)) == datetime.date(2024, 12, 18)
+    assert get_next_fed_date(datetime.date(2024, 12, 18)) == datetime.date(2024, 12, 18)
+    assert get_next_fed_date(datetime.date(2030, 1, 1)) is None
+
+def test_generic_calendar_is_sorted_and_deduplicated():
+    cal = EventCalendar([datetime.date(2024, 3, 1), datetime.date(2024, 1, 1), datetime.date(2024, 3, 1)])
+    assert cal.dates == [datetime.date(2024, 1, 1), datetime.date(2024, 3, 1)]
+    assert cal.is_event_week(pd.DatetimeIndex(['2023-12-30', '2024-02-01']), window=3).tolist() == [1, 0]
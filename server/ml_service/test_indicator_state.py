@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+from ta.momentum import RSIIndicator
+from ta.trend import SMAIndicator, MACD
+from ta.volatility import BollingerBands
+
+from indicator_state import IndicatorStore, replay
+
+def make_close(n=300, seed=1):
+    idx = pd.bdate_range('2023-01-02', periods=n)
+    steps = np.random.default_rng(seed).normal(0, 0.015, n)
+    return pd.Series(100 * np.exp(np.cumsum(steps)), index=idx)
+
+def test_replay_matches_ta():
+    close = make_close()
+    _, rows = replay(close)
+    macd = MACD(close=close)
+    bb = BollingerBands(close=close, window=20, window_dev=2)
+    sma20 = SMAIndicator(close=close, window=20).sma_indicator()
+    sma50 = SMAIndicator(close=close, window=50).sma_indicator()
+    expected = {
+        'Ret_1d': close.pct_change(),
+        'Ret_5d': close.pct_change(5),
+        'RSI': RSIIndicator(close=close, window=14).rsi(),
+        'SMA_20': sma20,
+        'SMA_50': sma50,
+        'Trend_Signal': pd.Series(np.where(sma20 > sma50, 1, -1), index=close.index),
+        'Vol_20d': close.pct_change().rolling(20).std(),
+        'MACD': macd.macd(),
+        'MACD_Diff': macd.macd_diff(),
+        'BB_High': bb.bollinger_hband(),
+        'BB_Low': bb.bollinger_lband(),
+        'BB_Mid': bb.bollinger_mavg()
+    }
+    for col, series in expected.items():
+        np.testing.assert_allclose(rows[col].to_numpy(dtype=float), series.to_numpy(dtype=float), rtol=1e-9, atol=1e-10, err_msg=col)
+
+def test_store_updates_incrementally(tmp_path):
+    close = make_close()
+    store = IndicatorStore(str(tmp_path))
+    store.latest('AAA', '1d', close.iloc[:250])
+    row = store.latest('AAA', '1d', close)
+    assert store.stats == {'incremental': 1, 'recomputed': 1, 'bars_applied': 249 + 50}
+
+    _, full = replay(close)
+    expected = full.iloc[-1]
+    for col in ['RSI', 'MACD_Diff', 'BB_Pos', 'Vol_20d', 'SMA_50']:
+        assert np.isclose(row[col], expected[col], rtol=1e-9), col
+    assert row['bars'] == len(close)
+
+def test_store_recomputes_on_restatement(tmp_path):
+    close = make_close()
+    store = IndicatorStore(str(tmp_path))
+    store.latest('AAA', '1d', close.iloc[:250])
+    restated = close.copy()
+    restated.iloc[:240] *= 0.5 # e.g. split adjustment
+    row = store.latest('AAA', '1d', restated)
+    assert store.stats['recomputed'] == 2
+    assert np.isclose(row['SMA_50'], replay(restated)[1]['SMA_50'].iloc[-1])
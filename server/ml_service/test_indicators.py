@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+from ta.momentum import RSIIndicator
+from ta.trend import SMAIndicator, MACD
+from ta.volatility import BollingerBands
+
+import indicators
+
+def make_closes(n_tickers=6, n=400, seed=3):
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(120, n + 1, n_tickers)
+    return [pd.Series(50 * np.exp(np.cumsum(rng.normal(0, 0.02, m)))) for m in lengths]
+
+def assert_close(actual, expected, atol=1e-9):
+    np.testing.assert_allclose(actual, np.asarray(expected, dtype=float), rtol=1e-9, atol=atol)
+
+def test_kernels_match_ta_on_padded_panel():
+    closes = make_closes()
+    panel = indicators.to_panel([c.to_numpy() for c in closes])
+    rsi = indicators.rsi(panel, 14)
+    sma = indicators.sma(panel, 50)
+    line, signal, diff = indicators.macd(panel)
+    mavg, high, low = indicators.bollinger(panel, 20, 2)
+    vol = indicators.rolling_std(indicators.pct_change(panel), 20)
+
+    for row, close in enumerate(closes):
+        n = len(close)
+        unpad = lambda values: indicators.from_panel(values[row], n)
+        macd = MACD(close=close)
+        bb = BollingerBands(close=close, window=20, window_dev=2)
+        assert_close(unpad(rsi), RSIIndicator(close=close, window=14).rsi())
+        assert_close(unpad(sma), SMAIndicator(close=close, window=50).sma_indicator())
+        assert_close(unpad(line), macd.macd())
+        assert_close(unpad(signal), macd.macd_signal())
+        assert_close(unpad(diff), macd.macd_diff())
+        assert_close(unpad(mavg), bb.bollinger_mavg())
+        assert_close(unpad(high), bb.bollinger_hband())
+        assert_close(unpad(low), bb.bollinger_lband())
+        assert_close(unpad(vol), close.pct_change().rolling(20).std())
+
+def test_one_dimensional_input_and_float32_output():
+    close = make_closes(1)[0]
+    values = close.to_numpy(dtype=np.float32)
+    out = indicators.rsi(values)
+    assert out.dtype == np.float32 and out.shape == values.shape
+    expected = RSIIndicator(close=pd.Series(values.astype(np.float64)), window=14).rsi()
+    np.testing.assert_allclose(out, expected, rtol=1e-5, atol=1e-4)
+
+def test_sma_rsi_matches_rolling_mean_variant():
+    close = make_closes(1)[0]
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    assert_close(indicators.rsi(close.to_numpy(), 14, smoothing='sma'), 100 - (100 / (1 + gain / loss)))
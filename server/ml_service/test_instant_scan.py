@@ -0,0 +1,29 @@
+import pytest
+
+from benchmarks.fixtures import synthetic_ohlcv
+from indicator_state import IndicatorStore
+import instant_bot_engine
+from instant_bot_engine import scan, analyze_instant_setup
+
+def fake_fetch(no_intraday=(), missing=()):
+    def fetch(ticker, period_days=20, interval='1h'):
+        if ticker in missing or (interval != '1d' and ticker in no_intraday):
+            return None
+        return synthetic_ohlcv(ticker, '2024-01-01', f'2024-{"04" if interval == "1d" else "01"}-20', interval)
+    return fetch
+
+def test_scan_matches_per_ticker_analysis(tmp_path, monkeypatch):
+    monkeypatch.setattr(instant_bot_engine, 'fetch_data', fake_fetch(no_intraday={'BBB'}, missing={'ZZZ'}))
+    monkeypatch.setattr(instant_bot_engine, 'get_indicator_store', lambda: IndicatorStore(str(tmp_path)))
+
+    results = list(scan(['aaa', 'BBB', 'CCC', 'ZZZ', 'AAA']))
+    # Intraday group first, then the daily fallback, then tickers without data
+    assert [r['ticker'] for r in results] == ['AAA', 'CCC', 'BBB', 'ZZZ']
+    assert results[-1]['error'] == 'Insufficient data'
+    assert results[2]['interval'] == '1d'
+
+    for result in results[:3]:
+        expected = analyze_instant_setup(result['ticker'], '1h')
+        assert result.keys() == expected.keys()
+        for key, value in expected.items():
+            assert result[key] == (pytest.approx(value, rel=1e-9) if isinstance(value, float) else value), key
@@ -0,0 +1,39 @@
+import threading
+
+import instant_bot_engine
+from instant_bot_engine import InstantService
+
+def test_concurrent_identical_requests_share_one_analysis(monkeypatch):
+    calls = []
+    release = threading.Event()
+    def analyze(ticker, interval='1h'):
+        calls.append((ticker, interval))
+        release.wait(timeout=10)
+        return {'ticker': ticker, 'signal': 'HOLD'}
+    monkeypatch.setattr(instant_bot_engine, 'analyze_instant_setup', analyze)
+
+    service = InstantService(workers=4)
+    futures = [service.submit('aapl', '1h') for _ in range(8)]
+    other = service.submit('MSFT', '1h')
+    release.set()
+    assert [f.result(timeout=10) for f in futures] == [{'ticker': 'AAPL', 'signal': 'HOLD'}] * 8
+    other.result(timeout=10)
+    assert sorted(calls) == [('AAPL', '1h'), ('MSFT', '1h')]
+    assert service.stats == {'requests': 9, 'computed': 2, 'coalesced': 7}
+
+def test_warm_bars_drop_expired_entries_and_stay_bounded(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(instant_bot_engine.time, 'time', lambda: clock[0])
+    monkeypatch.setattr(instant_bot_engine, 'WARM_BARS_TTL', 60)
+    monkeypatch.setattr(instant_bot_engine, 'WARM_BARS_MAX', 3)
+    monkeypatch.setattr(instant_bot_engine, '_warm_bars', {})
+
+    for ticker in ('A', 'B'):
+        instant_bot_engine._remember_bars((ticker, 20, '1h'), ticker)
+    clock[0] += 61
+    instant_bot_engine._remember_bars(('C', 20, '1h'), 'C')
+    assert list(instant_bot_engine._warm_bars) == [('C', 20, '1h')]
+
+    for ticker in ('D', 'E', 'F'):
+        instant_bot_engine._remember_bars((ticker, 20, '1h'), ticker)
+    assert [k[0] for k in instant_bot_engine._warm_bars] == ['D', 'E', 'F']
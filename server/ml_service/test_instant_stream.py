@@ -0,0 +1,50 @@
+import json
+
+from benchmarks.fixtures import synthetic_ohlcv
+from indicator_state import IndicatorStore, replay
+import instant_bot_engine
+from instant_bot_engine import BarStream, signal_from_row, MIN_BARS
+
+def bars():
+    return synthetic_ohlcv('AAA', '2024-01-01', '2024-01-20', '1h')['Close']
+
+def test_stream_matches_full_recompute(tmp_path):
+    close = bars()
+    stream = BarStream(IndicatorStore(str(tmp_path)))
+    records = [stream.on_bar('AAA', '1h', ts, c) for ts, c in close.items()]
+    assert records[MIN_BARS - 2] is None and records[MIN_BARS - 1] is not None
+    assert stream.on_bar('AAA', '1h', close.index[-1], close.iloc[-1]) is None # Stale bar
+    assert stream.stats['skipped'] == 1
+
+    _, frame = replay(close)
+    expected = signal_from_row('AAA', frame.iloc[-1].to_dict(), '1h')
+    last = records[-1]
+    assert last['bars'] == len(close) and last['ts'] == close.index[-1].isoformat()
+    assert {k: last[k] for k in expected} == expected
+
+def test_stream_resumes_from_committed_state(tmp_path):
+    close = bars()
+    store = IndicatorStore(str(tmp_path))
+    first = BarStream(store)
+    for ts, c in close.iloc[:100].items():
+        first.on_bar('AAA', '1h', ts, c)
+    first.close()
+
+    second = BarStream(store)
+    records = [second.on_bar('AAA', '1h', ts, c) for ts, c in close.iloc[100:].items()]
+    whole = BarStream(IndicatorStore(str(tmp_path / 'fresh')))
+    expected = [whole.on_bar('AAA', '1h', ts, c) for ts, c in close.items()][100:]
+    assert records == expected
+
+def test_stream_reads_ndjson_replay(tmp_path, monkeypatch, capsys):
+    close = bars().iloc[:40]
+    replay_file = tmp_path / 'feed.ndjson'
+    lines = [json.dumps({'ticker': 'aaa', 'ts': ts.isoformat(), 'close': c}) for ts, c in close.items()]
+    lines.insert(5, json.dumps({'ticker': 'AAA', 'ts': close.index[5].isoformat(), 'close': 1.0, 'final': False}))
+    replay_file.write_text('\n'.join(lines) + '\n')
+    monkeypatch.setattr(instant_bot_engine, 'get_indicator_store', lambda: IndicatorStore(str(tmp_path / 'state')))
+
+    instant_bot_engine.stream(str(replay_file))
+    out = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len(out) == 40 - MIN_BARS + 1
+    assert out[-1]['ticker'] == 'AAA' and out[-1]['current_price'] == close.iloc[-1]
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+from ta.momentum import RSIIndicator
+from ta.trend import SMAIndicator
+
+import macro_context
+from macro_context import compute_macro_frame, extend_macro_frame, get_macro_context
+
+def make_close(n=500, seed=0):
+    idx = pd.bdate_range('2023-01-02', periods=n)
+    steps = np.random.default_rng(seed).normal(0, 0.01, n)
+    return pd.Series(100 * np.exp(np.cumsum(steps)), index=idx)
+
+def test_full_frame_matches_ta():
+    close = make_close()
+    frame = compute_macro_frame(close)
+    rsi = RSIIndicator(close=close, window=14).rsi()
+    trend = SMAIndicator(close=close, window=20).sma_indicator().diff()
+    np.testing.assert_allclose(frame['Macro_RSI'], rsi, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(frame['Macro_Trend'], trend, rtol=0, atol=1e-9)
+
+def test_incremental_extension_matches_full_recompute():
+    close = make_close()
+    full = compute_macro_frame(close)
+    extended = extend_macro_frame(compute_macro_frame(close.iloc[:-3]), close.iloc[-3:])
+    cols = ['Pct_Change', 'Macro_Trend', 'Macro_RSI']
+    np.testing.assert_allclose(extended[cols].to_numpy(), full[cols].to_numpy(), rtol=0, atol=1e-9)
+
+def test_provider_extends_stored_frame(tmp_path, monkeypatch):
+    monkeypatch.setattr(macro_context, 'MACRO_DIR', str(tmp_path))
+    close = make_close()
+    bars = pd.DataFrame({'Close': close})
+
+    # Yesterday's run stored everything but the last bar
+    yesterday = compute_macro_frame(close.iloc[:-1])
+    macro_context._save('QQQ', yesterday, {'as_of': '2000-01-01', 'symbol': 'QQQ'})
+    macro_context._memo.clear()
+
+    frame = get_macro_context('QQQ', fetch_bars=lambda s: bars)
+    expected = compute_macro_frame(close)
+    np.testing.assert_allclose(frame['Macro_RSI'].iloc[-5:], expected['Macro_RSI'].iloc[-5:], atol=1e-9)
+
+    # Second call the same day never fetches
+    again = get_macro_context('QQQ', fetch_bars=lambda s: 1 / 0)
+    assert again is frame
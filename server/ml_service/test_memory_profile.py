@@ -0,0 +1,50 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+import memory_profile
+from bar_cache import BarCache
+from benchmarks.fixtures import MockAdapter, synthetic_ohlcv
+from earnings_model import FEATURE_COLS, build_scientific_features
+from macro_context import compute_macro_frame, MACRO_COLUMNS
+from smart_bot_engine import FEATURES, prepare_features
+
+START, END = '2023-01-01', '2024-12-31'
+
+def with_extra_field(adapter):
+    def fetch(*req):
+        return json.dumps([dict(row, adjclose=row['close']) for row in json.loads(adapter.fetch(*req))])
+    return fetch
+
+def test_lean_bars_are_float32_ohlcv(tmp_path, monkeypatch):
+    cache = BarCache(str(tmp_path))
+    fetch = with_extra_field(MockAdapter())
+    standard = cache.get_bars('AAA', START, END, '1d', fetch)
+    assert standard['Close'].dtype == np.float64 and 'adjclose' in standard.columns
+
+    monkeypatch.setattr(memory_profile, 'PIPELINE_MODE', 'lean')
+    lean = cache.get_bars('AAA', START, END, '1d', fetch)
+    assert list(lean.columns) == memory_profile.BAR_COLUMNS
+    assert (lean.dtypes == np.float32).all()
+    assert cache.read('AAA', '1d')['Close'].dtype == np.float32
+
+def test_lean_features_keep_model_columns_only(monkeypatch):
+    bars = synthetic_ohlcv('AAA', START, END)
+    macro = compute_macro_frame(synthetic_ohlcv('QQQ', START, END)['Close'])[MACRO_COLUMNS]
+    standard_smart, _ = prepare_features(bars)
+    standard_sci = build_scientific_features(bars.copy(), macro)
+
+    monkeypatch.setattr(memory_profile, 'PIPELINE_MODE', 'lean')
+    lean_bars = memory_profile.compact_bars(bars)
+    before = lean_bars.copy()
+    lean_smart, _ = prepare_features(lean_bars)
+    lean_sci = build_scientific_features(lean_bars, macro)
+    pd.testing.assert_frame_equal(lean_bars, before) # Inputs are not modified
+
+    assert list(lean_smart.columns) == ['Close'] + FEATURES + ['Y_Next']
+    assert list(lean_sci.columns) == ['Close'] + FEATURE_COLS + ['Y_Target']
+    assert (lean_sci.dtypes == np.float32).all()
+    for lean, standard, cols in [(lean_smart, standard_smart, FEATURES), (lean_sci, standard_sci, FEATURE_COLS)]:
+        assert (lean.index == standard.index).all()
+        np.testing.assert_allclose(lean[cols].to_numpy(dtype='float64'), standard[cols].to_numpy(dtype='float64'), rtol=2e-3, atol=1e-4)
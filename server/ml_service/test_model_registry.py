@@ -0,0 +1,113 @@
+import os
+import multiprocessing
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+
+from model_registry import (ModelRegistry, RetrainQueue, IncompatibleModelError,
+                            read_model_meta, write_model_meta, schema_hash)
+
+FEATURES = ['A', 'B', 'C']
+
+def fit_and_save(path, features):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(60, len(features))), columns=features)
+    model = xgb.XGBRegressor(n_estimators=5, max_depth=2)
+    model.fit(X, rng.normal(size=60))
+    model.save_model(str(path))
+    return model
+
+def make_registry(tmp_path):
+    return ModelRegistry(queue=RetrainQueue(str(tmp_path / 'queue.json')))
+
+def test_schema_mismatch_is_found_from_metadata_and_queued(tmp_path):
+    registry = make_registry(tmp_path)
+    path = str(tmp_path / 'AAPL_Daily.json')
+    model = fit_and_save(path, FEATURES)
+    write_model_meta(path, FEATURES, train_end=pd.Timestamp('2025-03-31'))
+    assert read_model_meta(path)['train_end'] == '2025-03-31'
+
+    assert registry.get(path, features=FEATURES) is not None
+    job = {'engine': 'smart', 'ticker': 'AAPL', 'interval': 'Daily'}
+    with pytest.raises(IncompatibleModelError):
+        registry.get(path, features=FEATURES + ['D'], job=job)
+    with pytest.raises(IncompatibleModelError):
+        registry.get(path, features=FEATURES + ['D'], job=job)
+    assert registry.stats['incompatible'] == 2
+    assert [(p, j['ticker']) for p, j in registry.queue.jobs(engine='smart')] == [(path, 'AAPL')]
+
+    # Saving a retrained model takes it off the queue
+    registry.put(path, model, FEATURES + ['D'])
+    assert registry.queue.jobs() == []
+
+def test_models_without_sidecar_are_checked_by_feature_names(tmp_path):
+    registry = make_registry(tmp_path)
+    current = str(tmp_path / 'MSFT_xgb.json')
+    legacy = str(tmp_path / 'NVDA_xgb.json')
+    fit_and_save(current, FEATURES)
+    fit_and_save(legacy, FEATURES[:2])
+
+    assert registry.get(current, features=FEATURES) is not None
+    assert read_model_meta(current)['schema_hash'] == schema_hash(FEATURES)
+    with pytest.raises(IncompatibleModelError):
+        registry.get(legacy, features=FEATURES, job={'engine': 'quant', 'ticker': 'NVDA'})
+    assert read_model_meta(legacy) is None
+    assert [p for p, _ in registry.queue.jobs(engine='quant')] == [legacy]
+    assert registry.get(str(tmp_path / 'missing.json'), features=FEATURES) is None
+
+def test_lru_evicts_by_count_and_by_size(tmp_path):
+    paths = [str(tmp_path / f"T{i}_xgb.json") for i in range(4)]
+    for path in paths:
+        fit_and_save(path, FEATURES)
+
+    registry = ModelRegistry(max_models=2, queue=RetrainQueue(str(tmp_path / 'queue.json')))
+    registry.get(paths[0])
+    registry.get(paths[1])
+    registry.get(paths[0])  # Most recently used: survives the next insert
+    registry.get(paths[2])
+    assert list(registry._entries) == [paths[0], paths[2]]
+    assert registry.stats['evictions'] == 1
+
+    size = os.path.getsize(paths[0])
+    registry = ModelRegistry(max_bytes=3 * size - 1, queue=RetrainQueue(str(tmp_path / 'queue.json')))
+    for path in paths[:3]:
+        registry.get(path)
+    assert list(registry._entries) == paths[1:3]
+    assert registry._bytes <= registry.max_bytes
+
+def test_changed_file_is_reloaded_and_lookups_are_counted(tmp_path):
+    registry = make_registry(tmp_path)
+    path = str(tmp_path / 'AMD_xgb.json')
+    fit_and_save(path, FEATURES)
+
+    first = registry.get(path)
+    assert registry.get(path) is first
+    assert (registry.stats['hits'], registry.stats['misses'], registry.stats['reloads']) == (1, 1, 0)
+
+    fit_and_save(path, FEATURES)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9)) # Coarse mtime clocks
+    reloaded = registry.get(path)
+    assert reloaded is not first
+    assert (registry.stats['hits'], registry.stats['misses'], registry.stats['reloads']) == (1, 2, 1)
+    assert registry.stats['load_seconds'] > 0
+    assert 'hit_ratio=33.3%' in registry.summary()
+
+def _queue_jobs(path, worker, count):
+    queue = RetrainQueue(path)
+    for i in range(count):
+        queue.add(f"w{worker}_{i}.json", 'test', engine='smart')
+        if i % 2:
+            queue.done(f"w{worker}_{i}.json")
+
+def test_queue_updates_from_several_processes_are_not_lost(tmp_path):
+    ctx = multiprocessing.get_context('fork')
+    path = str(tmp_path / 'queue.json')
+    workers = [ctx.Process(target=_queue_jobs, args=(path, w, 40)) for w in range(4)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join(timeout=60)
+    expected = {f"w{w}_{i}.json" for w in range(4) for i in range(0, 40, 2)}
+    assert {p for p, _ in RetrainQueue(path).jobs()} == expected
@@ -0,0 +1,64 @@
+import sys
+import pytest
+
+import node_adapter
+from node_adapter import NodeAdapterClient, AdapterError
+
+# Stand-in worker speaking the adapter's line protocol ("<id>\t<payload>" replies).
+# Replies carry the ticker. Requests are held until a LAST* ticker arrives and then
+# answered newest first, after a stray tab-containing line. HANG never gets a reply;
+# EXIT makes the worker quit.
+FAKE_WORKER = r'''
+import sys, json
+held = []
+for line in sys.stdin:
+    req = json.loads(line)
+    if req['ticker'] == 'EXIT':
+        sys.exit(1)
+    if req['ticker'] == 'HANG':
+        continue
+    held.append(req)
+    if req['ticker'].startswith('LAST'):
+        print('Warning:\tsome library noise', flush=True)
+        for r in reversed(held):
+            print(f"{r['id']}\t{r['ticker']}", flush=True)
+        held = []
+'''
+
+@pytest.fixture
+def client():
+    client = NodeAdapterClient(command=[sys.executable, '-u', '-c', FAKE_WORKER])
+    yield client
+    client.close()
+
+def request(ticker):
+    return (ticker, '2024-01-01', '2024-02-01', '1d')
+
+def test_out_of_order_replies_and_stray_lines(client):
+    assert client.fetch_many([request('A'), request('B'), request('LAST')]) == ['A', 'B', 'LAST']
+    assert client.fetch(*request('LAST2')) == 'LAST2' # Reader survived the stray line
+    assert client.pending == {} and client.stats['workers_started'] == 1
+
+def test_worker_exit_fails_owed_requests_and_restarts(client):
+    hung = client.submit(*request('HANG'))
+    dead = client.submit(*request('EXIT'))
+    for future in (hung, dead):
+        with pytest.raises(AdapterError):
+            future.result(timeout=10)
+    assert client.pending == {}
+    assert client.fetch_many([request('LAST')]) == ['LAST']
+    assert client.stats['workers_started'] == 2
+
+def test_timeouts_fall_back_and_kill_a_hung_worker(client, monkeypatch):
+    monkeypatch.setattr(node_adapter, 'REQUEST_TIMEOUT', 0.3)
+    monkeypatch.setattr(node_adapter, 'MAX_TIMEOUTS', 2)
+    monkeypatch.setattr(client, '_run_once', lambda *req: 'one-shot')
+    assert client.fetch(*request('HANG')) == 'one-shot'
+    first = client.proc
+    assert client.pending == {} and first.poll() is None
+
+    assert client.fetch(*request('HANG')) == 'one-shot'
+    assert (client.stats['timeouts'], client.stats['workers_killed']) == (2, 1)
+    assert first.wait(timeout=10) is not None
+    assert client.fetch(*request('LAST')) == 'LAST'
+    assert client.stats['workers_started'] == 2
@@ -0,0 +1,69 @@
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+import prediction_writer
+from prediction_writer import BulkPredictionWriter, load_pending_tickers
+from benchmarks.fixtures import InMemoryCollection, _InsertManyResult
+
+class FlakyCollection(InMemoryCollection):
+    """
+    insert_many stores the first `land` documents of the first call and then drops the
+    connection. Later calls behave like an unordered insert: documents whose _id is
+    already stored fail with `error_code`, the others land.
+    """
+
+    def __init__(self, land=0, error_code=prediction_writer.DUPLICATE_KEY):
+        super().__init__()
+        self.land = land
+        self.error_code = error_code
+        self.calls = 0
+
+    def insert_many(self, docs, ordered=True):
+        assert ordered is False
+        self.calls += 1
+        if self.calls == 1 and self.land is not None:
+            self.docs.extend(docs[:self.land])
+            raise AutoReconnect('connection reset')
+        stored = {d['_id'] for d in self.docs}
+        errors = [{'index': i, 'code': self.error_code} for i, d in enumerate(docs) if d['_id'] in stored]
+        new = [d for d in docs if d['_id'] not in stored]
+        self.docs.extend(new)
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'nInserted': len(new)})
+        return _InsertManyResult([d['_id'] for d in new])
+
+def prediction(i, user='bot'):
+    return {'userId': user, 'stockTicker': f"T{i}", 'status': 'Pending'}
+
+def test_batches_and_saved_round_trips():
+    collection = InMemoryCollection([prediction(0, 'a'), prediction(1, 'b'), prediction(2, 'other')])
+    assert load_pending_tickers(collection, ['a', 'b']) == {'T0', 'T1'}
+
+    writer = BulkPredictionWriter(collection, batch_size=2)
+    for i in range(5):
+        writer.add(prediction(10 + i))
+    assert writer.stats['round_trips'] == 2 # Two full batches went out on add
+    writer.close()
+    assert (writer.stats['written'], writer.stats['round_trips']) == (5, 3)
+    assert len(collection.docs) == 8
+    # Per-prediction path: 20 find_one + 5 insert_one; here: 1 distinct + 3 insert_many
+    assert writer.saved_round_trips(20, reads=1) == 21
+
+def test_retry_after_partial_landing_ignores_duplicates(monkeypatch):
+    monkeypatch.setattr(prediction_writer.time, 'sleep', lambda s: None)
+    collection = FlakyCollection(land=2)
+    writer = BulkPredictionWriter(collection, batch_size=10)
+    for i in range(5):
+        writer.add(prediction(i))
+    writer.close()
+    assert len(collection.docs) == 5
+    assert len({d['_id'] for d in collection.docs}) == 5 # No prediction stored twice
+    assert writer.stats == {'written': 5, 'round_trips': 2, 'retries': 1}
+
+def test_other_write_errors_propagate():
+    collection = FlakyCollection(land=None, error_code=121) # Document validation failure
+    collection.docs.append({'_id': 'clash'})
+    writer = BulkPredictionWriter(collection)
+    writer.add(dict(prediction(0), _id='clash'))
+    with pytest.raises(BulkWriteError):
+        writer.close()
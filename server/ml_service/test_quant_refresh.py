@@ -0,0 +1,57 @@
+import datetime
+import numpy as np
+import pandas as pd
+
+import earnings_model
+from earnings_model import FEATURE_COLS, plan_refresh, refresh_event_driven_model, train_event_driven_model, target_rms
+
+def make_frame(n=300, seed=5):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2024-01-01', periods=n)
+    df = pd.DataFrame(rng.normal(0, 0.02, (n, len(FEATURE_COLS))), columns=FEATURE_COLS, index=index)
+    df['Y_Target'] = 0.5 * df['Ret_Lag1'] + rng.normal(0, 0.01, n)
+    return df
+
+def test_plan_refresh_schedule():
+    today = datetime.date(2025, 6, 30)
+    assert plan_refresh(None, today)[0] == 'full'
+    meta = {'train_end': '2025-06-20', 'full_trained_at': '2025-05-01T06:00:00', 'refreshes': 3}
+    assert plan_refresh(meta, today)[0] == 'incremental'
+    stale = dict(meta, full_trained_at='2025-03-01T06:00:00')
+    assert plan_refresh(stale, today)[0] == 'full'
+
+def test_refresh_adds_rounds_on_new_rows_only():
+    df = make_frame()
+    cutoff = df.index[-21]
+    history = df[df.index <= cutoff].copy()
+    model, rmse, _, _, train_end = train_event_driven_model('AAA', history, [])
+    assert train_end == cutoff
+
+    meta = {'train_end': str(cutoff.date()), 'rmse': rmse, 'target_rms': target_rms(history), 'full_trained_at': '2025-01-01'}
+    result = refresh_event_driven_model('AAA', df.copy(), [], model, meta)
+    refreshed, _, _, new_end = result
+    assert new_end == df.index[-1]
+    assert refreshed.get_booster().num_boosted_rounds() == model.get_booster().num_boosted_rounds() + earnings_model.REFRESH_ROUNDS
+
+    # Nothing new since the cutoff -> no refit; a badly drifted model -> full retrain
+    assert refresh_event_driven_model('AAA', df.copy(), [], model, dict(meta, train_end=str(new_end.date()))) is None
+    shifted = df.copy()
+    shifted['Y_Target'] += 0.2
+    assert refresh_event_driven_model('AAA', shifted, [], model, meta) == 'drift'
+
+def test_refresh_fits_the_event_windows_like_a_full_fit():
+    df = make_frame()
+    cutoff = df.index[-21]
+    events = [df.index[i] for i in (60, 120, 180, 240)] + [df.index[-3]]
+    model, rmse, _, _, _ = train_event_driven_model('AAA', df[df.index <= cutoff].copy(), events)
+    meta = {'train_end': str(cutoff.date()), 'rmse': rmse, 'target_rms': target_rms(df), 'full_trained_at': '2025-01-01'}
+
+    # New rows outside the windows would look like drift; they are not part of the refit
+    shifted = df.copy()
+    mask, _ = earnings_model.mark_event_windows(shifted, events)
+    shifted.loc[~mask & (shifted.index > cutoff), 'Y_Target'] += 0.2
+    result = refresh_event_driven_model('AAA', shifted, events, model, meta)
+    assert result not in (None, 'drift')
+
+    # Fewer new window rows than MIN_REFRESH_ROWS: skipped, even with other rows available
+    assert refresh_event_driven_model('AAA', df.copy(), events[:-1], model, meta) is None
@@ -0,0 +1,64 @@
+import json
+import time
+
+import run_trace
+from run_trace import start_trace, end_trace, span
+
+def test_span_is_noop_without_trace():
+    with span('fetch', 'AAA'):
+        pass
+    assert end_trace() is None
+
+def test_trace_records_nested_spans_and_summary(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_trace, 'TRACE_DIR', str(tmp_path))
+    trace = start_trace('test', log=open('/dev/null', 'w'), mode='unit')
+    with span('featurize', 'AAA'):
+        with span('fetch', 'AAA'):
+            time.sleep(0.02)
+        time.sleep(0.01)
+    with span('fetch', 'BBB'):
+        time.sleep(0.005)
+    summary = end_trace()
+
+    records = [json.loads(line) for line in open(trace.path)]
+    assert records[0]['type'] == 'run' and records[0]['mode'] == 'unit'
+    assert records[-1]['type'] == 'summary'
+    spans = [r for r in records if r['type'] == 'span']
+    assert [s['stage'] for s in spans] == ['fetch', 'featurize', 'fetch']
+
+    outer = spans[1]
+    assert outer['depth'] == 0 and spans[0]['depth'] == 1
+    # Parent self time excludes the nested fetch
+    assert outer['self_ms'] < outer['ms'] - 15
+    assert summary['slowest_tickers'][0]['ticker'] == 'AAA'
+    assert summary['stages']['fetch']['count'] == 2
+    assert list(summary['stages'])[0] == 'fetch'
+    assert all(s['rss_mb'] > 0 for s in spans) and summary['peak_rss_mb'] > 0
+    assert {t['ticker'] for t in summary['rss_tickers']} == {'AAA', 'BBB'}
+
+def test_failed_span_records_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_trace, 'TRACE_DIR', str(tmp_path))
+    trace = start_trace('test', log=open('/dev/null', 'w'))
+    try:
+        with span('train', 'AAA'):
+            raise ValueError('boom')
+    except ValueError:
+        pass
+    end_trace()
+    spans = [json.loads(line) for line in open(trace.path)][1:-1]
+    assert spans[0]['error'] == 'ValueError: boom'
+
+def test_rolling_trace_bounds_memory_and_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_trace, 'TRACE_DIR', str(tmp_path))
+    monkeypatch.setattr(run_trace, 'TRACE_KEEP_PARTS', 2)
+    trace = start_trace('test', log=open('/dev/null', 'w'), roll_spans=3, serve=True)
+    for i in range(10):
+        with span('analyze', f"T{i}"):
+            pass
+    assert trace.part == 3 and trace.spans == 1 and list(trace.tickers) == ['T9']
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"{trace.run_id}_part2.ndjson", f"{trace.run_id}_part3.ndjson"]
+
+    records = [json.loads(line) for line in open(tmp_path / f"{trace.run_id}_part2.ndjson")]
+    assert records[0]['serve'] is True and records[-1]['spans'] == 3
+    assert [r['ticker'] for r in records if r['type'] == 'span'] == ['T6', 'T7', 'T8']
+    assert end_trace()['spans'] == 1
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+import train_profile
+from train_profile import fit_profiled, validation_mask
+
+PARAMS = dict(n_estimators=200, learning_rate=0.3, max_depth=3, objective='reg:squarederror')
+
+def make_data(n=400, seed=1):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n, 4)), columns=list('abcd'))
+    # Mostly noise: extra rounds stop helping early
+    return X, 0.3 * X['a'] + rng.normal(0, 1, n)
+
+def test_validation_tail_is_chronological():
+    assert validation_mask(10, fraction=0.2).tolist() == [False] * 8 + [True] * 2
+    dates = pd.to_datetime(['2024-01-05', '2024-01-01', '2024-01-04', '2024-01-02', '2024-01-03'] * 2)
+    assert validation_mask(10, dates, fraction=0.4).tolist() == [True, False, True, False, False] * 2
+
+def test_early_stopping_and_budget():
+    X, y = make_data()
+    model, info = fit_profiled(PARAMS, X, y)
+    assert info['stop'] == 'early' and info['rounds'] < info['max_rounds']
+    assert model.get_booster().num_boosted_rounds() == info['rounds']
+    assert model.get_params()['tree_method'] == 'hist'
+
+    _, info = fit_profiled(PARAMS, X, y, budget=1e-9)
+    assert info['stop'] == 'budget' and info['rounds'] == 1 and info['saved_seconds'] >= 0
+
+def test_refit_counts_against_the_budget(monkeypatch):
+    budgets = []
+    class RefitRunsOut(train_profile.TimeBudget):
+        def __init__(self, seconds):
+            super().__init__(seconds)
+            budgets.append(seconds)
+        def after_iteration(self, model, epoch, evals_log):
+            self.exhausted = len(budgets) > 1 # Only the refit runs out
+            return self.exhausted
+    monkeypatch.setattr(train_profile, 'TimeBudget', RefitRunsOut)
+    X, y = make_data()
+    model, info = fit_profiled(PARAMS, X, y, budget=30)
+    assert len(budgets) == 2 and budgets[1] < 30 # The refit only gets what the search left
+    # The cut-short refit is dropped for the search model, which predicts with its best rounds
+    assert info['stop'] == 'budget' and model.get_booster().num_boosted_rounds() > info['rounds']
+
+def test_fixed_profile_fits_every_round(monkeypatch):
+    monkeypatch.setattr(train_profile, 'PROFILE', 'fixed')
+    X, y = make_data()
+    model, info = fit_profiled(PARAMS, X, y)
+    assert info['stop'] == 'fixed' and model.get_booster().num_boosted_rounds() == 200
@@ -0,0 +1,70 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Worker pool for per-ticker pipelines (calendar -> fetch -> features -> fit/predict -> db).
+# The engines log with plain print(); while a pool is running, stdout is swapped for a
+# proxy that buffers each worker thread's output and writes it as one contiguous block
+# when that ticker finishes, so logs from parallel tickers never interleave.
+
+class _BufferedStdout:
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def write(self, s):
+        buf = getattr(self.local, 'buf', None)
+        if buf is None:
+            with self.lock:
+                return self.stream.write(s)
+        buf.append(s)
+        return len(s)
+
+    def flush(self):
+        if getattr(self.local, 'buf', None) is None:
+            self.stream.flush()
+
+    def begin(self):
+        self.local.buf = []
+
+    def end(self):
+        text = ''.join(self.local.buf)
+        self.local.buf = None
+        with self.lock:
+            self.stream.write(text)
+            self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+def run_per_ticker(fn, tickers, workers=1):
+    """
+    Runs fn(ticker) for every ticker and returns {ticker: result}.
+    With workers > 1 tickers run on a thread pool (the work is dominated by adapter,
+    HTTP and Mongo waits, and XGBoost releases the GIL while fitting).
+    """
+    tickers = list(tickers)
+    if workers <= 1 or len(tickers) <= 1:
+        return {t: fn(t) for t in tickers}
+
+    proxy = _BufferedStdout(sys.stdout)
+    sys.stdout = proxy
+
+    def task(ticker):
+        proxy.begin()
+        try:
+            return fn(ticker)
+        finally:
+            proxy.end()
+
+    results = {}
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(task, t): t for t in tickers}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+    finally:
+        sys.stdout = proxy.stream
+
+    return {t: results.get(t) for t in tickers}
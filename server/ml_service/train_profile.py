@@ -0,0 +1,99 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+# Shared XGBoost training profile for the engines.
+# The model's n_estimators is only a cap: the latest VALIDATION_FRACTION of the rows
+# (by date) is held out, boosting stops once EARLY_STOPPING_ROUNDS rounds bring no
+# improvement on it (or when the per-model time budget runs out), and the final model
+# is refit on all rows with the number of rounds that scored best. The refit runs on
+# what is left of the budget; when the search already used it up, or the refit runs
+# out, the search model (trained on the older rows) is kept. Trees use 'hist'.
+# TRAIN_PROFILE=fixed restores plain fits of every capped round.
+
+PROFILE = os.getenv('TRAIN_PROFILE', 'early_stop')
+VALIDATION_FRACTION = float(os.getenv('TRAIN_VALIDATION_FRACTION', '0.2'))
+MIN_VALIDATION_ROWS = 20
+EARLY_STOPPING_ROUNDS = int(os.getenv('TRAIN_EARLY_STOPPING_ROUNDS', '20'))
+TIME_BUDGET_SECONDS = float(os.getenv('TRAIN_TIME_BUDGET_SECONDS', '10'))
+
+class TimeBudget(xgb.callback.TrainingCallback):
+    """Stops boosting once `seconds` of wall-clock time have been spent."""
+
+    def __init__(self, seconds):
+        super().__init__()
+        self.seconds = seconds
+        self.started = None
+        self.exhausted = False
+
+    def before_training(self, model):
+        self.started = time.perf_counter()
+        return model
+
+    def after_iteration(self, model, epoch, evals_log):
+        if time.perf_counter() - self.started > self.seconds:
+            self.exhausted = True
+        return self.exhausted
+
+def validation_mask(n, dates=None, fraction=VALIDATION_FRACTION):
+    """The latest `fraction` of n rows: positional tail, or by date for stacked frames."""
+    mask = np.zeros(n, dtype=bool)
+    n_val = int(n * fraction)
+    if n_val == 0:
+        return mask
+    if dates is None:
+        mask[n - n_val:] = True
+        return mask
+    dates = pd.DatetimeIndex(dates)
+    return np.asarray(dates >= dates.sort_values()[n - n_val])
+
+def fit_profiled(params, X, y, dates=None, budget=None, label=None):
+    """
+    Fits XGBRegressor(**params) under the profile (params['n_estimators'] is the cap).
+    Returns (model, info); info has rounds, max_rounds, stop ('early', 'budget', 'cap'
+    or 'fixed'), seconds and saved_seconds (estimated against fitting every round,
+    0 when the profile was slower). With label, one [Train Profile] line is printed.
+    """
+    t0 = time.perf_counter()
+    max_rounds = params.get('n_estimators', 100)
+    params = dict(params, tree_method='hist')
+    val = validation_mask(len(X), dates)
+
+    if PROFILE == 'fixed' or val.sum() < MIN_VALIDATION_ROWS or (~val).sum() < MIN_VALIDATION_ROWS:
+        model = xgb.XGBRegressor(**params)
+        model.fit(X, y)
+        rounds, stop, saved = max_rounds, 'fixed', 0.0
+    else:
+        seconds = budget or TIME_BUDGET_SECONDS
+        budget = TimeBudget(seconds)
+        search = xgb.XGBRegressor(**params, early_stopping_rounds=EARLY_STOPPING_ROUNDS, callbacks=[budget])
+        search.fit(X[~val], y[~val], eval_set=[(X[val], y[val])], verbose=False)
+        fitted = search.get_booster().num_boosted_rounds()
+        per_round = (time.perf_counter() - t0) / max(1, fitted)
+        # best_iteration is unset if the budget stopped boosting before early stopping ran
+        best = search.get_booster().attr('best_iteration')
+        rounds = int(best) + 1 if best is not None else fitted
+        stop = 'budget' if budget.exhausted else ('early' if fitted < max_rounds else 'cap')
+
+        model = search
+        remaining = seconds - (time.perf_counter() - t0)
+        if stop != 'budget' and remaining <= 0:
+            stop = 'budget'
+        elif stop != 'budget':
+            refit_budget = TimeBudget(remaining)
+            refit = xgb.XGBRegressor(**dict(params, n_estimators=rounds), callbacks=[refit_budget])
+            refit.fit(X, y)
+            if refit_budget.exhausted and refit.get_booster().num_boosted_rounds() < rounds:
+                stop = 'budget'
+            else:
+                model = refit
+        saved = per_round * max_rounds - (time.perf_counter() - t0)
+
+    info = {'rounds': rounds, 'max_rounds': max_rounds, 'stop': stop,
+            'seconds': round(time.perf_counter() - t0, 3), 'saved_seconds': round(max(saved, 0.0), 3)}
+    if label:
+        outcome = f"saved ~{saved:.2f}s" if saved >= 0 else f"~{-saved:.2f}s over a fixed fit"
+        print(f"    [Train Profile] {label}: {rounds}/{max_rounds} rounds ({stop}) in {info['seconds']:.2f}s, {outcome}")
+    return model, info
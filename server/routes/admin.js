@@ -14,6 +14,7 @@ const PredictionLog = require('../models/PredictionLog');
 const Setting = require('../models/Setting');
 const cryptoProvider = require('../services/financeProviders/cryptoProvider');
 const { recalculateUserAnalytics } = require('../services/analyticsService');
+const instantEngine = require('../services/instantEngine');
 
 // --- NEW UTILITY FUNCTION: Deletes predictions without matching users ---
 async function cleanupOrphanedPredictions() {
@@ -107,8 +108,8 @@ router.post('/admin/trigger-bot', async (req, res) => {
         return res.status(403).send('Forbidden: Admins only.');
     }
     try {
-        const { mode } = req.body; // 'inference' or 'train'
-        const safeMode = ['train', 'inference'].includes(mode) ? mode : 'inference';
+        const { mode } = req.body; // 'inference', 'refresh' or 'train'
+        const safeMode = ['train', 'refresh', 'inference'].includes(mode) ? mode : 'inference';
         console.log(`Admin triggered manual AI Bot Run (Mode: ${safeMode})...`);
         runEarningsModel(safeMode);
         res.status(200).send(`AI Bot (${safeMode}) job triggered successfully.`);
@@ -171,58 +172,17 @@ router.post('/admin/predict-gold', async (req, res) => {
     await req.user.save();
 
     try {
-        const { spawn } = require('child_process');
-        const path = require('path');
-        const scriptPath = path.join(__dirname, '../ml_service/instant_bot_engine.py');
         const interval = '1h'; // Default to Intraday per user request
         console.log(`[InstantBot] Analyzing ${ticker} (${interval})...`);
 
-        const pythonCommand = process.platform === 'win32' ? 'python' : '/usr/bin/python3';
-        console.log(`[InstantBot] Spawning ${pythonCommand} at ${scriptPath}`);
-        const pythonProcess = spawn(pythonCommand, [scriptPath, ticker, '--interval', interval]);
-
-        let output = '';
-        pythonProcess.stdout.on('data', (data) => {
-            const s = data.toString();
-            output += s;
-            console.log(`[InstantBot Out]: ${s}`);
-        });
-
-        let errorOutput = '';
-        pythonProcess.stderr.on('data', (data) => {
-            const s = data.toString();
-            errorOutput += s;
-            console.error(`[InstantBot Err]: ${s}`);
-        });
-
-        pythonProcess.on('error', (err) => {
-            console.error(`[InstantBot] Failed to start process: ${err.message}`);
-            return res.status(500).json({ message: "Process start failed", details: err.message });
-        });
-
-        pythonProcess.on('close', (code) => {
-            console.log(`[InstantBot] Exit Code: ${code}`);
-            if (code !== 0) {
-                console.error(`[InstantBot] Failed. Output: ${output}, Error: ${errorOutput}`);
-                // Ensure we don't double-send if 'error' already sent
-                if (!res.headersSent) {
-                    return res.status(500).json({ message: "Analysis failed", details: errorOutput });
-                }
-                return;
-            }
-            try {
-                const result = JSON.parse(output);
-                res.json(result);
-            } catch (e) {
-                console.error(`[InstantBot] JSON Parse Error: ${e.message}. Output was: ${output}`);
-                if (!res.headersSent) {
-                    res.status(500).json({ message: "Invalid output from engine", output });
-                }
-            }
-        });
+        // Resident Python engine (warm imports + bars) instead of a process per request
+        const result = await instantEngine.analyze(ticker, interval);
+        res.json(result);
     } catch (e) {
-        console.error(e);
-        res.status(500).json({ message: "Server error" });
+        console.error(`[InstantBot] Failed: ${e.message}`);
+        if (!res.headersSent) {
+            res.status(500).json({ message: "Analysis failed", details: e.message });
+        }
     }
 });
 
@@ -0,0 +1,92 @@
+const { spawn } = require('child_process');
+const path = require('path');
+const readline = require('readline');
+
+// Resident instant-analysis engine.
+// Keeps one `instant_bot_engine.py --serve` process alive so requests skip Python
+// start-up, the pandas/ta imports and the Node adapter spawn. Requests are matched
+// to responses by id; identical concurrent requests are coalesced on the Python side.
+
+const scriptPath = path.join(__dirname, '../ml_service/instant_bot_engine.py');
+const pythonCommand = process.platform === 'win32' ? 'python' : '/usr/bin/python3';
+const REQUEST_TIMEOUT_MS = 90 * 1000;
+
+let engine = null;
+let nextId = 1;
+const pending = new Map(); // id -> { resolve, reject, timer }
+
+const failAll = (err) => {
+    for (const [id, req] of pending) {
+        clearTimeout(req.timer);
+        req.reject(err);
+        pending.delete(id);
+    }
+};
+
+const startEngine = () => {
+    console.log(`[InstantEngine] Starting resident engine: ${pythonCommand} ${scriptPath} --serve`);
+    const proc = spawn(pythonCommand, ['-u', scriptPath, '--serve']);
+
+    readline.createInterface({ input: proc.stdout }).on('line', (line) => {
+        let msg;
+        try {
+            msg = JSON.parse(line);
+        } catch (e) {
+            console.error(`[InstantEngine] Unparseable line: ${line}`);
+            return;
+        }
+        const req = pending.get(msg.id);
+        if (!req) return;
+        clearTimeout(req.timer);
+        pending.delete(msg.id);
+        req.resolve(msg.result);
+    });
+
+    // EPIPE when the engine died between requests; 'close' below fails the pending calls
+    proc.stdin.on('error', (err) => console.error(`[InstantEngine] stdin error: ${err.message}`));
+
+    proc.stderr.on('data', (data) => {
+        console.error(`[InstantEngine Err]: ${data}`);
+    });
+
+    const onExit = (reason) => {
+        if (engine === proc) engine = null;
+        failAll(new Error(`Instant engine stopped (${reason})`));
+    };
+    proc.on('error', (err) => onExit(err.message));
+    proc.on('close', (code) => onExit(`code ${code}`));
+
+    return proc;
+};
+
+/**
+ * Runs analyze_instant_setup on the resident engine.
+ * Resolves with the engine's JSON result (which may itself carry an `error` field).
+ */
+const analyze = (ticker, interval = '1h') => new Promise((resolve, reject) => {
+    if (!engine) engine = startEngine();
+
+    const id = nextId++;
+    const timer = setTimeout(() => {
+        pending.delete(id);
+        reject(new Error('Instant engine timed out'));
+    }, REQUEST_TIMEOUT_MS);
+    pending.set(id, { resolve, reject, timer });
+
+    engine.stdin.write(`${JSON.stringify({ id, ticker, interval })}\n`, (err) => {
+        if (err && pending.has(id)) {
+            clearTimeout(timer);
+            pending.delete(id);
+            reject(err);
+        }
+    });
+});
+
+const stopEngine = () => {
+    if (engine) {
+        engine.stdin.end();
+        engine = null;
+    }
+};
+
+module.exports = { analyze, stopEngine };